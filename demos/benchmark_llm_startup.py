@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+LLM 管理器启动耗时基准测试
+
+对比两种启动方式在全新进程中的耗时：
+1. 立即加载：导入整个 src 包（__init__ 立即导入全部子模块），导入 openai / anthropic SDK
+   （已安装时）并为配置中的每个模型创建实例或 SDK 客户端
+2. 延迟加载：只导入 src.lazy_loading（不经过包 __init__），LazyModelRegistry 校验全部配置，
+   仅在首次使用时创建 mock 模型
+
+Usage:
+    python demos/benchmark_llm_startup.py
+    python demos/benchmark_llm_startup.py --runs 10 --config llm_config.json
+"""
+
+import argparse
+import importlib.util
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+# 提供商 -> 立即加载时导入的 SDK
+PROVIDER_SDKS = {'openai': 'openai', 'qwen': 'openai', 'deepseek': 'openai', 'claude': 'anthropic'}
+
+EAGER_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import src
+from src.lazy_loading import default_factory
+configs = json.load(open({config!r}, encoding='utf-8'))['llm']
+sdks = {sdks!r}
+models = {{}}
+for name, config in configs.items():
+    sdk = sdks.get(config['provider'])
+    if sdk is None:
+        models[name] = default_factory(name, config)
+        continue
+    try:
+        module = __import__(sdk)
+    except ImportError:
+        continue
+    client_class = module.OpenAI if sdk == 'openai' else module.Anthropic
+    options = {{'base_url': config['api_base']}} if config.get('api_base') else {{}}
+    models[name] = client_class(api_key='benchmark', **options)
+print(time.perf_counter() - start)
+"""
+
+LAZY_SNIPPET = """
+import json, sys, time, types
+start = time.perf_counter()
+# 只把 src 注册为包路径，不执行 src/__init__.py
+package = types.ModuleType('src')
+package.__path__ = [{src_dir!r}]
+sys.modules['src'] = package
+from src.lazy_loading import LazyModelRegistry
+configs = json.load(open({config!r}, encoding='utf-8'))['llm']
+registry = LazyModelRegistry(configs)
+registry.get('mock')
+print(time.perf_counter() - start)
+"""
+
+
+def measure(snippet: str, config: str, runs: int) -> list:
+    """在全新子进程中多次执行代码片段，返回每次耗时（秒）"""
+    code = snippet.format(config=config, sdks=PROVIDER_SDKS, src_dir=str(project_root / 'src'))
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=str(project_root), capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="LLM 管理器启动耗时基准测试")
+    parser.add_argument('--runs', type=int, default=5, help='每种模式的运行次数')
+    parser.add_argument('--config', default=str(project_root / 'llm_config.json'), help='配置文件路径')
+    args = parser.parse_args()
+
+    with open(args.config, encoding='utf-8') as f:
+        model_count = len(json.load(f).get('llm', {}))
+    installed = sorted(sdk for sdk in set(PROVIDER_SDKS.values()) if importlib.util.find_spec(sdk))
+
+    print("⏱ LLM 管理器启动耗时基准测试")
+    print("=" * 50)
+    print(f"  - 配置模型数: {model_count}")
+    print(f"  - 已安装的 SDK: {', '.join(installed) or '无（立即加载只计包导入与 mock/local 模型）'}")
+    print(f"  - 每种模式运行: {args.runs} 次")
+
+    try:
+        eager = measure(EAGER_SNIPPET, args.config, args.runs)
+        lazy = measure(LAZY_SNIPPET, args.config, args.runs)
+    except RuntimeError as e:
+        print(f"❌ 基准测试失败: {e}")
+        sys.exit(1)
+
+    eager_median = statistics.median(eager) * 1000
+    lazy_median = statistics.median(lazy) * 1000
+    print("\n📊 结果（中位数）")
+    print(f"  - 立即加载: {eager_median:.1f} ms")
+    print(f"  - 延迟加载: {lazy_median:.1f} ms")
+    if lazy_median > 0:
+        print(f"  - 加速比: {eager_median / lazy_median:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
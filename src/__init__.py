@@ -6,42 +6,115 @@ __version__ = "0.1.0"
 __author__ = "Your Name"
 
 # 导入主要模块，使其可以通过包名直接访问
-from .extractor import (
-    MockLLM, OpenAIModel, ClaudeModel,
-    InspirationExtractor, PromptTemplate,
-    InspirationData, LLMInterface
+from .errors import (
+    DatabaseError, ValidationError, SearchError
 )
-from .input_module import InputModule
-from .database import (
-    InspirationDatabase, DatabaseError, ValidationError,
-    save_inspiration, save_batch, query_by_keyword, delete_by_id
+from .rate_limiter import (
+    RateLimiter, RateLimitError, RateLimitedLLM, estimate_tokens
 )
-from .search import (
-    SearchError,
-    search_inspirations, search_by_source, search_by_date_range
+from .resilience import (
+    FailoverExecutor, FailoverError, CircuitBreaker, RetryPolicy
 )
-from .llm_manager import (
-    LLMConfig, LLMProvider, LLMInterface,
-    OpenAILLM, ClaudeLLM, QwenLLM, DeepSeekLLM, MockLLM,
-    LLMManager, get_llm_manager, create_llm_manager
+from .embedding_batch import (
+    get_embeddings, EmbeddingBatchResult
 )
-from .search_enhancement import (
-    SearchEnhancement, SearchEnhancementError, VectorDatabase,
-    SemanticSearcher, HybridSearcher
+from .embedding_cache import (
+    EmbeddingCache, EmbeddingCacheError, CachedEmbeddingLLM
+)
+from .local_embedding import (
+    LocalEmbeddingLLM, LocalEmbeddingError
+)
+from .health_check import (
+    HealthCheckCache
+)
+from .lazy_loading import (
+    LazyModelRegistry, lazy_import, validate_model_config
+)
+from .single_flight import (
+    SingleFlight, CoalescingLLM, make_request_key
+)
+from .semantic_cache import (
+    SemanticPromptCache, SemanticCacheLLM
+)
+from .telemetry import (
+    LLMTelemetry, InstrumentedLLM, LatencyHistogram
+)
+from .mock_server import (
+    MockOpenAIServer, ProfiledMockLLM, LoadProfile, LatencyProfile, MockProviderError
+)
+from .batch_jobs import (
+    BatchClient, BatchExtractionJob, BatchJobError
+)
+from .hedging import (
+    HedgedExecutor
+)
+from .model_registry import (
+    ModelRegistry, RegistrySnapshot, EnvPersister
+)
+from .db_pool import (
+    ConnectionPool, get_pool, get_pool_from_config, close_pool, close_all_pools, register_connection_hook
+)
+from .fts import (
+    FullTextIndex, search_fts, keyword_search, segment, build_match_query
+)
+from .bulk_writer import (
+    BulkWriter, BulkWriteResult, bulk_save
+)
+from .schema_migrations import (
+    migrate, SCHEMA_VERSION
+)
+from .indexed_search import (
+    search_by_tag, list_tags, date_range_bounds
+)
+from .pagination import (
+    Page, search_inspirations_page, search_by_source_page, search_by_date_range_page, search_by_tag_page, paginate_ranked
+)
+from .async_db import (
+    AsyncDatabase, DatabaseBusyError
+)
+from .columnar_io import (
+    export_table, import_table, iter_record_batches, ColumnarIOError, PYARROW_AVAILABLE
+)
+from .compression import (
+    TextCompressor, CompressionError, get_compressor, enable_compression
+)
+from .sharding import (
+    ShardedDatabase, shard_key
+)
+from .backup import (
+    BackupError, BackupScheduler, online_backup, restore_backup, list_backups, prune_backups
+)
+from .query_stats import (
+    QueryStats, enable_query_stats, disable_query_stats, get_query_stats, normalize_sql
 )
 
 __all__ = [
-    'MockLLM', 'OpenAIModel', 'ClaudeModel',
-    'InspirationExtractor', 'PromptTemplate',
-    'InspirationData', 'LLMInterface',
-    'InputModule',
-    'InspirationDatabase', 'DatabaseError', 'ValidationError',
-    'save_inspiration', 'save_batch', 'query_by_keyword', 'delete_by_id',
-    'SearchError',
-    'search_inspirations', 'search_by_source', 'search_by_date_range',
-    'LLMConfig', 'LLMProvider',
-    'OpenAILLM', 'ClaudeLLM', 'QwenLLM', 'DeepSeekLLM',
-    'LLMManager', 'get_llm_manager', 'create_llm_manager',
-    'SearchEnhancement', 'SearchEnhancementError', 'VectorDatabase',
-    'SemanticSearcher', 'HybridSearcher'
-]
\ No newline at end of file
+    'DatabaseError', 'ValidationError', 'SearchError',
+    'RateLimiter', 'RateLimitError', 'RateLimitedLLM', 'estimate_tokens',
+    'FailoverExecutor', 'FailoverError', 'CircuitBreaker', 'RetryPolicy',
+    'get_embeddings', 'EmbeddingBatchResult',
+    'EmbeddingCache', 'EmbeddingCacheError', 'CachedEmbeddingLLM',
+    'LocalEmbeddingLLM', 'LocalEmbeddingError',
+    'HealthCheckCache',
+    'LazyModelRegistry', 'lazy_import', 'validate_model_config',
+    'SingleFlight', 'CoalescingLLM', 'make_request_key',
+    'SemanticPromptCache', 'SemanticCacheLLM',
+    'LLMTelemetry', 'InstrumentedLLM', 'LatencyHistogram',
+    'MockOpenAIServer', 'ProfiledMockLLM', 'LoadProfile', 'LatencyProfile', 'MockProviderError',
+    'BatchClient', 'BatchExtractionJob', 'BatchJobError',
+    'HedgedExecutor',
+    'ModelRegistry', 'RegistrySnapshot', 'EnvPersister',
+    'ConnectionPool', 'get_pool', 'get_pool_from_config', 'close_pool', 'close_all_pools', 'register_connection_hook',
+    'FullTextIndex', 'search_fts', 'keyword_search', 'segment', 'build_match_query',
+    'BulkWriter', 'BulkWriteResult', 'bulk_save',
+    'migrate', 'SCHEMA_VERSION',
+    'search_by_tag', 'list_tags', 'date_range_bounds',
+    'Page', 'search_inspirations_page', 'search_by_source_page', 'search_by_date_range_page', 'search_by_tag_page',
+    'paginate_ranked',
+    'AsyncDatabase', 'DatabaseBusyError',
+    'export_table', 'import_table', 'iter_record_batches', 'ColumnarIOError', 'PYARROW_AVAILABLE',
+    'TextCompressor', 'CompressionError', 'get_compressor', 'enable_compression',
+    'ShardedDatabase', 'shard_key',
+    'BackupError', 'BackupScheduler', 'online_backup', 'restore_backup', 'list_backups', 'prune_backups',
+    'QueryStats', 'enable_query_stats', 'disable_query_stats', 'get_query_stats', 'normalize_sql'
+]
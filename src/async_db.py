@@ -0,0 +1,213 @@
+"""
+异步数据库访问模块
+
+供 FastAPI 异步路由使用的数据库门面：阻塞的 sqlite3 调用交给专用线程池执行，
+路由中直接 await，不阻塞事件循环，也不占用默认线程池（与文件上传等其他阻塞任务隔离）。
+
+- 线程数与等待队列长度均有上限，队列满时立即抛出 DatabaseBusyError（可映射为 HTTP 503），
+  而不是无限堆积请求
+- 底层复用 db_pool 的连接池（工作线程共享同一组读连接与写连接）
+- get_metrics() 返回队列深度、执行中任务数、排队等待时间等指标
+
+用法：
+
+    adb = AsyncDatabase(db_path)
+
+    @app.get("/search")
+    async def search(keyword: str, cursor: str = None):
+        page = await adb.search_page(keyword, limit=10, cursor=cursor)
+        return page.to_dict()
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .bulk_writer import DEFAULT_BATCH_SIZE, BulkWriteResult, bulk_save
+from .errors import DatabaseError
+from .fts import keyword_search
+from .indexed_search import search_by_date_range, search_by_source, search_by_tag
+from .pagination import (
+    Page, search_by_date_range_page, search_by_source_page, search_inspirations_page,
+)
+from .query_stats import enable_from_config, get_query_stats
+
+
+class DatabaseBusyError(DatabaseError):
+    """等待队列已满"""
+    pass
+
+
+class AsyncDatabase:
+    """数据库与检索函数的异步门面"""
+
+    def __init__(self, db_path: str, max_workers: int = 4, max_queue: int = 64,
+                 search_mode: str = 'like', tokenizer: str = 'bigram',
+                 bulk_batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        初始化门面
+
+        Args:
+            db_path: 数据库文件路径
+            max_workers: 执行数据库操作的线程数（通常与连接池读连接数一致）
+            max_queue: 排队等待执行的任务上限，超出时拒绝新任务
+            search_mode: 关键词检索模式，'like' 或 'fts'
+            tokenizer: fts 模式的分词方式
+            bulk_batch_size: save_batch 每个写事务的行数
+        """
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.search_mode = search_mode
+        self.tokenizer = tokenizer
+        self.bulk_batch_size = bulk_batch_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='async-db')
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'cancelled': 0,
+            'max_queue_depth': 0,
+            'total_wait': 0.0,
+            'total_run': 0.0,
+        }
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'AsyncDatabase':
+        """根据 config.json 创建（database.query_stats 启用时同时打开语句统计）"""
+        database = config.get('database', {})
+        search = config.get('search', {})
+        if get_query_stats() is None:
+            enable_from_config(config)
+        return cls(
+            database.get('path', 'db.sqlite3'),
+            max_workers=database.get('max_readers', 4),
+            max_queue=database.get('max_queue', 64),
+            search_mode=search.get('search_mode', 'like'),
+            tokenizer=search.get('fts_tokenizer', 'bigram'),
+            bulk_batch_size=database.get('bulk_batch_size', DEFAULT_BATCH_SIZE),
+        )
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在专用线程池中执行阻塞函数
+
+        Raises:
+            DatabaseBusyError: 等待队列已满
+        """
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._stats['rejected'] += 1
+                raise DatabaseBusyError(f"数据库繁忙，排队任务已达上限 {self.max_queue}")
+            self._queued += 1
+            self._stats['submitted'] += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._queued)
+        submitted = time.perf_counter()
+        state = {'dequeued': False}
+
+        def task() -> Any:
+            started = time.perf_counter()
+            with self._lock:
+                state['dequeued'] = True
+                self._queued -= 1
+                self._running += 1
+                self._stats['total_wait'] += started - submitted
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._stats['completed' if ok else 'failed'] += 1
+                    self._stats['total_run'] += time.perf_counter() - started
+
+        def release(future: Future) -> None:
+            # 任务开始前被取消（如等待它的协程被取消）时，task 不会执行，在此归还排队名额
+            with self._lock:
+                if not state['dequeued']:
+                    state['dequeued'] = True
+                    self._queued -= 1
+                    self._stats['cancelled'] += 1
+
+        try:
+            future = self._executor.submit(task)
+        except RuntimeError:
+            # 线程池已关闭，任务未入队
+            with self._lock:
+                self._queued -= 1
+            raise DatabaseError("异步数据库门面已关闭")
+        future.add_done_callback(release)
+        # 协程被取消时 wrap_future 会同时取消尚未开始的线程池任务
+        return await asyncio.wrap_future(future)
+
+    # ---- 检索 ----
+
+    async def search(self, keyword: str, limit: int = 10) -> list:
+        return await self.run(keyword_search, self.db_path, keyword, limit, self.search_mode, self.tokenizer)
+
+    async def search_page(self, keyword: str, limit: int = 10, cursor: Optional[str] = None) -> Page:
+        return await self.run(search_inspirations_page, self.db_path, keyword, limit, cursor,
+                              self.search_mode, self.tokenizer)
+
+    async def search_by_source(self, source_file: str, limit: Optional[int] = None) -> list:
+        return await self.run(search_by_source, self.db_path, source_file, limit)
+
+    async def search_by_source_page(self, source_file: str, limit: int = 10,
+                                    cursor: Optional[str] = None) -> Page:
+        return await self.run(search_by_source_page, self.db_path, source_file, limit, cursor)
+
+    async def search_by_date_range(self, start_date: str, end_date: str, limit: Optional[int] = None) -> list:
+        return await self.run(search_by_date_range, self.db_path, start_date, end_date, limit)
+
+    async def search_by_date_range_page(self, start_date: str, end_date: str, limit: int = 10,
+                                        cursor: Optional[str] = None) -> Page:
+        return await self.run(search_by_date_range_page, self.db_path, start_date, end_date, limit, cursor)
+
+    async def search_by_tag(self, tag: str, limit: Optional[int] = None) -> list:
+        return await self.run(search_by_tag, self.db_path, tag, limit)
+
+    # ---- 写入 ----
+
+    async def save_batch(self, records: Iterable[Dict[str, Any]],
+                         batch_size: Optional[int] = None) -> BulkWriteResult:
+        batch_size = batch_size or self.bulk_batch_size
+        return await self.run(functools.partial(bulk_save, records, self.db_path, batch_size=batch_size))
+
+    # ---- 指标 ----
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """返回队列深度等指标（可直接挂到状态接口）；启用语句统计时附带 'query_stats'"""
+        with self._lock:
+            stats = dict(self._stats)
+            finished = stats['completed'] + stats['failed']
+            started = stats['submitted'] - self._queued - stats['cancelled']
+            metrics = {
+                'queue_depth': self._queued,
+                'running': self._running,
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'max_queue_depth': stats['max_queue_depth'],
+                'submitted': stats['submitted'],
+                'completed': stats['completed'],
+                'failed': stats['failed'],
+                'rejected': stats['rejected'],
+                'cancelled': stats['cancelled'],
+                'avg_wait_ms': stats['total_wait'] / started * 1000 if started else 0.0,
+                'avg_run_ms': stats['total_run'] / finished * 1000 if finished else 0.0,
+            }
+        query_stats = get_query_stats()
+        if query_stats is not None:
+            metrics['query_stats'] = query_stats.summary(top=10)
+        return metrics
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
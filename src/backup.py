@@ -0,0 +1,370 @@
+"""
+在线备份模块
+
+使用 SQLite 在线备份 API 为灵感数据库与记忆数据库（memories/project_memory.db）
+做一致性备份：按小步（默认每步 256 页）复制，步与步之间让出锁，写入与检索不受阻塞；
+备份先写入临时文件，完整性检查通过后再改名，不会留下半截文件。
+
+- BackupScheduler 按 config.json 中 database.backup_interval（hourly / daily / weekly 或秒数）
+  在后台定时备份，并按保留策略清理旧备份
+- restore_backup() 同样使用备份 API 把备份写回目标库，恢复前会先为当前库做一次备份
+
+命令行：
+
+    python -m src.backup run                # 立即备份全部目标
+    python -m src.backup list               # 列出已有备份
+    python -m src.backup restore <备份文件>  # 恢复到对应的目标库
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .db_pool import close_pool
+from .errors import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+INTERVALS = {'hourly': 3600, 'daily': 86400, 'weekly': 7 * 86400}
+_BACKUP_NAME = re.compile(r'^(?P<name>.+)-(?P<stamp>\d{8}-\d{6})\.db$')
+
+
+class BackupError(DatabaseError):
+    """备份或恢复失败"""
+    pass
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+_NULL_VALUE = re.compile(r'^NULL value in (?P<table>\w+)\.(?P<column>\w+)$')
+
+
+def check_integrity(conn: sqlite3.Connection, full: bool = False) -> List[str]:
+    """
+    执行 quick_check / integrity_check，返回问题列表（空列表表示通过）
+
+    部分 SQLite 版本（如 3.40）对 WITHOUT ROWID 表（inspiration_tags）会误报
+    "NULL value in 表.列"，这类报告会再查询一次该列确认，确实没有 NULL 时忽略。
+    """
+    pragma = 'integrity_check' if full else 'quick_check'
+    problems = []
+    has_null: Dict[Tuple[str, str], bool] = {}
+    for (message,) in conn.execute(f"PRAGMA {pragma}").fetchall():
+        if message == 'ok':
+            continue
+        match = _NULL_VALUE.match(message)
+        if match:
+            key = (match.group('table'), match.group('column'))
+            if key not in has_null:
+                has_null[key] = conn.execute(
+                    f'SELECT 1 FROM "{key[0]}" WHERE "{key[1]}" IS NULL LIMIT 1').fetchone() is not None
+            if not has_null[key]:
+                continue
+        problems.append(message)
+    return problems
+
+
+def online_backup(source_path: str, dest_path: str, pages: int = 256, step_sleep: float = 0.005,
+                  max_restarts: int = 3) -> Dict[str, Any]:
+    """
+    用在线备份 API 复制数据库
+
+    Args:
+        source_path: 源数据库路径
+        dest_path: 目标文件路径（先写入 dest_path.tmp，校验通过后改名）
+        pages: 每步复制的页数
+        step_sleep: 步间等待秒数（让出锁给写入方）
+        max_restarts: 源库在备份过程中被其他连接修改会导致备份从头开始；超过该次数后
+                      改为一步完成（WAL 模式下只持有读快照，仍不阻塞写入）
+
+    Returns:
+        {'path', 'pages', 'bytes', 'seconds', 'restarts'}
+    """
+    if not os.path.exists(source_path):
+        raise BackupError(f"源数据库不存在: {source_path}")
+    os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+    tmp_path = dest_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    start = time.perf_counter()
+    state = {'remaining': None, 'restarts': 0, 'total': 0}
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] >= max_restarts:
+                raise _TooManyRestarts()
+        state['remaining'] = remaining
+        state['total'] = total
+
+    source = sqlite3.connect(source_path, timeout=30)
+    try:
+        target = sqlite3.connect(tmp_path)
+        try:
+            try:
+                source.backup(target, pages=pages, progress=progress, sleep=step_sleep)
+            except _TooManyRestarts:
+                # 写入过于频繁导致多次重来，改为一步复制
+                logger.warning(f"{source_path} 备份重启 {state['restarts']} 次，改为一步复制")
+                source.backup(target, pages=-1)
+            # 备份副本统一为 rollback 日志模式，单文件即可拷贝/归档
+            target.execute("PRAGMA journal_mode=DELETE")
+            problems = check_integrity(target)
+        finally:
+            target.close()
+        if problems:
+            raise BackupError(f"备份副本完整性检查失败: {problems[0]}")
+    except (sqlite3.Error, BackupError) as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        if isinstance(e, BackupError):
+            raise
+        raise BackupError(f"备份 {source_path} 失败: {e}")
+    finally:
+        source.close()
+
+    os.replace(tmp_path, dest_path)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(dest_path)
+    logger.info(f"已备份 {source_path} -> {dest_path}（{size} 字节，{elapsed:.1f} 秒，重启 {state['restarts']} 次）")
+    return {'path': dest_path, 'pages': state['total'], 'bytes': size, 'seconds': elapsed,
+            'restarts': state['restarts']}
+
+
+def restore_backup(backup_path: str, target_path: str, pages: int = 256,
+                   safety_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    把备份恢复到目标库
+
+    先校验备份完整性，再为当前目标库做一次安全备份（safety_dir 下，文件名带 pre-restore），
+    然后关闭本进程内该库的连接池，用备份 API 覆盖目标库内容。
+
+    Returns:
+        {'restored', 'safety_backup'}
+    """
+    if not os.path.exists(backup_path):
+        raise BackupError(f"备份文件不存在: {backup_path}")
+    source = sqlite3.connect(f"file:{os.path.abspath(backup_path)}?mode=ro", uri=True)
+    try:
+        problems = check_integrity(source, full=True)
+        if problems:
+            raise BackupError(f"备份文件已损坏: {problems[0]}")
+
+        safety_backup = None
+        if os.path.exists(target_path):
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+            name = os.path.splitext(os.path.basename(target_path))[0]
+            safety_backup = os.path.join(safety_dir or os.path.dirname(os.path.abspath(target_path)),
+                                         f"{name}-pre-restore-{stamp}.db")
+            online_backup(target_path, safety_backup, pages=pages)
+
+        close_pool(target_path)
+        target = sqlite3.connect(target_path, timeout=30)
+        try:
+            source.backup(target, pages=pages)
+        finally:
+            target.close()
+    except sqlite3.Error as e:
+        raise BackupError(f"恢复 {target_path} 失败: {e}")
+    finally:
+        source.close()
+    logger.info(f"已从 {backup_path} 恢复 {target_path}")
+    return {'restored': target_path, 'safety_backup': safety_backup}
+
+
+def list_backups(backup_dir: str, name: Optional[str] = None) -> List[Tuple[str, datetime, str]]:
+    """
+    列出备份文件
+
+    Returns:
+        [(目标名, 备份时间, 路径)]，按时间倒序
+    """
+    if not os.path.isdir(backup_dir):
+        return []
+    backups = []
+    for filename in os.listdir(backup_dir):
+        match = _BACKUP_NAME.match(filename)
+        if not match or (name and match.group('name') != name):
+            continue
+        stamp = datetime.strptime(match.group('stamp'), '%Y%m%d-%H%M%S')
+        backups.append((match.group('name'), stamp, os.path.join(backup_dir, filename)))
+    backups.sort(key=lambda item: item[1], reverse=True)
+    return backups
+
+
+def prune_backups(backup_dir: str, name: str, keep_last: int = 7, max_age_days: Optional[int] = 30,
+                  now: Optional[datetime] = None) -> List[str]:
+    """
+    按保留策略删除旧备份：始终保留最近 keep_last 份，其余超过 max_age_days 的删除
+
+    Returns:
+        被删除的文件路径
+    """
+    now = now or datetime.now()
+    removed = []
+    for index, (_, stamp, path) in enumerate(list_backups(backup_dir, name)):
+        if index < keep_last:
+            continue
+        if max_age_days is None or now - stamp > timedelta(days=max_age_days):
+            os.remove(path)
+            removed.append(path)
+    if removed:
+        logger.info(f"已清理 {name} 的 {len(removed)} 份旧备份")
+    return removed
+
+
+class BackupScheduler:
+    """定时在线备份"""
+
+    def __init__(self, targets: Dict[str, str], backup_dir: str = 'backups', interval: Any = 'daily',
+                 keep_last: int = 7, max_age_days: Optional[int] = 30, pages: int = 256):
+        """
+        初始化调度器
+
+        Args:
+            targets: 目标名 -> 数据库路径，如 {'inspirations': 'db.sqlite3', 'memories': 'memories/project_memory.db'}
+            backup_dir: 备份目录
+            interval: 'hourly' / 'daily' / 'weekly' 或秒数
+            keep_last: 每个目标至少保留的备份份数
+            max_age_days: 超出 keep_last 的备份保留天数，None 表示只按份数保留
+            pages: 每步复制的页数
+        """
+        self.targets = dict(targets)
+        self.backup_dir = backup_dir
+        self.interval = INTERVALS[interval] if isinstance(interval, str) else float(interval)
+        self.keep_last = keep_last
+        self.max_age_days = max_age_days
+        self.pages = pages
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional['BackupScheduler']:
+        """根据 config.json 创建；backup_enabled 为 false 时返回 None"""
+        database = config.get('database', {})
+        if not database.get('backup_enabled', False):
+            return None
+        backup = database.get('backup', {})
+        targets = {'inspirations': database.get('path', 'db.sqlite3')}
+        if backup.get('memory_db_path'):
+            targets['memories'] = backup['memory_db_path']
+        return cls(
+            targets,
+            backup_dir=backup.get('dir', 'backups'),
+            interval=database.get('backup_interval', 'daily'),
+            keep_last=backup.get('keep_last', 7),
+            max_age_days=backup.get('max_age_days', 30),
+            pages=backup.get('pages_per_step', 256),
+        )
+
+    def _due(self, name: str) -> bool:
+        backups = list_backups(self.backup_dir, name)
+        if not backups:
+            return True
+        return (datetime.now() - backups[0][1]).total_seconds() >= self.interval
+
+    def run_once(self, force: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        备份全部目标
+
+        Args:
+            force: False 时只备份距上次备份已超过间隔的目标
+
+        Returns:
+            目标名 -> 备份结果（失败时为 {'error': ...}）
+        """
+        results = {}
+        for name, path in self.targets.items():
+            if not os.path.exists(path):
+                logger.debug(f"跳过不存在的数据库: {path}")
+                continue
+            if not force and not self._due(name):
+                continue
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+            try:
+                results[name] = online_backup(path, os.path.join(self.backup_dir, f"{name}-{stamp}.db"),
+                                              pages=self.pages)
+                prune_backups(self.backup_dir, name, self.keep_last, self.max_age_days)
+            except (BackupError, OSError) as e:
+                logger.error(f"备份 {name} 失败: {e}")
+                results[name] = {'error': str(e)}
+        self.last_run.update(results)
+        return results
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.run_once(force=False)
+            # 最长每分钟检查一次，间隔较短时按间隔检查
+            self._stop.wait(min(self.interval, 60))
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='db-backup', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="灵感数据库与记忆数据库的在线备份与恢复")
+    parser.add_argument('--config', default='config.json', help='配置文件路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('run', help='立即备份全部目标')
+    subparsers.add_parser('list', help='列出已有备份')
+    restore_parser = subparsers.add_parser('restore', help='从备份恢复')
+    restore_parser.add_argument('backup_file', help='备份文件路径')
+    restore_parser.add_argument('--target', help='目标数据库路径，默认按备份文件名对应的目标')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    with open(args.config, encoding='utf-8') as f:
+        config = json.load(f)
+    database = dict(config.get('database', {}))
+    database['backup_enabled'] = True
+    scheduler = BackupScheduler.from_config({**config, 'database': database})
+
+    try:
+        if args.command == 'run':
+            for name, result in scheduler.run_once().items():
+                if 'error' in result:
+                    print(f"❌ {name}: {result['error']}")
+                else:
+                    print(f"✅ {name}: {result['path']}（{result['bytes']} 字节，{result['seconds']:.1f} 秒）")
+        elif args.command == 'list':
+            for name, stamp, path in list_backups(scheduler.backup_dir):
+                print(f"{name:<14} {stamp:%Y-%m-%d %H:%M:%S}  {path}")
+        else:
+            target = args.target
+            if target is None:
+                match = _BACKUP_NAME.match(os.path.basename(args.backup_file))
+                if not match or match.group('name') not in scheduler.targets:
+                    parser.error("无法从文件名判断目标数据库，请使用 --target 指定")
+                target = scheduler.targets[match.group('name')]
+            result = restore_backup(args.backup_file, target, safety_dir=scheduler.backup_dir)
+            print(f"✅ 已恢复 {result['restored']}")
+            if result['safety_backup']:
+                print(f"   恢复前的数据已备份到 {result['safety_backup']}")
+    except BackupError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
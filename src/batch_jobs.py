@@ -0,0 +1,304 @@
+"""
+离线批处理提取模块
+
+面向成千上万本书的回溯处理：不追求交互延迟，而是把提取请求写成 JSONL，
+通过提供商的批处理接口（OpenAI 兼容的 /v1/files + /v1/batches）提交为任务，
+轮询直至完成，再按 custom_id 把结果映射回文本块 ID。
+
+每一步的进度都写入状态文件，进程重启后调用 run() 会从中断处继续：
+已上传的文件不会重复上传，已提交的任务不会重复提交，已下载的结果不会重复下载。
+"""
+
+import json
+import logging
+import os
+import time
+import urllib.error
+import urllib.request
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+class BatchJobError(Exception):
+    """批处理任务错误"""
+    pass
+
+
+class BatchClient:
+    """OpenAI 兼容批处理接口的最小 HTTP 客户端（仅依赖标准库）"""
+
+    def __init__(self, api_base: str, api_key: Optional[str] = None, timeout: float = 60.0):
+        self.api_base = api_base.rstrip('/')
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, data: Optional[bytes] = None,
+                 content_type: str = 'application/json', raw: bool = False) -> Any:
+        headers = {'Content-Type': content_type}
+        if self.api_key:
+            headers['Authorization'] = f'Bearer {self.api_key}'
+        request = urllib.request.Request(f'{self.api_base}{path}', data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+        except urllib.error.HTTPError as e:
+            detail = e.read().decode('utf-8', errors='replace')
+            raise BatchJobError(f"{method} {path} 失败（HTTP {e.code}）: {detail}")
+        except urllib.error.URLError as e:
+            raise BatchJobError(f"{method} {path} 连接失败: {e.reason}")
+        return body if raw else json.loads(body)
+
+    def upload_file(self, path: str, purpose: str = 'batch') -> Dict[str, Any]:
+        """以 multipart/form-data 上传 JSONL 文件"""
+        boundary = uuid.uuid4().hex
+        with open(path, 'rb') as f:
+            content = f.read()
+        body = b''.join([
+            f'--{boundary}\r\nContent-Disposition: form-data; name="purpose"\r\n\r\n{purpose}\r\n'.encode('utf-8'),
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+            f'filename="{Path(path).name}"\r\nContent-Type: application/jsonl\r\n\r\n'.encode('utf-8'),
+            content,
+            f'\r\n--{boundary}--\r\n'.encode('utf-8'),
+        ])
+        return self._request('POST', '/files', body, f'multipart/form-data; boundary={boundary}')
+
+    def create_batch(self, input_file_id: str, endpoint: str = '/v1/chat/completions',
+                     completion_window: str = '24h', metadata: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        payload = {'input_file_id': input_file_id, 'endpoint': endpoint, 'completion_window': completion_window}
+        if metadata:
+            payload['metadata'] = metadata
+        return self._request('POST', '/batches', json.dumps(payload).encode('utf-8'))
+
+    def get_batch(self, batch_id: str) -> Dict[str, Any]:
+        return self._request('GET', f'/batches/{batch_id}')
+
+    def cancel_batch(self, batch_id: str) -> Dict[str, Any]:
+        return self._request('POST', f'/batches/{batch_id}/cancel', b'')
+
+    def download_file(self, file_id: str) -> bytes:
+        return self._request('GET', f'/files/{file_id}/content', raw=True)
+
+
+class BatchExtractionJob:
+    """
+    一次可恢复的批量提取任务
+
+    工作目录下的文件：
+        requests.jsonl   提交的请求（custom_id 即文本块 ID）
+        state.json       任务进度（文件 ID、任务 ID、状态）
+        output.jsonl     下载的结果
+        errors.jsonl     下载的失败明细（如有）
+    """
+
+    def __init__(self, work_dir: str, client: BatchClient, model: str,
+                 prompt_builder: Callable[[str], str],
+                 max_tokens: int = 1000, temperature: float = 0.7):
+        """
+        初始化任务
+
+        Args:
+            work_dir: 任务工作目录，同一目录即同一任务
+            client: 批处理接口客户端
+            model: 提供商侧的模型名（如 qwen-turbo）
+            prompt_builder: 文本块 -> 提示词，通常使用 InspirationExtractor 的提示词模板
+            max_tokens: 单条请求的最大输出 token 数
+            temperature: 采样温度
+        """
+        self.work_dir = Path(work_dir)
+        self.client = client
+        self.model = model
+        self.prompt_builder = prompt_builder
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.state = self._load_state()
+
+    # ---- 状态持久化 ----
+
+    @property
+    def _state_path(self) -> Path:
+        return self.work_dir / 'state.json'
+
+    def _load_state(self) -> Dict[str, Any]:
+        if self._state_path.exists():
+            with open(self._state_path, encoding='utf-8') as f:
+                return json.load(f)
+        return {'phase': 'new'}
+
+    def _save_state(self, **updates) -> None:
+        self.state.update(updates)
+        tmp_path = self._state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._state_path)
+
+    # ---- 各阶段 ----
+
+    def prepare(self, chunks: Iterable[Tuple[str, str]]) -> int:
+        """
+        写出请求 JSONL
+
+        Args:
+            chunks: (文本块 ID, 文本) 序列，ID 在任务内必须唯一
+
+        Returns:
+            写出的请求条数
+        """
+        if self.state['phase'] != 'new':
+            return self.state.get('request_count', 0)
+        path = self.work_dir / 'requests.jsonl'
+        tmp_path = path.with_suffix('.tmp')
+        seen = set()
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for chunk_id, text in chunks:
+                chunk_id = str(chunk_id)
+                if chunk_id in seen:
+                    raise BatchJobError(f"文本块 ID 重复: {chunk_id}")
+                seen.add(chunk_id)
+                request = {
+                    'custom_id': chunk_id,
+                    'method': 'POST',
+                    'url': '/v1/chat/completions',
+                    'body': {
+                        'model': self.model,
+                        'messages': [{'role': 'user', 'content': self.prompt_builder(text)}],
+                        'max_tokens': self.max_tokens,
+                        'temperature': self.temperature,
+                    },
+                }
+                f.write(json.dumps(request, ensure_ascii=False) + '\n')
+                count += 1
+        os.replace(tmp_path, path)
+        self._save_state(phase='prepared', request_count=count)
+        logger.info(f"已写出 {count} 条批处理请求: {path}")
+        return count
+
+    def submit(self) -> str:
+        """上传请求文件并创建任务，返回任务 ID（已提交过则直接返回）"""
+        if self.state.get('batch_id'):
+            return self.state['batch_id']
+        if self.state['phase'] == 'new':
+            raise BatchJobError("请先调用 prepare() 生成请求文件")
+        if not self.state.get('input_file_id'):
+            uploaded = self.client.upload_file(str(self.work_dir / 'requests.jsonl'))
+            self._save_state(input_file_id=uploaded['id'])
+        batch = self.client.create_batch(self.state['input_file_id'],
+                                         metadata={'job': self.work_dir.name})
+        self._save_state(phase='submitted', batch_id=batch['id'], status=batch['status'])
+        logger.info(f"批处理任务已提交: {batch['id']}")
+        return batch['id']
+
+    def poll(self, interval: float = 30.0, timeout: Optional[float] = None,
+             sleep: Callable[[float], None] = time.sleep) -> Dict[str, Any]:
+        """
+        轮询任务直至进入终态
+
+        Returns:
+            任务最终的状态对象
+
+        Raises:
+            BatchJobError: 超时
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            batch = self.client.get_batch(self.state['batch_id'])
+            if batch['status'] != self.state.get('status'):
+                logger.info(f"任务 {batch['id']} 状态: {batch['status']} {batch.get('request_counts', {})}")
+            self._save_state(status=batch['status'],
+                             output_file_id=batch.get('output_file_id'),
+                             error_file_id=batch.get('error_file_id'))
+            if batch['status'] in TERMINAL_STATUSES:
+                return batch
+            if deadline is not None and time.monotonic() >= deadline:
+                raise BatchJobError(f"等待批处理任务超时: {batch['id']}")
+            sleep(interval)
+
+    def download(self) -> None:
+        """下载结果与失败明细"""
+        if self.state['phase'] == 'downloaded':
+            return
+        if self.state.get('status') != 'completed':
+            raise BatchJobError(f"任务未完成，当前状态: {self.state.get('status')}")
+        for key, name in (('output_file_id', 'output.jsonl'), ('error_file_id', 'errors.jsonl')):
+            file_id = self.state.get(key)
+            if file_id:
+                path = self.work_dir / name
+                tmp_path = path.with_suffix('.tmp')
+                tmp_path.write_bytes(self.client.download_file(file_id))
+                os.replace(tmp_path, path)
+        self._save_state(phase='downloaded')
+
+    def results(self) -> Dict[str, Dict[str, Any]]:
+        """
+        读取结果并按文本块 ID 映射
+
+        Returns:
+            {文本块 ID: {'content': 回复文本 或 None, 'error': 错误信息 或 None, 'usage': {...}}}
+        """
+        mapped: Dict[str, Dict[str, Any]] = {}
+        for name in ('output.jsonl', 'errors.jsonl'):
+            path = self.work_dir / name
+            if not path.exists():
+                continue
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    row = json.loads(line)
+                    response = row.get('response') or {}
+                    body = response.get('body') or {}
+                    choices = body.get('choices') or []
+                    error = row.get('error')
+                    if not error and response.get('status_code', 200) != 200:
+                        error = body.get('error') or {'code': response.get('status_code')}
+                    mapped[row['custom_id']] = {
+                        'content': choices[0]['message']['content'] if choices and not error else None,
+                        'error': error,
+                        'usage': body.get('usage'),
+                    }
+        return mapped
+
+    def missing_ids(self) -> List[str]:
+        """返回没有拿到成功结果的文本块 ID（可用于重新提交）"""
+        done = {chunk_id for chunk_id, item in self.results().items() if item['content'] is not None}
+        missing = []
+        with open(self.work_dir / 'requests.jsonl', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    chunk_id = json.loads(line)['custom_id']
+                    if chunk_id not in done:
+                        missing.append(chunk_id)
+        return missing
+
+    def run(self, chunks: Optional[Iterable[Tuple[str, str]]] = None, poll_interval: float = 30.0,
+            timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        执行（或恢复）完整流程：prepare -> submit -> poll -> download -> results
+
+        Args:
+            chunks: 首次运行时提供文本块；恢复运行时可省略
+            poll_interval: 轮询间隔秒数
+            timeout: 轮询超时秒数
+
+        Returns:
+            按文本块 ID 映射的结果
+        """
+        if self.state['phase'] == 'new':
+            if chunks is None:
+                raise BatchJobError("首次运行需要提供文本块")
+            self.prepare(chunks)
+        if self.state['phase'] != 'downloaded':
+            self.submit()
+            batch = self.poll(interval=poll_interval, timeout=timeout)
+            if batch['status'] != 'completed':
+                raise BatchJobError(f"批处理任务未成功完成: {batch['status']}")
+            self.download()
+        return self.results()
@@ -0,0 +1,229 @@
+"""
+流式批量写入模块
+
+面向整批回溯导入（数十万条灵感记录）的高吞吐写入，替代逐条校验、逐条插入的 save_batch：
+- 接受任意可迭代对象（生成器、逐行读取的 JSONL 等），按块消费，不需要一次性构建列表
+- 每块按列整体校验，而不是逐条调用校验函数：整列先走一次 C 层面的快速检查
+  （类型集合、str.strip、整列正则），只有快速检查失败的列才逐条定位非法记录
+- 每块在一个 BEGIN IMMEDIATE 事务内用 executemany 插入，块大小可配置；块之间释放写连接，
+  默认块大小（DEFAULT_BATCH_SIZE）使单个事务只持有写锁约百毫秒，交互式写入不会被整批导入阻塞
+- 返回 ID 区间而不是逐条 ID 列表（同一事务内由写连接独占插入，自增 ID 连续）
+- 数据库启用压缩（见 compression 模块）时，raw_text 在插入前按块压缩
+"""
+
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from itertools import compress, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .compression import get_compressor
+from .db_pool import ConnectionPool, get_pool
+from .errors import DatabaseError, ValidationError
+
+logger = logging.getLogger(__name__)
+
+# 每个写事务的默认行数；更大的块吞吐提升有限，却会让其他写入排队等待整块提交
+DEFAULT_BATCH_SIZE = 5000
+
+REQUIRED_FIELDS = ('source_file', 'raw_text', 'idea')
+OPTIONAL_FIELDS = ('chapter', 'tags', 'created_at')
+CREATED_AT_FORMAT = 'YYYY-MM-DD HH:MM:SS'
+_CREATED_AT = r'\d{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12]\d|3[01]) (?:[01]\d|2[0-3]):[0-5]\d:[0-5]\d'
+_CREATED_AT_RE = re.compile(_CREATED_AT)
+# 整列以换行拼接后一次匹配；换行数与行数不符（值本身含换行）时转入逐条检查
+_CREATED_AT_COLUMN_RE = re.compile(f'(?:{_CREATED_AT}\n)*{_CREATED_AT}')
+INSERT_SQL = (
+    "INSERT INTO inspirations (source_file, chapter, raw_text, idea, tags, created_at) "
+    "VALUES (?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))"
+)
+
+
+@dataclass
+class BulkWriteResult:
+    """批量写入结果"""
+    id_ranges: List[Tuple[int, int]] = field(default_factory=list)
+    inserted: int = 0
+    skipped: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def ids(self) -> Iterator[int]:
+        """逐个展开 ID（仅在确实需要逐条 ID 时使用）"""
+        for first, last in self.id_ranges:
+            yield from range(first, last + 1)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.inserted / self.elapsed if self.elapsed else 0.0
+
+
+def _tags_to_text(tags: Any) -> Optional[str]:
+    if tags is None or isinstance(tags, str):
+        return tags
+    return ','.join(str(tag).strip() for tag in tags if str(tag).strip())
+
+
+def _is_text(value: Any) -> bool:
+    return isinstance(value, str) and bool(value.strip())
+
+
+def validate_chunk(records: List[Dict[str, Any]], offset: int = 0) -> Tuple[List[tuple], List[Tuple[int, str]]]:
+    """
+    按列校验一块记录
+
+    Args:
+        records: 记录字典列表
+        offset: 该块第一条记录在整个输入中的序号（用于错误定位）
+
+    Returns:
+        (可插入的参数元组列表, [(序号, 错误信息)])
+    """
+    bad: Dict[int, str] = {}
+    rows = records
+    if set(map(type, records)) - {dict}:
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                bad[i] = "记录必须是字典"
+        rows = [record if isinstance(record, dict) else {} for record in records]
+
+    columns = {name: [row.get(name) for row in rows] for name in REQUIRED_FIELDS + OPTIONAL_FIELDS}
+    for name in REQUIRED_FIELDS:
+        column = columns[name]
+        if set(map(type, column)) == {str} and all(map(str.strip, column)):
+            continue
+        for i, value in enumerate(column):
+            if i not in bad and not _is_text(value):
+                bad[i] = f"字段 {name} 不能为空"
+
+    chapters = columns['chapter']
+    if set(map(type, chapters)) - {str, type(None)}:
+        chapters = [value if value is None or isinstance(value, str) else str(value) for value in chapters]
+    tags = columns['tags']
+    if set(map(type, tags)) - {str, type(None)}:
+        tags = list(map(_tags_to_text, tags))
+
+    created_at = columns['created_at']
+    if set(map(type, created_at)) - {str, type(None)}:
+        created_at = [None if value is None else str(value) for value in created_at]
+    given = [value for value in created_at if value is not None]
+    joined = '\n'.join(given)
+    if given and (joined.count('\n') != len(given) - 1 or not _CREATED_AT_COLUMN_RE.fullmatch(joined)):
+        for i, value in enumerate(created_at):
+            if i not in bad and value is not None and not _CREATED_AT_RE.fullmatch(value):
+                bad[i] = f"字段 created_at 格式应为 {CREATED_AT_FORMAT}: {value!r}"
+
+    params = list(zip(columns['source_file'], chapters, columns['raw_text'], columns['idea'], tags, created_at))
+    if bad:
+        params = list(compress(params, [i not in bad for i in range(len(params))]))
+    errors = [(offset + i, message) for i, message in sorted(bad.items())]
+    return params, errors
+
+
+class BulkWriter:
+    """流式批量写入器"""
+
+    def __init__(self, pool: ConnectionPool, batch_size: int = DEFAULT_BATCH_SIZE, on_error: str = 'raise'):
+        """
+        初始化写入器
+
+        Args:
+            pool: 数据库连接池
+            batch_size: 每个事务插入的记录数
+            on_error: 'raise' 遇到非法记录时抛出 ValidationError（该块不写入）；
+                      'skip' 跳过非法记录并记入结果
+        """
+        if batch_size <= 0:
+            raise ValueError("batch_size 必须大于 0")
+        if on_error not in ('raise', 'skip'):
+            raise ValueError(f"不支持的 on_error: {on_error}")
+        self.pool = pool
+        self.batch_size = batch_size
+        self.on_error = on_error
+
+    def _insert(self, params: List[tuple]) -> Tuple[int, int]:
+        compressor = get_compressor(self.pool)
+        if compressor.enabled:
+            raw_texts = compressor.compress_many(row[2] for row in params)
+            params = [row[:2] + (raw_text,) + row[3:] for row, raw_text in zip(params, raw_texts)]
+        with self.pool.writer() as conn:
+            conn.executemany(INSERT_SQL, params)
+            last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            first = last - len(params) + 1
+            # 写连接独占事务时 ID 连续；用区间计数确认，防止有人手工插入了更大的 ID
+            count = conn.execute(
+                "SELECT COUNT(*) FROM inspirations WHERE id BETWEEN ? AND ?", (first, last)).fetchone()[0]
+            if count != len(params):
+                raise DatabaseError(f"批量插入的 ID 不连续（{first}-{last}），已回滚")
+        return first, last
+
+    def _record(self, result: BulkWriteResult, first: int, last: int) -> None:
+        if result.id_ranges and result.id_ranges[-1][1] + 1 == first:
+            result.id_ranges[-1] = (result.id_ranges[-1][0], last)
+        else:
+            result.id_ranges.append((first, last))
+        result.inserted += last - first + 1
+
+    def write(self, records: Iterable[Dict[str, Any]]) -> BulkWriteResult:
+        """
+        写入记录流
+
+        Args:
+            records: 记录字典的可迭代对象，字段与 save_batch 相同；tags 可以是字符串或列表，
+                     可选的 created_at（'YYYY-MM-DD HH:MM:SS'）用于导入历史数据，缺省为当前时间
+
+        Returns:
+            BulkWriteResult，包含 ID 区间与统计
+
+        Raises:
+            ValidationError: on_error 为 'raise' 且存在非法记录（此前的块已提交）
+            DatabaseError: 写入失败
+        """
+        result = BulkWriteResult()
+        start = time.perf_counter()
+        iterator = iter(records)
+        offset = 0
+        while True:
+            chunk = list(islice(iterator, self.batch_size))
+            if not chunk:
+                break
+            params, errors = validate_chunk(chunk, offset)
+            offset += len(chunk)
+            if errors:
+                if self.on_error == 'raise':
+                    index, message = errors[0]
+                    raise ValidationError(f"第 {index} 条记录非法: {message}（共 {len(errors)} 条非法）")
+                result.errors.extend(errors)
+                result.skipped += len(errors)
+            if not params:
+                continue
+            try:
+                first, last = self._insert(params)
+            except DatabaseError:
+                raise
+            except Exception as e:
+                raise DatabaseError(f"批量写入失败: {e}")
+            self._record(result, first, last)
+            logger.debug(f"已写入 {result.inserted} 条记录")
+        result.elapsed = time.perf_counter() - start
+        logger.info(f"批量写入 {result.inserted} 条记录，跳过 {result.skipped} 条，"
+                    f"{result.rows_per_second:.0f} 条/秒")
+        return result
+
+
+def bulk_save(records: Iterable[Dict[str, Any]], db_path: str, batch_size: int = DEFAULT_BATCH_SIZE,
+              on_error: str = 'raise') -> BulkWriteResult:
+    """
+    流式批量保存灵感记录（save_batch 的高吞吐版本）
+
+    Args:
+        records: 记录字典的可迭代对象
+        db_path: 数据库文件路径
+        batch_size: 每个事务插入的记录数
+        on_error: 'raise' 或 'skip'
+
+    Returns:
+        BulkWriteResult
+    """
+    return BulkWriter(get_pool(db_path), batch_size=batch_size, on_error=on_error).write(records)
@@ -0,0 +1,214 @@
+"""
+列式导入导出模块
+
+把 inspirations 表按批流式导出为 Parquet 或 Arrow IPC 文件，供分析团队直接用
+pandas / polars / DuckDB 读取；也支持从这两种文件批量导入（恢复、迁移）。
+
+导出按 id 键集分页读取，每批转换为一个 RecordBatch 后立即写出；导入按文件中的
+RecordBatch 逐批写入。两个方向的内存占用都只与 batch_size 有关，与表大小无关。
+
+依赖 pyarrow（可选，未安装时调用会抛出 ColumnarIOError）。
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from .compression import get_compressor
+from .db_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    pa = None
+    pa_ipc = None
+    pq = None
+    PYARROW_AVAILABLE = False
+
+COLUMNS = ('id', 'source_file', 'chapter', 'raw_text', 'idea', 'tags', 'created_at')
+FORMATS = ('parquet', 'arrow')
+
+
+class ColumnarIOError(Exception):
+    """列式导入导出错误"""
+    pass
+
+
+def _require_pyarrow() -> None:
+    if not PYARROW_AVAILABLE:
+        raise ColumnarIOError("pyarrow 未安装，请先执行 pip install pyarrow")
+
+
+def arrow_schema():
+    """inspirations 表对应的 Arrow schema（created_at 保持 SQLite 中的文本格式）"""
+    _require_pyarrow()
+    return pa.schema([
+        pa.field('id', pa.int64(), nullable=False),
+        pa.field('source_file', pa.string(), nullable=False),
+        pa.field('chapter', pa.string()),
+        pa.field('raw_text', pa.string(), nullable=False),
+        pa.field('idea', pa.string(), nullable=False),
+        pa.field('tags', pa.string()),
+        pa.field('created_at', pa.string()),
+    ])
+
+
+def _format_of(path: str, format: Optional[str]) -> str:
+    if format is None:
+        format = 'arrow' if os.path.splitext(path)[1].lower() in ('.arrow', '.feather', '.ipc') else 'parquet'
+    if format not in FORMATS:
+        raise ColumnarIOError(f"不支持的格式: {format}")
+    return format
+
+
+def iter_record_batches(db_path: str, batch_size: int = 65536) -> Iterator['pa.RecordBatch']:
+    """
+    按 id 升序流式读取 inspirations 表
+
+    Args:
+        db_path: 数据库文件路径
+        batch_size: 每批行数
+
+    Yields:
+        RecordBatch
+    """
+    _require_pyarrow()
+    if db_path != ':memory:' and not os.path.exists(db_path):
+        raise ColumnarIOError(f"数据库文件不存在: {db_path}")
+    schema = arrow_schema()
+    pool = get_pool(db_path)
+    compressor = get_compressor(pool)
+    raw_text_index = COLUMNS.index('raw_text')
+    last_id = None
+    while True:
+        with pool.reader() as conn:
+            if last_id is None:
+                rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM inspirations ORDER BY id LIMIT ?",
+                                    (batch_size,)).fetchall()
+            else:
+                rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM inspirations WHERE id > ? "
+                                    "ORDER BY id LIMIT ?", (last_id, batch_size)).fetchall()
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        columns[raw_text_index] = compressor.decompress_many(columns[raw_text_index])
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema)
+        last_id = rows[-1][0]
+        if len(rows) < batch_size:
+            return
+
+
+def export_table(db_path: str, output_path: str, format: Optional[str] = None,
+                 batch_size: int = 65536, compression: str = 'zstd') -> int:
+    """
+    导出 inspirations 表
+
+    Args:
+        db_path: 数据库文件路径
+        output_path: 输出文件路径
+        format: 'parquet' 或 'arrow'，None 时按扩展名判断（.arrow/.feather/.ipc 为 Arrow，其余为 Parquet）
+        batch_size: 每批行数（Parquet 中每批为一个 row group）
+        compression: 压缩算法（Parquet 支持 zstd/snappy/gzip/none，Arrow IPC 支持 zstd/lz4/none）
+
+    Returns:
+        导出的行数
+    """
+    _require_pyarrow()
+    format = _format_of(output_path, format)
+    schema = arrow_schema()
+    codec = None if compression in (None, 'none') else compression
+    tmp_path = output_path + '.tmp'
+    start = time.perf_counter()
+    total = 0
+    try:
+        if format == 'parquet':
+            writer = pq.ParquetWriter(tmp_path, schema, compression=codec or 'none')
+        else:
+            options = pa_ipc.IpcWriteOptions(compression=codec)
+            writer = pa_ipc.new_file(tmp_path, schema, options=options)
+        with writer:
+            for batch in iter_record_batches(db_path, batch_size):
+                if format == 'parquet':
+                    writer.write_batch(batch, row_group_size=batch_size)
+                else:
+                    writer.write_batch(batch)
+                total += batch.num_rows
+        os.replace(tmp_path, output_path)
+    except (OSError, pa.ArrowException) as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise ColumnarIOError(f"导出失败: {e}")
+    logger.info(f"已导出 {total} 条记录到 {output_path}（{format}，{time.perf_counter() - start:.1f} 秒）")
+    return total
+
+
+def _iter_file_batches(input_path: str, format: str, batch_size: int) -> Iterator['pa.RecordBatch']:
+    if format == 'parquet':
+        parquet_file = pq.ParquetFile(input_path)
+        yield from parquet_file.iter_batches(batch_size=batch_size)
+    else:
+        with pa.memory_map(input_path) as source:
+            reader = pa_ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                yield reader.get_batch(index)
+
+
+def import_table(input_path: str, db_path: str, format: Optional[str] = None, batch_size: int = 65536,
+                 preserve_ids: bool = True) -> int:
+    """
+    从 Parquet / Arrow 文件批量导入 inspirations 表
+
+    Args:
+        input_path: 输入文件路径
+        db_path: 目标数据库文件路径（不存在时创建）
+        format: 'parquet' 或 'arrow'，None 时按扩展名判断
+        batch_size: 每个写事务的行数（Parquet 按此大小读取）
+        preserve_ids: 保留文件中的 id 与 created_at（恢复场景）；False 时重新分配 id（合并场景）
+
+    Returns:
+        导入的行数
+
+    Raises:
+        ColumnarIOError: 文件缺少必需列、id 冲突等
+    """
+    _require_pyarrow()
+    if not os.path.exists(input_path):
+        raise ColumnarIOError(f"输入文件不存在: {input_path}")
+    format = _format_of(input_path, format)
+    columns: List[str] = list(COLUMNS if preserve_ids else COLUMNS[1:])
+    # created_at 缺失时使用与列默认值相同的 CURRENT_TIMESTAMP
+    placeholders = ', '.join(['?'] * (len(columns) - 1) + ['COALESCE(?, CURRENT_TIMESTAMP)'])
+    sql = f"INSERT INTO inspirations ({', '.join(columns)}) VALUES ({placeholders})"
+    pool = get_pool(db_path)
+    compressor = get_compressor(pool)
+    start = time.perf_counter()
+    total = 0
+    try:
+        for batch in _iter_file_batches(input_path, format, batch_size):
+            missing = [name for name in ('source_file', 'raw_text', 'idea') if name not in batch.schema.names]
+            if missing:
+                raise ColumnarIOError(f"文件缺少必需列: {', '.join(missing)}")
+            data: Dict[str, List[Any]] = {
+                name: (batch.column(name).to_pylist() if name in batch.schema.names else [None] * batch.num_rows)
+                for name in columns
+            }
+            data['raw_text'] = compressor.compress_many(data['raw_text'])
+            if 'created_at' in data:
+                data['created_at'] = [str(value) if value is not None else None for value in data['created_at']]
+            with pool.writer() as conn:
+                conn.executemany(sql, zip(*(data[name] for name in columns)))
+            total += batch.num_rows
+    except sqlite3.IntegrityError as e:
+        raise ColumnarIOError(f"导入失败（已导入 {total} 条）: {e}")
+    except (OSError, pa.ArrowException) as e:
+        raise ColumnarIOError(f"读取文件失败（已导入 {total} 条）: {e}")
+    logger.info(f"已从 {input_path} 导入 {total} 条记录（{time.perf_counter() - start:.1f} 秒）")
+    return total
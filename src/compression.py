@@ -0,0 +1,381 @@
+"""
+文本列透明压缩模块
+
+raw_text 等大文本列可以压缩后以 BLOB 存储，读取时自动解压，调用方看到的仍是字符串。
+压缩使用按数据库训练的共享字典：同一本书、同一类题材的文本块之间重复片段很多，
+单条压缩时借助字典也能获得接近整库压缩的比例。
+
+- 编码格式：b'IZ' + 编解码器（b'z' zlib / b's' zstd）+ 字典 ID（4 字节小端）+ 压缩数据
+- 短于 min_size 字节的文本与未启用压缩时写入的旧数据保持 TEXT 原样，读取时原样返回
+- 字典存放在库内的 compression_dicts 表（schema_migrations 迁移 3），库文件自包含
+- 默认 zlib（标准库，zdict 最多使用 32 KB）；安装 zstandard 后可选 zstd
+
+读取 raw_text 的代码必须经过解压：Python 中使用 decode_records / decompress_many；
+SQL 中需要匹配原文时使用本模块注册到每个连接上的 iz_text() 函数（见 TextCompressor.sql_expr），
+例如 LIKE 检索写作 iz_text(raw_text) LIKE ?。启用压缩后直接 SELECT raw_text 会得到压缩后的
+BLOB，因此压缩默认关闭，需要用 python -m src.compression 显式启用。
+"""
+
+import argparse
+import logging
+import random
+import struct
+import threading
+import weakref
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+from .db_pool import ConnectionPool, get_pool, register_connection_hook
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+MAGIC = b'IZ'
+CODECS = {'zlib': b'z', 'zstd': b's'}
+_HEADER = struct.Struct('<2sc I')
+COMPRESSED_COLUMNS = ('raw_text',)
+ZLIB_MAX_DICT = 32 * 1024
+
+
+class CompressionError(Exception):
+    """压缩相关错误"""
+    pass
+
+
+def train_zlib_dictionary(samples: Sequence[str], dict_size: int = ZLIB_MAX_DICT,
+                          ngram_sizes: Sequence[int] = (16, 8, 4)) -> bytes:
+    """
+    从样本文本训练 zlib 预置字典
+
+    统计各长度字符 n-gram 在多少条样本中出现，长片段优先、按出现样本数选取片段拼接；
+    zlib 对靠近字典末尾的内容编码更短，因此最常见的片段放在最后。
+
+    Args:
+        samples: 样本文本
+        dict_size: 字典字节数上限（zlib 最多使用 32 KB）
+        ngram_sizes: 统计的 n-gram 长度，长片段优先
+
+    Returns:
+        字典字节串
+    """
+    dict_size = min(dict_size, ZLIB_MAX_DICT)
+    chosen: List[bytes] = []
+    longer = ''
+    size = 0
+    for n in ngram_sizes:
+        counts: Counter = Counter()
+        for text in samples:
+            counts.update({text[i:i + n] for i in range(0, max(len(text) - n + 1, 0), max(n // 4, 1))})
+        picked = []
+        for gram, count in counts.most_common():
+            if count < 2 or size >= dict_size:
+                break
+            # 已被更长片段包含的不再重复收录
+            if gram in longer:
+                continue
+            encoded = gram.encode('utf-8')
+            chosen.append(encoded)
+            picked.append(gram)
+            size += len(encoded)
+        longer += '\x00' + '\x00'.join(picked)
+    # most_common 为降序，反转后最常见的片段位于字典末尾
+    return b''.join(reversed(chosen))[-dict_size:]
+
+
+class TextCompressor:
+    """单个数据库的文本压缩器"""
+
+    def __init__(self, pool: ConnectionPool, min_size: int = 256):
+        """
+        初始化压缩器
+
+        Args:
+            pool: 数据库连接池
+            min_size: 小于该字节数的文本不压缩
+        """
+        self.pool = pool
+        self.min_size = min_size
+        self._dicts: Dict[int, tuple] = {}
+        self._active: Optional[int] = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> None:
+        """从库中重新读取字典与当前生效的字典（compression_dicts 表由连接池创建时的迁移建立）"""
+        with self.pool.reader() as conn:
+            rows = conn.execute("SELECT id, codec, level, data, active FROM compression_dicts").fetchall()
+        with self._lock:
+            self._dicts = {row[0]: (row[1], row[2], row[3]) for row in rows}
+            active = [row[0] for row in rows if row[4]]
+            self._active = active[-1] if active else None
+
+    @property
+    def enabled(self) -> bool:
+        return self._active is not None
+
+    @property
+    def in_use(self) -> bool:
+        """库中是否可能存在压缩数据（训练过字典，即使已停用）"""
+        if not self._dicts:
+            # 压缩可能已由其他进程（命令行）启用；字典只增不删，一旦存在就不必再查
+            with self.pool.reader() as conn:
+                trained = conn.execute("SELECT 1 FROM compression_dicts LIMIT 1").fetchone() is not None
+            if trained:
+                self.reload()
+        return bool(self._dicts)
+
+    def sql_expr(self, column: str = 'raw_text') -> str:
+        """
+        在 SQL 中引用压缩列原文的表达式
+
+        未使用过压缩的库直接返回列名，不产生逐行调用 Python 函数的开销；
+        此时每次调用都会重新查询字典表，其他进程启用压缩后立即改用 iz_text。
+        """
+        return f"iz_text({column})" if self.in_use else column
+
+    # ---- 字典管理 ----
+
+    def train(self, codec: str = 'zlib', level: int = 3, sample_size: int = 2000,
+              dict_size: int = ZLIB_MAX_DICT) -> int:
+        """
+        用库中已有的 raw_text 采样训练字典并设为生效字典
+
+        Args:
+            codec: 'zlib' 或 'zstd'
+            level: 压缩级别
+            sample_size: 采样条数
+            dict_size: 字典字节数上限
+
+        Returns:
+            新字典 ID
+        """
+        if codec not in CODECS:
+            raise CompressionError(f"不支持的压缩算法: {codec}")
+        if codec == 'zstd' and not ZSTD_AVAILABLE:
+            raise CompressionError("zstandard 未安装，请使用 zlib 或先执行 pip install zstandard")
+        samples = self._sample(sample_size)
+        if codec == 'zlib':
+            data = train_zlib_dictionary(samples, dict_size)
+        else:
+            try:
+                data = zstandard.train_dictionary(dict_size, [text.encode('utf-8') for text in samples]).as_bytes()
+            except zstandard.ZstdError as e:
+                raise CompressionError(f"训练 zstd 字典失败（样本可能过少）: {e}")
+        with self.pool.writer() as conn:
+            conn.execute("UPDATE compression_dicts SET active = 0")
+            cursor = conn.execute(
+                "INSERT INTO compression_dicts (codec, level, data, active) VALUES (?, ?, ?, 1)",
+                (codec, level, data))
+            dict_id = cursor.lastrowid
+        self.reload()
+        logger.info(f"已训练压缩字典 {dict_id}（{codec}，{len(data)} 字节，{len(samples)} 条样本）")
+        return dict_id
+
+    def disable(self) -> None:
+        """停止压缩新写入的文本（已压缩的数据仍可读取）"""
+        with self.pool.writer() as conn:
+            conn.execute("UPDATE compression_dicts SET active = 0")
+        self.reload()
+
+    def _sample(self, sample_size: int) -> List[str]:
+        with self.pool.reader() as conn:
+            bounds = conn.execute("SELECT MIN(id), MAX(id), COUNT(*) FROM inspirations").fetchone()
+            if not bounds[2]:
+                return []
+            if bounds[2] <= sample_size:
+                values = [row[0] for row in conn.execute("SELECT raw_text FROM inspirations")]
+            else:
+                # 按 id 随机抽样，避免 ORDER BY random() 全表排序
+                ids = random.sample(range(bounds[0], bounds[1] + 1), min(sample_size * 2, bounds[1] - bounds[0] + 1))
+                values = []
+                for start in range(0, len(ids), 500):
+                    chunk = ids[start:start + 500]
+                    values.extend(row[0] for row in conn.execute(
+                        f"SELECT raw_text FROM inspirations WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+                values = values[:sample_size]
+        return self.decompress_many(values)
+
+    # ---- 压缩 / 解压 ----
+
+    def compress(self, text: Optional[str]) -> Union[str, bytes, None]:
+        return self.compress_many([text])[0]
+
+    def compress_many(self, texts: Iterable[Optional[str]]) -> List[Union[str, bytes, None]]:
+        """批量压缩；未启用压缩或文本过短时原样返回"""
+        dict_id = self._active
+        texts = list(texts)
+        if dict_id is None:
+            return texts
+        codec, level, data = self._dicts[dict_id]
+        header = _HEADER.pack(MAGIC, CODECS[codec], dict_id)
+        if codec == 'zlib':
+            # 预置字典的初始化开销与压缩本身相当，每批只做一次，逐条复制已载入字典的状态
+            base = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=data) if data else \
+                zlib.compressobj(level, zlib.DEFLATED, -15)
+        else:
+            compressor = zstandard.ZstdCompressor(level=level, dict_data=zstandard.ZstdCompressionDict(data))
+        results: List[Union[str, bytes, None]] = []
+        for text in texts:
+            if text is None:
+                results.append(None)
+                continue
+            raw = text.encode('utf-8')
+            if len(raw) < self.min_size:
+                results.append(text)
+                continue
+            if codec == 'zlib':
+                obj = base.copy()
+                payload = obj.compress(raw) + obj.flush()
+            else:
+                payload = compressor.compress(raw)
+            results.append(header + payload if len(payload) + _HEADER.size < len(raw) else text)
+        return results
+
+    def decompress(self, value: Any) -> Optional[str]:
+        return self.decompress_many([value])[0]
+
+    def decompress_many(self, values: Iterable[Any]) -> List[Optional[str]]:
+        """批量解压；非压缩格式的值原样（bytes 按 UTF-8）返回"""
+        results: List[Optional[str]] = []
+        zstd_decompressors: Dict[int, Any] = {}
+        for value in values:
+            if not isinstance(value, (bytes, memoryview)):
+                results.append(value)
+                continue
+            value = bytes(value)
+            if len(value) < _HEADER.size or value[:2] != MAGIC:
+                results.append(value.decode('utf-8', errors='replace'))
+                continue
+            _, codec_byte, dict_id = _HEADER.unpack_from(value)
+            if dict_id not in self._dicts:
+                self.reload()
+                if dict_id not in self._dicts:
+                    raise CompressionError(f"缺少压缩字典 {dict_id}")
+            codec, _, data = self._dicts[dict_id]
+            payload = value[_HEADER.size:]
+            if codec_byte == CODECS['zlib']:
+                obj = zlib.decompressobj(-15, zdict=data) if data else zlib.decompressobj(-15)
+                raw = obj.decompress(payload) + obj.flush()
+            elif codec_byte == CODECS['zstd']:
+                if not ZSTD_AVAILABLE:
+                    raise CompressionError("数据使用 zstd 压缩，需要安装 zstandard")
+                decompressor = zstd_decompressors.get(dict_id)
+                if decompressor is None:
+                    decompressor = zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(data))
+                    zstd_decompressors[dict_id] = decompressor
+                raw = decompressor.decompress(payload)
+            else:
+                raise CompressionError(f"未知的压缩格式: {codec_byte!r}")
+            results.append(raw.decode('utf-8'))
+        return results
+
+    def decode_records(self, records: List[Dict[str, Any]],
+                       columns: Sequence[str] = COMPRESSED_COLUMNS) -> List[Dict[str, Any]]:
+        """按列批量解压记录字典（原地修改并返回）"""
+        for column in columns:
+            if any(isinstance(record.get(column), bytes) for record in records):
+                for record, text in zip(records, self.decompress_many(record.get(column) for record in records)):
+                    record[column] = text
+        return records
+
+    def recompress(self, batch_size: int = 2000) -> int:
+        """
+        用当前生效字典重写已有数据（启用压缩或更换字典后执行）
+
+        Returns:
+            改写的行数
+        """
+        changed = 0
+        last_id = 0
+        while True:
+            with self.pool.writer() as conn:
+                rows = conn.execute("SELECT id, raw_text FROM inspirations WHERE id > ? ORDER BY id LIMIT ?",
+                                    (last_id, batch_size)).fetchall()
+                if not rows:
+                    return changed
+                texts = self.decompress_many(row[1] for row in rows)
+                updates = [(new, row[0]) for row, new in zip(rows, self.compress_many(texts)) if new != row[1]]
+                conn.executemany("UPDATE inspirations SET raw_text = ? WHERE id = ?", updates)
+            changed += len(updates)
+            last_id = rows[-1][0]
+
+
+def _register_sql_function(conn, role: str) -> None:
+    """连接钩子：注册 iz_text(value)，在 SQL 中把压缩列还原为文本"""
+    row = conn.execute("PRAGMA database_list").fetchone()
+    db_path = row[2] if row is not None and row[2] else ':memory:'
+
+    def iz_text(value: Any) -> Any:
+        if not isinstance(value, bytes) or value[:2] != MAGIC:
+            return value
+        return get_compressor(get_pool(db_path)).decompress(value)
+
+    conn.create_function('iz_text', 1, iz_text, deterministic=True)
+
+
+register_connection_hook(_register_sql_function)
+
+_compressors: 'weakref.WeakKeyDictionary[ConnectionPool, TextCompressor]' = weakref.WeakKeyDictionary()
+_compressors_lock = threading.Lock()
+
+
+def get_compressor(pool: ConnectionPool) -> TextCompressor:
+    """获取连接池对应的压缩器（读路径解压与写路径压缩共用）"""
+    with _compressors_lock:
+        compressor = _compressors.get(pool)
+        if compressor is None:
+            compressor = TextCompressor(pool)
+            _compressors[pool] = compressor
+        return compressor
+
+
+def enable_compression(db_path: str, codec: str = 'zlib', level: int = 3, sample_size: int = 2000,
+                       min_size: int = 256, rewrite_existing: bool = True) -> Dict[str, Any]:
+    """
+    为数据库启用压缩：训练字典，并（可选）重写已有数据
+
+    Returns:
+        {'dict_id', 'rewritten', 'bytes_before', 'bytes_after'}
+    """
+    pool = get_pool(db_path)
+    compressor = get_compressor(pool)
+    compressor.min_size = min_size
+
+    def stored_bytes() -> int:
+        with pool.reader() as conn:
+            return conn.execute("SELECT COALESCE(SUM(length(CAST(raw_text AS BLOB))), 0) "
+                                "FROM inspirations").fetchone()[0]
+
+    before = stored_bytes()
+    dict_id = compressor.train(codec=codec, level=level, sample_size=sample_size)
+    rewritten = compressor.recompress() if rewrite_existing else 0
+    return {'dict_id': dict_id, 'rewritten': rewritten, 'bytes_before': before, 'bytes_after': stored_bytes()}
+
+
+def main():
+    """命令行入口：为已有数据库启用压缩"""
+    parser = argparse.ArgumentParser(description="为灵感数据库启用 raw_text 透明压缩")
+    parser.add_argument('db_path', help='数据库文件路径')
+    parser.add_argument('--codec', choices=list(CODECS), default='zlib', help='压缩算法')
+    parser.add_argument('--level', type=int, default=3, help='压缩级别')
+    parser.add_argument('--min-size', type=int, default=256, help='小于该字节数的文本不压缩')
+    parser.add_argument('--no-rewrite', action='store_true', help='只对之后写入的数据生效，不改写已有数据')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    result = enable_compression(args.db_path, codec=args.codec, level=args.level, min_size=args.min_size,
+                                rewrite_existing=not args.no_rewrite)
+    ratio = result['bytes_after'] / result['bytes_before'] if result['bytes_before'] else 1.0
+    print(f"✅ 已启用压缩（字典 {result['dict_id']}），改写 {result['rewritten']} 条记录，"
+          f"raw_text 体积 {result['bytes_before']} -> {result['bytes_after']} 字节（{ratio:.1%}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+SQLite 连接池模块
+
+为 InspirationDatabase 与检索函数提供复用的连接，替代每次调用都新建连接的方式：
+- 每个数据库文件一个专用写连接（串行化写入）和一个只读连接池
+- WAL 日志模式，读不阻塞写、写不阻塞读
+- 调优的 synchronous / cache_size / mmap_size 等 PRAGMA
+- 建表检查与结构迁移（schema_migrations）在连接池创建时执行一次，读路径不再触发写事务
+
+模块级的 get_pool(db_path) 按文件路径缓存连接池，供 save_inspiration、search_* 等
+模块级函数直接复用。
+"""
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Type
+
+from .errors import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS inspirations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_file TEXT NOT NULL,
+    chapter TEXT,
+    raw_text TEXT NOT NULL,
+    idea TEXT NOT NULL,
+    tags TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -65536,        # 64 MB（负数表示 KB）
+    'mmap_size': 268435456,      # 256 MB
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+    'foreign_keys': 'ON',
+}
+
+# 每个新连接创建后依次调用的钩子（例如查询统计插桩）
+ConnectionHook = Callable[[sqlite3.Connection, str], None]
+_connection_hooks: List[ConnectionHook] = []
+
+
+def register_connection_hook(hook: ConnectionHook) -> None:
+    """注册新连接钩子，参数为 (连接, 角色 'writer' / 'reader')"""
+    if hook not in _connection_hooks:
+        _connection_hooks.append(hook)
+
+
+# 新连接使用的 sqlite3.Connection 子类（例如带语句计时的连接）
+_connection_factory: Type[sqlite3.Connection] = sqlite3.Connection
+
+
+def set_connection_factory(factory: Type[sqlite3.Connection]) -> None:
+    """设置新连接使用的连接类，只影响之后创建的连接"""
+    global _connection_factory
+    _connection_factory = factory
+
+
+class ConnectionPool:
+    """单个数据库文件的写连接 + 读连接池"""
+
+    def __init__(self, db_path: str, max_readers: int = 4,
+                 pragmas: Optional[Dict[str, object]] = None, timeout: float = 30.0):
+        """
+        初始化连接池
+
+        Args:
+            db_path: 数据库文件路径
+            max_readers: 只读连接的最大数量
+            pragmas: 覆盖默认 PRAGMA 设置
+            timeout: 获取连接/等待锁的超时秒数
+        """
+        self.db_path = db_path
+        self.max_readers = max_readers
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        self.pragmas.update(pragmas or {})
+        self.timeout = timeout
+        self._memory = db_path == ':memory:'
+        self._write_lock = threading.RLock()
+        self._readers: 'queue.Queue[sqlite3.Connection]' = queue.Queue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+        self._all: List[sqlite3.Connection] = []
+        self._closed = False
+
+        directory = os.path.dirname(os.path.abspath(db_path)) if not self._memory else None
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self._writer = self._connect('writer')
+        self._writer.executescript(SCHEMA_SQL)
+        # schema_migrations 依赖本模块，在此处导入避免循环引用
+        from .schema_migrations import migrate
+        migrate(self)
+
+    def _connect(self, role: str) -> sqlite3.Connection:
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False,
+                                   isolation_level=None, factory=_connection_factory)
+        except sqlite3.Error as e:
+            raise DatabaseError(f"无法打开数据库 {self.db_path}: {e}")
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            if self._memory and name in ('journal_mode', 'mmap_size'):
+                continue
+            conn.execute(f"PRAGMA {name}={value}")
+        if role == 'reader':
+            conn.execute("PRAGMA query_only=ON")
+        for hook in _connection_hooks:
+            hook(conn, role)
+        self._all.append(conn)
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        获取写连接并开启事务（BEGIN IMMEDIATE），正常退出时提交，异常时回滚
+        """
+        if self._closed:
+            raise DatabaseError("连接池已关闭")
+        if not self._write_lock.acquire(timeout=self.timeout):
+            raise DatabaseError("等待写连接超时")
+        try:
+            conn = self._writer
+            nested = conn.in_transaction
+            if not nested:
+                conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                if not nested and conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            else:
+                if not nested and conn.in_transaction:
+                    conn.execute("COMMIT")
+        finally:
+            self._write_lock.release()
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """获取只读连接，使用完毕后归还连接池"""
+        if self._closed:
+            raise DatabaseError("连接池已关闭")
+        if self._memory or self.max_readers <= 0:
+            # 内存数据库无法跨连接共享，读操作复用写连接
+            with self._write_lock:
+                yield self._writer
+            return
+
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self._readers.put(conn)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._reader_lock:
+            if self._reader_count < self.max_readers:
+                self._reader_count += 1
+                return self._connect('reader')
+        try:
+            return self._readers.get(timeout=self.timeout)
+        except queue.Empty:
+            raise DatabaseError("等待只读连接超时")
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'db_path': self.db_path,
+            'readers_open': self._reader_count,
+            'readers_idle': self._readers.qsize(),
+            'max_readers': self.max_readers,
+            'journal_mode': self.pragmas.get('journal_mode'),
+        }
+
+    def close(self) -> None:
+        """关闭全部连接"""
+        self._closed = True
+        with self._write_lock:
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._all.clear()
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_key(db_path: str) -> str:
+    return db_path if db_path == ':memory:' else os.path.realpath(db_path)
+
+
+def get_pool(db_path: str, **kwargs) -> ConnectionPool:
+    """
+    获取（必要时创建）数据库文件对应的连接池
+
+    Args:
+        db_path: 数据库文件路径
+        **kwargs: 首次创建时传给 ConnectionPool 的参数
+
+    Returns:
+        连接池实例
+    """
+    key = _pool_key(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(db_path, **kwargs)
+            _pools[key] = pool
+        return pool
+
+
+def get_pool_from_config(config: Dict[str, object]) -> ConnectionPool:
+    """根据 config.json 的 database 段获取连接池"""
+    section = config.get('database', {})
+    return get_pool(section.get('path', 'db.sqlite3'), max_readers=section.get('max_readers', 4))
+
+
+def close_pool(db_path: str) -> None:
+    """关闭并移除指定数据库文件的连接池（删除/替换数据库文件前调用）"""
+    with _pools_lock:
+        pool = _pools.pop(_pool_key(db_path), None)
+    if pool is not None:
+        pool.close()
+
+
+def close_all_pools() -> None:
+    """关闭全部连接池"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,162 @@
+"""
+批量嵌入向量模块
+
+将大量文本按提供商允许的批大小切分，并发请求嵌入接口，
+结果严格保持输入顺序；单批失败时逐条重试以隔离问题文本，
+其余文本的结果不受影响。
+
+模型若实现了原生批量接口 ``get_embeddings(texts)`` 则直接使用（一个批次一次请求），
+否则在每个批次内退化为逐条调用 ``get_embedding(text)``，只有并发、没有批量收益。
+
+OpenAI 兼容接口（openai / qwen / deepseek）的模型类在 get_embeddings 中调用
+openai_compatible_embeddings 即可一次请求整批文本；包装器（缓存、遥测、合并请求等）
+应透传 get_embeddings，否则会退化为逐条调用。
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 各提供商单次嵌入请求允许的最大文本条数
+PROVIDER_BATCH_SIZES = {
+    'openai': 2048,
+    'qwen': 10,
+    'deepseek': 16,
+    'local': 1024,
+    'mock': 256,
+}
+DEFAULT_BATCH_SIZE = 16
+
+
+class EmbeddingBatchResult:
+    """批量嵌入结果：embeddings 与输入一一对应，失败位置为 None"""
+
+    def __init__(self, size: int):
+        self.embeddings: List[Optional[List[float]]] = [None] * size
+        self.errors: Dict[int, Exception] = {}
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    @property
+    def failed_indices(self) -> List[int]:
+        return sorted(self.errors)
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def __iter__(self):
+        return iter(self.embeddings)
+
+    def __getitem__(self, index: int) -> Optional[List[float]]:
+        return self.embeddings[index]
+
+
+def batch_size_for(provider: Optional[str]) -> int:
+    """返回提供商的默认批大小"""
+    return PROVIDER_BATCH_SIZES.get(provider or '', DEFAULT_BATCH_SIZE)
+
+
+def openai_compatible_embeddings(client: Any, model_name: str, texts: Sequence[str],
+                                 **kwargs) -> List[List[float]]:
+    """
+    通过 OpenAI 兼容的 embeddings 接口一次请求整批文本
+
+    Args:
+        client: openai.OpenAI 客户端（或 base_url 指向兼容服务的客户端）
+        model_name: 嵌入模型名称
+        texts: 文本列表，条数不应超过提供商的批大小（见 PROVIDER_BATCH_SIZES）
+        **kwargs: 透传给 embeddings.create 的参数（如 dimensions）
+
+    Returns:
+        与 texts 顺序一致的向量列表
+    """
+    if not texts:
+        return []
+    response = client.embeddings.create(model=model_name, input=list(texts), **kwargs)
+    # 接口按 index 标注每条结果，不保证返回顺序
+    data = sorted(response.data, key=lambda item: item.index)
+    return [list(item.embedding) for item in data]
+
+
+def _embed_batch(model: Any, texts: List[str]) -> List[List[float]]:
+    if hasattr(model, 'get_embeddings'):
+        vectors = model.get_embeddings(texts)
+        if len(vectors) != len(texts):
+            raise ValueError(f"嵌入接口返回 {len(vectors)} 条结果，期望 {len(texts)} 条")
+        return list(vectors)
+    return [model.get_embedding(text) for text in texts]
+
+
+def get_embeddings(model: Any, texts: Sequence[str], provider: Optional[str] = None,
+                   batch_size: Optional[int] = None, max_workers: int = 4,
+                   retry_individually: bool = True) -> EmbeddingBatchResult:
+    """
+    批量获取嵌入向量
+
+    Args:
+        model: 具有 get_embedding（可选 get_embeddings）方法的模型实例
+        texts: 文本列表
+        provider: 提供商名称，用于确定默认批大小
+        batch_size: 每批条数，默认按提供商取值
+        max_workers: 并发批次数
+        retry_individually: 批次失败时是否逐条重试
+
+    Returns:
+        EmbeddingBatchResult，顺序与 texts 一致
+    """
+    result = EmbeddingBatchResult(len(texts))
+    if not texts:
+        return result
+
+    # 同一次调用内的重复文本只请求一次
+    unique_texts: List[str] = []
+    positions: Dict[str, List[int]] = {}
+    for index, text in enumerate(texts):
+        if text not in positions:
+            positions[text] = []
+            unique_texts.append(text)
+        positions[text].append(index)
+
+    size = max(1, batch_size or batch_size_for(provider))
+    batches = [unique_texts[i:i + size] for i in range(0, len(unique_texts), size)]
+
+    def run(batch: List[str]) -> List[Tuple[str, Optional[List[float]], Optional[Exception]]]:
+        try:
+            vectors = _embed_batch(model, batch)
+            return [(text, vector, None) for text, vector in zip(batch, vectors)]
+        except NotImplementedError:
+            raise
+        except Exception as e:
+            if not retry_individually or len(batch) == 1:
+                return [(text, None, e) for text in batch]
+            logger.warning(f"嵌入批次（{len(batch)} 条）失败，改为逐条重试: {e}")
+            outcomes = []
+            for text in batch:
+                try:
+                    outcomes.append((text, _embed_batch(model, [text])[0], None))
+                except Exception as item_error:
+                    outcomes.append((text, None, item_error))
+            return outcomes
+
+    workers = max(1, min(max_workers, len(batches)))
+    if workers == 1:
+        batch_outcomes = [run(batch) for batch in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='embedding') as executor:
+            batch_outcomes = list(executor.map(run, batches))
+
+    for outcomes in batch_outcomes:
+        for text, vector, error in outcomes:
+            for index in positions[text]:
+                if error is None:
+                    result.embeddings[index] = vector
+                else:
+                    result.errors[index] = error
+
+    if result.errors:
+        logger.warning(f"批量嵌入完成，{len(result.errors)}/{len(texts)} 条失败")
+    return result
@@ -0,0 +1,311 @@
+"""
+嵌入向量磁盘缓存模块
+
+以（嵌入模型, 文本哈希）为键的内容寻址缓存，位于 LLMManager.get_embedding 之下：
+重建向量索引、切换数据库文件或重复运行 build_index 时，相同文本不再重复请求接口。
+
+存储布局（cache_dir 下）：
+    CURRENT              当前代号
+    vectors-<代号>.f16   只追加的 float16 向量数据，读取时内存映射
+    index-<代号>.bin     只追加的索引记录：32 字节键 + 8 字节偏移 + 4 字节维度
+
+压缩（compaction）时按最近使用顺序保留条目，写入新一代文件后原子切换 CURRENT。
+
+配置示例（llm_config.json）：
+
+    "embedding_cache": {
+        "enabled": true,
+        "path": "cache/embeddings",
+        "max_size_mb": 512
+    }
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_INDEX_RECORD = struct.Struct('<32sQI')
+_VALUE_SIZE = 2  # float16
+
+
+class EmbeddingCacheError(Exception):
+    """嵌入缓存错误"""
+    pass
+
+
+def make_cache_key(model: str, text: str) -> bytes:
+    """计算缓存键：sha256(模型名 + NUL + 文本)"""
+    digest = hashlib.sha256()
+    digest.update(model.encode('utf-8'))
+    digest.update(b'\x00')
+    digest.update(text.encode('utf-8'))
+    return digest.digest()
+
+
+class EmbeddingCache:
+    """内容寻址的 float16 嵌入向量缓存"""
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024,
+                 compact_ratio: float = 0.8):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 向量数据文件大小上限，超出后触发压缩
+            compact_ratio: 压缩后保留的数据量占上限的比例
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.compact_ratio = compact_ratio
+        self._lock = threading.RLock()
+        self._index: Dict[bytes, Tuple[int, int]] = {}
+        self._last_used: Dict[bytes, int] = {}
+        self._tick = 0
+        self._mmap: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+        self.hits = 0
+        self.misses = 0
+        self.compactions = 0
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._generation = self._read_generation()
+        self._open_files()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional['EmbeddingCache']:
+        """从 llm_config.json 的完整配置字典创建；未启用时返回 None"""
+        section = config.get('embedding_cache', {})
+        if not section.get('enabled', False):
+            return None
+        return cls(
+            section.get('path', 'cache/embeddings'),
+            max_bytes=int(section.get('max_size_mb', 512) * 1024 * 1024),
+        )
+
+    # ---- 文件管理 ----
+
+    def _read_generation(self) -> int:
+        current = self.cache_dir / 'CURRENT'
+        if current.exists():
+            try:
+                return int(current.read_text().strip())
+            except ValueError:
+                raise EmbeddingCacheError(f"缓存代号文件已损坏: {current}")
+        return 0
+
+    def _data_path(self, generation: int) -> Path:
+        return self.cache_dir / f'vectors-{generation}.f16'
+
+    def _index_path(self, generation: int) -> Path:
+        return self.cache_dir / f'index-{generation}.bin'
+
+    def _open_files(self) -> None:
+        data_path = self._data_path(self._generation)
+        index_path = self._index_path(self._generation)
+        self._data_file = open(data_path, 'ab+')
+        self._index_file = open(index_path, 'ab+')
+
+        data_size = os.path.getsize(data_path)
+        self._index_file.seek(0)
+        raw = self._index_file.read()
+        # 末尾不完整的记录（进程中断时可能出现）直接忽略
+        usable = len(raw) - len(raw) % _INDEX_RECORD.size
+        for offset in range(0, usable, _INDEX_RECORD.size):
+            key, data_offset, dim = _INDEX_RECORD.unpack_from(raw, offset)
+            if data_offset + dim * _VALUE_SIZE <= data_size:
+                self._index[key] = (data_offset, dim)
+        if usable != len(raw):
+            self._index_file.truncate(usable)
+        self._remap()
+
+    def _remap(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._data_file.flush()
+        size = os.path.getsize(self._data_path(self._generation))
+        if size > 0:
+            self._mmap = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mapped_size = size
+
+    def _data_size(self) -> int:
+        return self._data_file.seek(0, os.SEEK_END)
+
+    # ---- 读写 ----
+
+    def _read_vector(self, offset: int, dim: int) -> List[float]:
+        if offset + dim * _VALUE_SIZE > self._mapped_size:
+            self._remap()
+        return list(struct.unpack_from(f'<{dim}e', self._mmap, offset))
+
+    def _touch(self, key: bytes) -> None:
+        self._tick += 1
+        self._last_used[key] = self._tick
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """读取缓存，未命中返回 None"""
+        key = make_cache_key(model, text)
+        with self._lock:
+            location = self._index.get(key)
+            if location is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touch(key)
+            return self._read_vector(*location)
+
+    def put(self, model: str, text: str, vector: Sequence[float]) -> None:
+        """写入缓存（已存在则跳过）"""
+        key = make_cache_key(model, text)
+        with self._lock:
+            if key in self._index:
+                return
+            payload = struct.pack(f'<{len(vector)}e', *vector)
+            offset = self._data_size()
+            self._data_file.write(payload)
+            self._data_file.flush()
+            # 先写数据再写索引，保证索引记录指向的数据一定完整
+            self._index_file.write(_INDEX_RECORD.pack(key, offset, len(vector)))
+            self._index_file.flush()
+            self._index[key] = (offset, len(vector))
+            self._touch(key)
+            if offset + len(payload) > self.max_bytes:
+                self.compact()
+
+    def get_or_compute(self, model: str, text: str,
+                       compute: Callable[[str], Sequence[float]]) -> List[float]:
+        """读取缓存，未命中时调用 compute 计算并写入"""
+        vector = self.get(model, text)
+        if vector is None:
+            vector = list(compute(text))
+            self.put(model, text, vector)
+        return vector
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """批量读取缓存，顺序与输入一致"""
+        return [self.get(model, text) for text in texts]
+
+    # ---- 维护 ----
+
+    def compact(self) -> int:
+        """
+        压缩缓存：按最近使用顺序保留条目，直至数据量不超过 max_bytes * compact_ratio
+
+        Returns:
+            保留的条目数
+        """
+        with self._lock:
+            budget = int(self.max_bytes * self.compact_ratio)
+            # 本进程内未使用过的条目按写入顺序（偏移）视为更旧
+            ordered = sorted(
+                self._index.items(),
+                key=lambda item: (self._last_used.get(item[0], 0), item[1][0]),
+                reverse=True,
+            )
+            new_generation = self._generation + 1
+            new_data_path = self._data_path(new_generation)
+            new_index_path = self._index_path(new_generation)
+            new_index: Dict[bytes, Tuple[int, int]] = {}
+            written = 0
+            with open(new_data_path, 'wb') as data_out, open(new_index_path, 'wb') as index_out:
+                for key, (offset, dim) in ordered:
+                    size = dim * _VALUE_SIZE
+                    if written + size > budget:
+                        break
+                    if offset + size > self._mapped_size:
+                        self._remap()
+                    data_out.write(self._mmap[offset:offset + size])
+                    index_out.write(_INDEX_RECORD.pack(key, written, dim))
+                    new_index[key] = (written, dim)
+                    written += size
+                data_out.flush()
+                os.fsync(data_out.fileno())
+                index_out.flush()
+                os.fsync(index_out.fileno())
+
+            tmp_current = self.cache_dir / 'CURRENT.tmp'
+            tmp_current.write_text(str(new_generation))
+            os.replace(tmp_current, self.cache_dir / 'CURRENT')
+
+            old_generation = self._generation
+            self._close_files()
+            self._data_path(old_generation).unlink(missing_ok=True)
+            self._index_path(old_generation).unlink(missing_ok=True)
+
+            dropped = len(self._index) - len(new_index)
+            self._generation = new_generation
+            self._index = {}
+            self._last_used = {key: self._last_used[key] for key in new_index if key in self._last_used}
+            self._open_files()
+            self.compactions += 1
+            logger.info(f"嵌入缓存压缩完成：保留 {len(new_index)} 条，淘汰 {dropped} 条")
+            return len(new_index)
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中率等统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._index),
+                'data_bytes': self._data_size(),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'compactions': self.compactions,
+            }
+
+    def _close_files(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._data_file.close()
+        self._index_file.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_files()
+
+
+class CachedEmbeddingLLM:
+    """
+    为模型的嵌入接口加上磁盘缓存的包装器
+
+    get_embedding / get_embeddings 先查缓存，仅对未命中的文本调用底层模型；
+    其余属性透传给被包装的模型。
+    """
+
+    def __init__(self, llm: Any, cache: EmbeddingCache, embedding_model: str):
+        self.llm = llm
+        self.cache = cache
+        self.embedding_model = embedding_model
+
+    def get_embedding(self, text: str, **kwargs) -> List[float]:
+        return self.cache.get_or_compute(
+            self.embedding_model, text, lambda t: self.llm.get_embedding(t, **kwargs)
+        )
+
+    def get_embeddings(self, texts: Sequence[str]) -> List[List[float]]:
+        cached = self.cache.get_many(self.embedding_model, texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            if hasattr(self.llm, 'get_embeddings'):
+                vectors = self.llm.get_embeddings(missing_texts)
+            else:
+                vectors = [self.llm.get_embedding(text) for text in missing_texts]
+            for index, vector in zip(missing, vectors):
+                self.cache.put(self.embedding_model, texts[index], vector)
+                cached[index] = list(vector)
+        return cached  # type: ignore
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
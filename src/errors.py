@@ -0,0 +1,21 @@
+"""
+公共异常模块
+
+数据库层（连接池、批量写入、备份等）与检索层（FTS、分页、分片等）共用的异常类型，
+单独成模块，避免各模块为取得异常类而互相导入。
+"""
+
+
+class DatabaseError(Exception):
+    """数据库操作错误"""
+    pass
+
+
+class ValidationError(DatabaseError):
+    """记录数据校验错误"""
+    pass
+
+
+class SearchError(Exception):
+    """检索错误"""
+    pass
@@ -0,0 +1,464 @@
+"""
+FTS5 全文检索模块
+
+为 inspirations 表建立 FTS5 倒排索引，替代 LIKE 全表扫描，结果按 bm25 相关度排序。
+检索入口 keyword_search 按 search_mode 参数选择 'like' 或 'fts'（取值对应 config.json
+的 search.search_mode）。
+
+中文分词：
+- bigram（默认）：连续的中日韩字符切成重叠的二元组，查询词同样切分后做短语匹配，
+  命中结果与 LIKE 子串匹配一致，不依赖第三方库。拉丁字母与数字按整词索引，
+  "drag" 无法通过 MATCH 命中 "dragon"，因此含拉丁字母或数字、以及含单个孤立汉字
+  （短于一个二元组）的查询回退到 LIKE，保证与 like 模式结果一致
+- jieba：使用 jieba 搜索引擎模式分词，索引更小，但只能命中完整词语
+
+每种分词方式使用各自的索引表与待同步表（bigram 为 inspirations_fts，jieba 为
+inspirations_fts_jieba，见 fts_tables），同一数据库可以同时存在两种索引，
+以一种分词方式建立的索引不会被另一种分词方式的查询误用。
+
+同步方式：inspirations 上的触发器只把变更行的 ID 写入待同步表，分词在 Python 中完成。
+这样任何连接（包括 sqlite3 命令行）都可以照常写入 inspirations，不需要注册自定义 SQL 函数。
+建表、回填与增量同步都需要写连接，由后台线程（get_index 默认启动，见 start_background_sync）
+按小批完成，检索只使用读连接，不会排在写入事务之后：
+- 索引尚未建立时检索回退到 LIKE
+- 待同步的行（刚写入、尚未分词）不参与 MATCH，改用 LIKE 匹配后排在相关度结果之后
+
+也可以用 python -m src.fts <数据库> 在导入后一次性建好索引。
+"""
+
+import argparse
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .compression import get_compressor
+from .db_pool import ConnectionPool, get_pool
+from .errors import SearchError
+
+logger = logging.getLogger(__name__)
+
+try:
+    import jieba
+    JIEBA_AVAILABLE = True
+except ImportError:
+    jieba = None
+    JIEBA_AVAILABLE = False
+
+TOKENIZERS = ('bigram', 'jieba')
+FTS_TABLE = 'inspirations_fts'
+PENDING_TABLE = 'inspirations_fts_pending'
+INDEXED_COLUMNS = ('raw_text', 'idea', 'tags')
+RESULT_COLUMNS = ('id', 'source_file', 'chapter', 'raw_text', 'idea', 'tags', 'created_at')
+
+FTS_SCHEMA_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+    raw_text, idea, tags,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS {pending} (
+    id INTEGER PRIMARY KEY
+);
+CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON inspirations BEGIN
+    INSERT OR IGNORE INTO {pending}(id) VALUES (new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE ON inspirations BEGIN
+    INSERT OR IGNORE INTO {pending}(id) VALUES (old.id);
+    INSERT OR IGNORE INTO {pending}(id) VALUES (new.id);
+END;
+CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON inspirations BEGIN
+    INSERT OR IGNORE INTO {pending}(id) VALUES (old.id);
+END;
+"""
+
+_CJK = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af'
+_CJK_RUN = re.compile(f'[{_CJK}]+')
+_SEGMENT = re.compile(f'[{_CJK}]+|[^\\W{_CJK}]+')
+
+
+def fts_tables(tokenizer: str = 'bigram') -> Tuple[str, str]:
+    """
+    返回分词方式对应的（索引表, 待同步表）
+
+    bigram 沿用不带后缀的表名，已有索引无需重建
+    """
+    if tokenizer not in TOKENIZERS:
+        raise SearchError(f"不支持的分词方式: {tokenizer}")
+    if tokenizer == 'bigram':
+        return FTS_TABLE, PENDING_TABLE
+    return f'{FTS_TABLE}_{tokenizer}', f'{PENDING_TABLE}_{tokenizer}'
+
+
+def _decode(value: Any) -> str:
+    """索引前把列值还原为文本（压缩列已先行解压）"""
+    if value is None:
+        return ''
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    return str(value)
+
+
+def segment(text: str, tokenizer: str = 'bigram') -> str:
+    """
+    把文本切分为以空格分隔的词元，供 unicode61 分词器建立索引
+
+    Args:
+        text: 原始文本
+        tokenizer: 'bigram' 或 'jieba'
+
+    Returns:
+        空格分隔的词元串
+    """
+    if tokenizer == 'jieba':
+        if not JIEBA_AVAILABLE:
+            raise SearchError("jieba 未安装，无法使用 jieba 分词")
+        return ' '.join(word for word in jieba.cut_for_search(text) if word.strip())
+
+    tokens: List[str] = []
+    for match in _SEGMENT.finditer(text):
+        run = match.group()
+        if _CJK_RUN.fullmatch(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return ' '.join(tokens)
+
+
+def build_match_query(keyword: str, tokenizer: str = 'bigram') -> Optional[str]:
+    """
+    把用户关键词转换为 FTS5 MATCH 表达式
+
+    Returns:
+        MATCH 表达式；bigram 分词下关键词含单个孤立汉字（短于一个二元组）或拉丁字母、数字
+        （按整词索引，无法做子串匹配）时返回 None，调用方应回退到 LIKE
+    """
+    parts: List[str] = []
+    for word in keyword.split():
+        if tokenizer == 'jieba':
+            tokens = segment(word, 'jieba').split()
+        else:
+            runs = [match.group() for match in _SEGMENT.finditer(word)]
+            if any(len(run) == 1 or not _CJK_RUN.fullmatch(run) for run in runs):
+                return None
+            tokens = segment(word, 'bigram').split()
+        if not tokens:
+            continue
+        quoted = [token.replace('"', '""') for token in tokens]
+        if tokenizer == 'bigram':
+            # 二元组按短语匹配（要求相邻），等价于子串匹配
+            parts.append('"' + ' '.join(quoted) + '"')
+        else:
+            parts.extend(f'"{token}"' for token in quoted)
+    return ' AND '.join(parts) if parts else None
+
+
+class FullTextIndex:
+    """inspirations 表的 FTS5 索引"""
+
+    def __init__(self, pool: ConnectionPool, tokenizer: str = 'bigram', sync_batch_size: int = 500):
+        """
+        初始化索引
+
+        Args:
+            pool: 数据库连接池
+            tokenizer: 'bigram' 或 'jieba'
+            sync_batch_size: 每个写事务处理的待同步行数
+        """
+        self.table, self.pending_table = fts_tables(tokenizer)
+        self.pool = pool
+        self.tokenizer = tokenizer
+        self.sync_batch_size = sync_batch_size
+        self._ready = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def is_ready(self) -> bool:
+        """索引是否已建立（只读检查，建立后缓存结果）"""
+        if not self._ready:
+            with self.pool.reader() as conn:
+                self._ready = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.table,)
+                ).fetchone() is not None
+        return self._ready
+
+    def pending_count(self) -> int:
+        """尚未写入索引的变更行数"""
+        if not self.is_ready():
+            return 0
+        with self.pool.reader() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {self.pending_table}").fetchone()[0]
+
+    def ensure(self) -> int:
+        """
+        创建索引与触发器（索引为新建时回填已有数据），并同步待同步表
+
+        Returns:
+            本次写入索引的行数
+        """
+        if self.is_ready():
+            return self.sync()
+        with self.pool.writer() as conn:
+            existed = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.table,)
+            ).fetchone() is not None
+            for statement in _split_statements(FTS_SCHEMA_SQL.format(table=self.table, pending=self.pending_table)):
+                conn.execute(statement)
+            if not existed:
+                conn.execute(f"INSERT OR IGNORE INTO {self.pending_table}(id) SELECT id FROM inspirations")
+        backfilled = self.sync()
+        if not existed:
+            logger.info(f"FTS 索引已创建，回填 {backfilled} 条记录")
+        return backfilled
+
+    def sync(self) -> int:
+        """把待同步表中的变更写入索引，返回处理的行数（每批一个短写事务）"""
+        total = 0
+        while True:
+            # 先用读连接确认有待同步的行，空闲时不占用写连接
+            with self.pool.reader() as conn:
+                if conn.execute(f"SELECT EXISTS (SELECT 1 FROM {self.pending_table})").fetchone()[0] == 0:
+                    return total
+            with self.pool.writer() as conn:
+                ids = [row[0] for row in conn.execute(
+                    f"SELECT id FROM {self.pending_table} ORDER BY id LIMIT ?", (self.sync_batch_size,))]
+                if not ids:
+                    return total
+                placeholders = ','.join('?' * len(ids))
+                conn.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", ids)
+                rows = conn.execute(
+                    f"SELECT id, raw_text, idea, tags FROM inspirations WHERE id IN ({placeholders})", ids).fetchall()
+                raw_texts = get_compressor(self.pool).decompress_many(row[1] for row in rows)
+                conn.executemany(
+                    f"INSERT INTO {self.table}(rowid, raw_text, idea, tags) VALUES (?, ?, ?, ?)",
+                    [(row[0], *(segment(_decode(value), self.tokenizer) for value in (raw_text, *row[2:])))
+                     for row, raw_text in zip(rows, raw_texts)])
+                conn.execute(f"DELETE FROM {self.pending_table} WHERE id IN ({placeholders})", ids)
+            total += len(ids)
+
+    def rebuild(self) -> int:
+        """清空并重建索引（切换分词方式后使用）"""
+        with self.pool.writer() as conn:
+            conn.execute(f"DELETE FROM {self.table}")
+            conn.execute(f"INSERT OR IGNORE INTO {self.pending_table}(id) SELECT id FROM inspirations")
+        return self.sync()
+
+    def start_background_sync(self, interval: float = 2.0) -> None:
+        """
+        启动后台同步线程：建立索引（必要时回填），之后每 interval 秒同步一次待同步表
+
+        Args:
+            interval: 同步间隔秒数
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sync_loop, args=(interval,),
+                                        name='fts-sync', daemon=True)
+        self._thread.start()
+
+    def stop_background_sync(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _sync_loop(self, interval: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.ensure()
+            except Exception as e:
+                # 连接池已关闭等情况下结束线程，其余错误下一轮重试
+                logger.error(f"FTS 索引同步失败: {e}")
+                if self.pool._closed:
+                    return
+            self._stop.wait(interval)
+
+    def search(self, keyword: str, limit: int = 10, with_score: bool = False) -> List[Dict[str, Any]]:
+        """
+        全文检索
+
+        Args:
+            keyword: 关键词，多个词以空格分隔时要求同时命中
+            limit: 返回条数上限
+            with_score: 是否在结果中附带 'score'（bm25，越小越相关；回退到 LIKE 时为 None）
+
+        Returns:
+            按相关度排序的记录列表；索引尚未建立或关键词无法转换为 MATCH 表达式时回退到 LIKE。
+            待同步的行按 LIKE 匹配，排在相关度结果之后（score 为 0.0）
+        """
+        if not keyword or not keyword.strip():
+            raise SearchError("搜索关键词不能为空")
+        keyword = keyword.strip()
+        query = build_match_query(keyword, self.tokenizer) if self.is_ready() else None
+        compressor = get_compressor(self.pool)
+        raw_text_expr = compressor.sql_expr('i.raw_text')
+        columns = ', '.join(f'i.{name}' for name in RESULT_COLUMNS)
+        try:
+            with self.pool.reader() as conn:
+                if query is None:
+                    rows = like_search(conn, keyword, limit, raw_text_expr=raw_text_expr)
+                    scores = [None] * len(rows)
+                else:
+                    rows = conn.execute(
+                        f"SELECT {columns}, bm25({self.table}) AS score FROM {self.table} f "
+                        f"JOIN inspirations i ON i.id = f.rowid "
+                        f"WHERE {self.table} MATCH ? AND f.rowid NOT IN (SELECT id FROM {self.pending_table}) "
+                        f"ORDER BY score, i.id DESC LIMIT ?",
+                        (query, limit)).fetchall()
+                    scores = [row[len(RESULT_COLUMNS)] for row in rows]
+                    if len(rows) < limit:
+                        # 索引中的旧内容可能已过期，待同步的行直接匹配当前文本
+                        pending = like_search(conn, keyword, limit - len(rows),
+                                              f"i.id IN (SELECT id FROM {self.pending_table})", raw_text_expr)
+                        rows += pending
+                        scores += [0.0] * len(pending)
+        except sqlite3.Error as e:
+            raise SearchError(f"全文检索失败: {e}")
+        records = [dict(zip(RESULT_COLUMNS, row)) for row in rows]
+        if with_score:
+            for record, score in zip(records, scores):
+                record['score'] = score
+        return compressor.decode_records(records)
+
+
+def _split_statements(script: str) -> Iterable[str]:
+    """按完整语句切分脚本（触发器体内的分号不切分）"""
+    buffer = ''
+    for line in script.strip().splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            yield buffer.strip()
+            buffer = ''
+
+
+def like_search(conn: sqlite3.Connection, keyword: str, limit: int,
+                extra_where: Optional[str] = None, raw_text_expr: str = 'i.raw_text',
+                order_by: str = 'i.id DESC') -> List[sqlite3.Row]:
+    """
+    LIKE 子串匹配（search_mode 为 "like"、FTS 无法处理的关键词或待同步的行）
+
+    raw_text_expr 传入 TextCompressor.sql_expr('i.raw_text')，压缩过的库按原文匹配；
+    order_by 决定取哪 limit 条，跨库归并时须与归并键一致（见 NEWEST_FIRST）
+    """
+    pattern = f"%{keyword}%"
+    where = f"({raw_text_expr} LIKE ? OR i.idea LIKE ? OR i.tags LIKE ?)"
+    if extra_where:
+        where += f" AND {extra_where}"
+    return conn.execute(
+        f"SELECT {', '.join(f'i.{name}' for name in RESULT_COLUMNS)} FROM inspirations i "
+        f"WHERE {where} ORDER BY {order_by} LIMIT ?",
+        (pattern, pattern, pattern, limit)).fetchall()
+
+
+# 按创建时间取最新记录；分片检索按 created_at 归并，各分片须按同一键取前 limit 条
+NEWEST_FIRST = 'i.created_at DESC, i.id DESC'
+
+
+_indexes: Dict[str, FullTextIndex] = {}
+
+
+_indexes_lock = threading.Lock()
+
+
+def get_index(db_path: str, tokenizer: str = 'bigram', background_sync: bool = True) -> FullTextIndex:
+    """
+    获取数据库文件对应的全文索引
+
+    Args:
+        db_path: 数据库文件路径
+        tokenizer: 'bigram' 或 'jieba'
+        background_sync: 首次获取时启动后台同步线程（建索引、增量同步都在该线程完成）
+
+    Returns:
+        FullTextIndex
+    """
+    if db_path != ':memory:' and not os.path.exists(db_path):
+        raise SearchError(f"数据库文件不存在: {db_path}")
+    pool = get_pool(db_path)
+    key = f"{os.path.realpath(db_path)}:{tokenizer}"
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or index.pool is not pool:
+            if index is not None:
+                index.stop_background_sync()
+            index = FullTextIndex(pool, tokenizer)
+            _indexes[key] = index
+            if background_sync:
+                index.start_background_sync()
+    return index
+
+
+def search_fts(db_path: str, keyword: str, limit: int = 10, tokenizer: str = 'bigram') -> List[Dict[str, Any]]:
+    """
+    search_inspirations / query_by_keyword 在 search_mode 为 "fts" 时的实现
+
+    Args:
+        db_path: 数据库文件路径
+        keyword: 关键词
+        limit: 返回条数上限
+        tokenizer: 'bigram' 或 'jieba'
+
+    Returns:
+        按相关度排序的记录列表
+    """
+    return get_index(db_path, tokenizer).search(keyword, limit)
+
+
+def keyword_search(db_path: str, keyword: str, limit: int = 10, search_mode: str = 'like',
+                   tokenizer: str = 'bigram', order_by: str = 'i.id DESC') -> List[Dict[str, Any]]:
+    """
+    按 config.json 中的 search.search_mode 选择 LIKE 或 FTS 检索
+
+    Args:
+        db_path: 数据库文件路径
+        keyword: 关键词
+        limit: 返回条数上限
+        search_mode: 'like' 或 'fts'
+        tokenizer: search_mode 为 'fts' 时的分词方式
+        order_by: search_mode 为 'like' 时的排序（默认按写入顺序倒序）
+
+    Returns:
+        记录列表
+    """
+    if search_mode == 'fts':
+        return search_fts(db_path, keyword, limit, tokenizer)
+    if search_mode != 'like':
+        raise SearchError(f"不支持的检索模式: {search_mode}")
+    if not keyword or not keyword.strip():
+        raise SearchError("搜索关键词不能为空")
+    if db_path != ':memory:' and not os.path.exists(db_path):
+        raise SearchError(f"数据库文件不存在: {db_path}")
+    try:
+        pool = get_pool(db_path)
+        compressor = get_compressor(pool)
+        with pool.reader() as conn:
+            rows = like_search(conn, keyword.strip(), limit, raw_text_expr=compressor.sql_expr('i.raw_text'),
+                               order_by=order_by)
+    except sqlite3.Error as e:
+        raise SearchError(f"检索失败: {e}")
+    return compressor.decode_records([dict(zip(RESULT_COLUMNS, row)) for row in rows])
+
+
+def main():
+    """命令行入口：为已有数据库建立（或重建）FTS 索引"""
+    parser = argparse.ArgumentParser(description="为灵感数据库建立 FTS5 全文索引")
+    parser.add_argument('db_path', help='数据库文件路径')
+    parser.add_argument('--tokenizer', choices=['bigram', 'jieba'], default='bigram', help='中文分词方式')
+    parser.add_argument('--rebuild', action='store_true', help='清空后重建索引（切换分词方式后使用）')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    index = get_index(args.db_path, args.tokenizer, background_sync=False)
+    count = index.ensure()
+    if args.rebuild:
+        count = index.rebuild()
+    print(f"✅ FTS 索引已就绪，本次写入 {count} 条记录")
+
+
+if __name__ == "__main__":
+    main()
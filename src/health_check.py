@@ -0,0 +1,233 @@
+"""
+模型可用性健康检查缓存模块
+
+将 get_available_models() / is_available() 从“每次调用都探测”改为读取缓存快照：
+后台线程按每个模型各自的 TTL 异步刷新状态，读取方只做一次字典/元组访问，
+不会随配置的提供商数量增加而变慢。
+
+每次探测在独立线程中执行并有各自的截止时间：超时即记为不可用，不等待探测返回，
+其他模型的探测不受影响。同一模型上一次探测仍未返回时不会再发起新的探测，
+卡住的提供商最多占用一个线程。
+
+配置示例（llm_config.json）：
+
+    "health_check": {
+        "default_ttl": 60,
+        "ttl": {"mock": 3600},
+        "probe_timeout": 5
+    }
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class HealthCheckCache:
+    """按模型 TTL 缓存可用性状态，并在后台异步刷新"""
+
+    def __init__(self, probe: Callable[[str], bool], model_names: Iterable[str],
+                 default_ttl: float = 60.0, ttls: Optional[Dict[str, float]] = None,
+                 probe_timeout: float = 5.0):
+        """
+        初始化健康检查缓存
+
+        Args:
+            probe: 探测函数，输入模型名称返回是否可用
+            model_names: 需要跟踪的模型名称
+            default_ttl: 默认状态有效期（秒）
+            ttls: 按模型覆盖的有效期
+            probe_timeout: 单次探测超时秒数，超时视为不可用
+        """
+        self.probe = probe
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.probe_timeout = probe_timeout
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._available: Tuple[str, ...] = ()
+        self._order: Tuple[str, ...] = ()
+        self._next_expiry = 0.0
+        # 正在进行的探测：模型名 -> {'deadline', 'started', 'timed_out'}
+        self._inflight: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.set_models(model_names)
+
+    @classmethod
+    def from_config(cls, probe: Callable[[str], bool], model_names: Iterable[str],
+                    config: Dict[str, Any]) -> 'HealthCheckCache':
+        """从 llm_config.json 的完整配置字典创建"""
+        section = config.get('health_check', {})
+        return cls(
+            probe,
+            model_names,
+            default_ttl=section.get('default_ttl', 60.0),
+            ttls=section.get('ttl', {}),
+            probe_timeout=section.get('probe_timeout', 5.0),
+        )
+
+    # ---- 读取（无锁、常数时间） ----
+
+    def get_available_models(self) -> Tuple[str, ...]:
+        """返回最近一次探测结果中可用的模型（按注册顺序）"""
+        if time.time() >= self._next_expiry:
+            self._request_refresh()
+        return self._available
+
+    def is_available(self, model_name: str) -> bool:
+        """返回模型最近一次探测结果；状态过期时触发后台刷新，但不等待"""
+        status = self._status.get(model_name)
+        if status is None or self._expired(model_name, status):
+            self._request_refresh()
+        return bool(status and status['available'])
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """返回各模型的探测详情（是否可用、检查时间、耗时、错误）"""
+        now = time.time()
+        result = {}
+        for name, status in list(self._status.items()):
+            entry = dict(status)
+            entry['age'] = now - status['checked_at'] if status['checked_at'] else None
+            entry['ttl'] = self._ttl(name)
+            result[name] = entry
+        return result
+
+    # ---- 维护 ----
+
+    def set_models(self, model_names: Iterable[str]) -> None:
+        """更新需要跟踪的模型列表（增删模型后调用）"""
+        names = tuple(dict.fromkeys(model_names))
+        with self._lock:
+            self._status = {
+                name: self._status.get(name, {
+                    'available': False, 'checked_at': 0.0, 'latency': None, 'error': None,
+                })
+                for name in names
+            }
+            self._order = names
+            self._publish()
+        self._wakeup.set()
+
+    def _publish(self) -> None:
+        # 以新元组整体替换，读取方无需加锁
+        self._available = tuple(name for name in self._order if self._status[name]['available'])
+        self._next_expiry = min(
+            (status['checked_at'] + self._ttl(name) for name, status in self._status.items()),
+            default=float('inf'),
+        )
+
+    def _request_refresh(self) -> None:
+        # 已有探测在进行时不再唤醒，避免读取方频繁触发空转
+        if not any(not probe['timed_out'] for probe in self._inflight.values()):
+            self._wakeup.set()
+
+    def _ttl(self, model_name: str) -> float:
+        return self.ttls.get(model_name, self.default_ttl)
+
+    def _expired(self, model_name: str, status: Dict[str, Any]) -> bool:
+        return time.time() - status['checked_at'] >= self._ttl(model_name)
+
+    def _record(self, model_name: str, available: bool, latency: float, error: Optional[str]) -> None:
+        # 调用方持有 self._lock
+        if model_name not in self._status:
+            return
+        previous = self._status[model_name]['available']
+        self._status[model_name] = {
+            'available': available,
+            'checked_at': time.time(),
+            'latency': latency,
+            'error': error,
+        }
+        self._publish()
+        if previous != available:
+            logger.info(f"模型 {model_name} 可用性变化: {previous} -> {available}")
+
+    def _check(self, model_name: str) -> None:
+        """在探测线程中执行一次探测；超时后才返回的结果同样记录（说明提供商已恢复响应）"""
+        start = time.perf_counter()
+        error = None
+        try:
+            available = bool(self.probe(model_name))
+        except Exception as e:
+            available, error = False, str(e)
+        with self._lock:
+            self._inflight.pop(model_name, None)
+            self._record(model_name, available, time.perf_counter() - start, error)
+
+    def _expire_overdue(self) -> None:
+        """把超过截止时间仍未返回的探测记为不可用（调用方持有 self._lock）"""
+        now = time.monotonic()
+        for name, probe in self._inflight.items():
+            if not probe['timed_out'] and now >= probe['deadline']:
+                probe['timed_out'] = True
+                self._record(name, False, now - probe['started'], f"探测超时（{self.probe_timeout} 秒）")
+
+    def refresh(self, wait: bool = False) -> None:
+        """
+        刷新所有过期的模型状态
+
+        Args:
+            wait: 是否同步等待探测完成或超时（首次启动预热时使用）
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire_overdue()
+            due = [name for name, status in self._status.items()
+                   if name not in self._inflight and self._expired(name, status)]
+            for name in due:
+                self._inflight[name] = {'deadline': now + self.probe_timeout, 'started': now, 'timed_out': False}
+        threads = []
+        for name in due:
+            thread = threading.Thread(target=self._check, args=(name,), name=f'health-check-{name}', daemon=True)
+            thread.start()
+            threads.append(thread)
+        if wait:
+            for thread in threads:
+                thread.join(max(0.0, now + self.probe_timeout - time.monotonic()))
+            with self._lock:
+                self._expire_overdue()
+
+    def _next_due(self) -> float:
+        with self._lock:
+            # 仍卡住的探测不会被重新调度，不参与到期计算，避免空转
+            expiries = [status['checked_at'] + self._ttl(name) for name, status in self._status.items()
+                        if name not in self._inflight]
+            deadlines = [probe['deadline'] for probe in self._inflight.values() if not probe['timed_out']]
+        wait = min(expiries) - time.time() if expiries else self.default_ttl
+        if deadlines:
+            # 有探测在进行时按最近的截止时间醒来，及时把超时的模型记为不可用
+            wait = min(wait, min(deadlines) - time.monotonic())
+        return max(0.05, wait)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self.refresh()
+            self._wakeup.wait(timeout=self._next_due())
+            self._wakeup.clear()
+
+    def start(self, prime: bool = True) -> 'HealthCheckCache':
+        """
+        启动后台刷新线程
+
+        Args:
+            prime: 是否先同步探测一次，使首次读取即有结果
+        """
+        if prime:
+            self.refresh(wait=True)
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='health-check', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
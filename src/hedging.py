@@ -0,0 +1,277 @@
+"""
+对冲请求模块
+
+降低 generate_text 的尾延迟：请求耗时超过该模型近期延迟的第 N 百分位时，
+向同一模型或备用模型再发一份相同请求，先返回者胜出。
+
+落败的一份按以下方式处理：
+
+- 尚未开始执行：直接取消，不产生调用（计入 ``cancelled``）；
+- 启用 streaming 且模型支持流式（见 supports_streaming）：请求以 ``stream_text`` 执行，
+  每收到一段都检查取消事件，落败后立即关闭流（即断开连接），服务端停止生成，
+  只计费已生成的部分（计入 ``cancelled``）；
+- 其余情况走 ``generate_text``（限流、合并、缓存等包装器照常生效）：已发出的 HTTP 请求
+  无法撤回，调用会完整执行并照常计费，结果被丢弃（计入 ``abandoned``）。
+
+对冲截止时间按近期延迟的百分位计算。被中止的落败请求只知道其延迟不短于中止时的耗时，
+按该耗时记为删失样本，避免截止时间只由胜出者决定而偏低。
+
+对冲会增加调用量，因此受预算约束：对冲次数不超过总请求数的 max_hedge_ratio
+（另有少量突发额度），超出预算时只等待原请求。
+
+配置示例（llm_config.json）：
+
+    "hedging": {
+        "enabled": false,
+        "percentile": 95,
+        "min_samples": 20,
+        "initial_delay": null,
+        "max_hedge_ratio": 0.05,
+        "streaming": false,
+        "alternates": {"qwen": "deepseek"}
+    }
+"""
+
+import inspect
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .telemetry import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+class HedgeCancelled(Exception):
+    """落败的流式对冲请求被主动中止"""
+
+
+def supports_streaming(model: Any) -> bool:
+    """
+    判断模型能否以 stream_text 调用
+
+    显式的 ``supports_streaming`` 属性优先；否则要求模型类自身定义 ``stream_text``，
+    包装器（带 ``llm`` 属性）还要求被包装的模型同样支持。只通过 ``__getattr__`` 透传的
+    包装器（限流、合并、缓存等）视为不支持，从而不会被流式调用绕过。
+    """
+    while True:
+        # getattr_static 不经过 __getattr__，只看模型自身定义的属性
+        flag = inspect.getattr_static(model, 'supports_streaming', None)
+        if isinstance(flag, property):
+            flag = getattr(model, 'supports_streaming')
+        if isinstance(flag, bool):
+            return flag
+        if not callable(inspect.getattr_static(model, 'stream_text', None)):
+            return False
+        inner = inspect.getattr_static(model, 'llm', None)
+        if inner is None:
+            return True
+        model = inner
+
+
+class HedgedExecutor:
+    """带延迟百分位截止时间与预算上限的对冲执行器"""
+
+    def __init__(self, get_model: Callable[[str], Any], percentile: float = 95.0,
+                 min_samples: int = 20, initial_delay: Optional[float] = None,
+                 max_hedge_ratio: float = 0.05, burst: int = 5,
+                 alternates: Optional[Dict[str, str]] = None,
+                 get_available_models: Optional[Callable[[], Any]] = None,
+                 max_workers: int = 32, streaming: bool = False):
+        """
+        初始化执行器
+
+        Args:
+            get_model: 根据模型名称返回模型实例的函数
+            percentile: 触发对冲的延迟百分位
+            min_samples: 样本数不足时不按百分位对冲
+            initial_delay: 样本不足时使用的固定截止时间，None 表示样本不足时不对冲
+            max_hedge_ratio: 对冲请求占总请求的比例上限
+            burst: 比例预算之外允许的突发对冲次数
+            alternates: 模型 -> 对冲时使用的备用模型，未配置时对冲到同一模型
+            get_available_models: 返回当前可用模型列表的函数，备用模型不可用时回退到同一模型
+            max_workers: 执行请求的线程数
+            streaming: 对支持流式的模型以 stream_text 执行，落败时可中止生成
+        """
+        self.get_model = get_model
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self.burst = burst
+        self.alternates = dict(alternates or {})
+        self.get_available_models = get_available_models
+        self.streaming = streaming
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedged')
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'hedged': 0,
+            'hedge_wins': 0,
+            'primary_wins': 0,
+            'budget_denied': 0,
+            'cancelled': 0,
+            'abandoned': 0,
+            'censored_samples': 0,
+        }
+
+    @classmethod
+    def from_config(cls, get_model: Callable[[str], Any], config: Dict[str, Any],
+                    get_available_models: Optional[Callable[[], Any]] = None) -> Optional['HedgedExecutor']:
+        """从 llm_config.json 的完整配置字典创建；未启用时返回 None"""
+        section = config.get('hedging', {})
+        if not section.get('enabled', False):
+            return None
+        return cls(
+            get_model,
+            percentile=section.get('percentile', 95.0),
+            min_samples=section.get('min_samples', 20),
+            initial_delay=section.get('initial_delay'),
+            max_hedge_ratio=section.get('max_hedge_ratio', 0.05),
+            alternates=section.get('alternates', {}),
+            get_available_models=get_available_models,
+            streaming=section.get('streaming', False),
+        )
+
+    def _histogram(self, model_name: str) -> LatencyHistogram:
+        histogram = self._histograms.get(model_name)
+        if histogram is None:
+            histogram = LatencyHistogram(sample_size=512)
+            self._histograms[model_name] = histogram
+        return histogram
+
+    def hedge_delay(self, model_name: str) -> Optional[float]:
+        """返回当前对冲截止时间，None 表示不对冲"""
+        with self._lock:
+            histogram = self._histogram(model_name)
+            if len(histogram.samples) < self.min_samples:
+                return self.initial_delay
+            return histogram.percentile(self.percentile)
+
+    def _take_budget(self) -> bool:
+        with self._lock:
+            allowed = self.stats['hedged'] < self.stats['requests'] * self.max_hedge_ratio + self.burst
+            if allowed:
+                self.stats['hedged'] += 1
+            else:
+                self.stats['budget_denied'] += 1
+            return allowed
+
+    def _hedge_target(self, model_name: str) -> str:
+        alternate = self.alternates.get(model_name)
+        if alternate and self.get_available_models is not None:
+            if alternate not in self.get_available_models():
+                return model_name
+        return alternate or model_name
+
+    def _submit(self, model_name: str, prompt: str, kwargs: Dict[str, Any],
+                cancel_event: threading.Event) -> Tuple[Future, bool]:
+        """提交请求，返回 (future, 是否以流式执行)"""
+        model = self.get_model(model_name)
+        streamed = self.streaming and supports_streaming(model)
+        start = time.perf_counter()
+
+        def run() -> Any:
+            if not streamed:
+                return model.generate_text(prompt, **kwargs)
+            parts = []
+            stream = model.stream_text(prompt, **kwargs)
+            try:
+                for chunk in stream:
+                    if cancel_event.is_set():
+                        raise HedgeCancelled(model_name)
+                    parts.append(chunk)
+            finally:
+                close = getattr(stream, 'close', None)
+                if close is not None:
+                    close()
+            return ''.join(parts)
+
+        def record(future: Future) -> None:
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None and not isinstance(error, HedgeCancelled):
+                return
+            with self._lock:
+                # 被中止的请求：真实延迟不短于已耗时间，记为删失样本
+                if error is not None:
+                    self.stats['censored_samples'] += 1
+                self._histogram(model_name).observe(time.perf_counter() - start)
+
+        future = self._executor.submit(run)
+        future.add_done_callback(record)
+        return future, streamed
+
+    def generate_text(self, prompt: str, model_name: str, **kwargs) -> str:
+        """
+        以对冲方式生成文本
+
+        Args:
+            prompt: 提示词
+            model_name: 首选模型
+            **kwargs: 透传给模型的参数
+
+        Returns:
+            先成功返回的结果
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+        primary_cancel = threading.Event()
+        primary, primary_streamed = self._submit(model_name, prompt, kwargs, primary_cancel)
+        delay = self.hedge_delay(model_name)
+        if delay is None:
+            return primary.result()
+
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_budget():
+            return primary.result()
+
+        target = self._hedge_target(model_name)
+        logger.debug(f"请求超过 {delay:.2f} 秒未返回，向 {target} 发送对冲请求")
+        hedge_cancel = threading.Event()
+        hedge, hedge_streamed = self._submit(target, prompt, kwargs, hedge_cancel)
+        cancel_events = {primary: primary_cancel, hedge: hedge_cancel}
+        streamed = {primary: primary_streamed, hedge: hedge_streamed}
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                with self._lock:
+                    self.stats['hedge_wins' if future is hedge else 'primary_wins'] += 1
+                for loser in pending:
+                    self._cancel_loser(loser, cancel_events[loser], streamed[loser])
+                return future.result()
+        raise error  # type: ignore[misc]
+
+    def _cancel_loser(self, loser: Future, cancel_event: threading.Event, streamed: bool) -> None:
+        """取消落败请求，无法中止的阻塞调用计为 abandoned（仍会计费）"""
+        cancel_event.set()
+        if loser.cancel() or streamed:
+            outcome = 'cancelled'
+        else:
+            outcome = 'abandoned'
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """返回对冲统计（对冲率、对冲胜出次数、取消 / 仍计费的落败请求数等）"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['hedge_rate'] = stats['hedged'] / stats['requests'] if stats['requests'] else 0.0
+            stats['hedge_win_rate'] = stats['hedge_wins'] / stats['hedged'] if stats['hedged'] else 0.0
+            stats['deadlines'] = {
+                name: histogram.percentile(self.percentile)
+                for name, histogram in self._histograms.items()
+            }
+        return stats
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,130 @@
+"""
+索引化的筛选检索模块
+
+search_by_source / search_by_date_range 的索引友好实现，以及基于规范化标签表的
+search_by_tag。所需的索引与标签表由 schema_migrations 在连接池创建时建立。
+
+日期范围不再对 created_at 套用 DATE() 等函数（会使索引失效），而是改写为
+created_at >= 起始日 AND created_at < 结束日次日 的半开区间，直接走 created_at 索引。
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .compression import get_compressor
+from .db_pool import ConnectionPool, get_pool
+from .errors import SearchError
+
+RESULT_COLUMNS = ('id', 'source_file', 'chapter', 'raw_text', 'idea', 'tags', 'created_at')
+_SELECT = f"SELECT {', '.join(RESULT_COLUMNS)} FROM inspirations"
+
+
+def _open(db_path: str) -> ConnectionPool:
+    if db_path != ':memory:' and not os.path.exists(db_path):
+        raise SearchError(f"数据库文件不存在: {db_path}")
+    return get_pool(db_path)
+
+
+def _fetch(pool: ConnectionPool, sql: str, params: Tuple[Any, ...]) -> List[Dict[str, Any]]:
+    try:
+        with pool.reader() as conn:
+            rows = conn.execute(sql, params).fetchall()
+    except sqlite3.Error as e:
+        raise SearchError(f"检索失败: {e}")
+    return get_compressor(pool).decode_records([dict(zip(RESULT_COLUMNS, row)) for row in rows])
+
+
+def date_range_bounds(start_date: str, end_date: str) -> Tuple[str, str]:
+    """
+    把闭区间日期 [start_date, end_date] 转为 created_at 的半开区间
+
+    Args:
+        start_date: 起始日期 YYYY-MM-DD
+        end_date: 结束日期 YYYY-MM-DD（含当天）
+
+    Returns:
+        (下界, 上界)，用于 created_at >= 下界 AND created_at < 上界
+    """
+    try:
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+        end = datetime.strptime(end_date, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise SearchError(f"日期格式错误，应为 YYYY-MM-DD: {start_date} / {end_date}")
+    if start > end:
+        raise SearchError(f"起始日期不能晚于结束日期: {start_date} > {end_date}")
+    return start.strftime('%Y-%m-%d'), (end + timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def search_by_source(db_path: str, source_file: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    按源文件检索（使用 source_file, created_at 复合索引）
+
+    Args:
+        db_path: 数据库文件路径
+        source_file: 源文件名（精确匹配）
+        limit: 返回条数上限，None 表示不限
+
+    Returns:
+        按创建时间倒序的记录列表
+    """
+    if not source_file or not source_file.strip():
+        raise SearchError("源文件名不能为空")
+    pool = _open(db_path)
+    return _fetch(pool, f"{_SELECT} WHERE source_file = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+                  (source_file.strip(), -1 if limit is None else limit))
+
+
+def search_by_date_range(db_path: str, start_date: str, end_date: str,
+                         limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    按创建日期范围检索（使用 created_at 索引）
+
+    Args:
+        db_path: 数据库文件路径
+        start_date: 起始日期 YYYY-MM-DD
+        end_date: 结束日期 YYYY-MM-DD（含当天）
+        limit: 返回条数上限，None 表示不限
+
+    Returns:
+        按创建时间倒序的记录列表
+    """
+    lower, upper = date_range_bounds(start_date, end_date)
+    pool = _open(db_path)
+    return _fetch(pool, f"{_SELECT} WHERE created_at >= ? AND created_at < ? "
+                        "ORDER BY created_at DESC, id DESC LIMIT ?",
+                  (lower, upper, -1 if limit is None else limit))
+
+
+def search_by_tag(db_path: str, tag: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    按标签精确检索（使用 inspiration_tags 表，不再对 tags 字符串做 LIKE）
+
+    Args:
+        db_path: 数据库文件路径
+        tag: 标签
+        limit: 返回条数上限，None 表示不限
+
+    Returns:
+        按 ID 倒序的记录列表
+    """
+    if not tag or not tag.strip():
+        raise SearchError("标签不能为空")
+    pool = _open(db_path)
+    columns = ', '.join(f'i.{name}' for name in RESULT_COLUMNS)
+    return _fetch(pool, f"SELECT {columns} FROM inspiration_tags t JOIN inspirations i ON i.id = t.inspiration_id "
+                        "WHERE t.tag = ? ORDER BY t.inspiration_id DESC LIMIT ?",
+                  (tag.strip(), -1 if limit is None else limit))
+
+
+def list_tags(db_path: str, limit: int = 100) -> List[Tuple[str, int]]:
+    """返回使用次数最多的标签及其次数"""
+    pool = _open(db_path)
+    try:
+        with pool.reader() as conn:
+            return [tuple(row) for row in conn.execute(
+                "SELECT tag, COUNT(*) AS n FROM inspiration_tags GROUP BY tag ORDER BY n DESC, tag LIMIT ?",
+                (limit,))]
+    except sqlite3.Error as e:
+        raise SearchError(f"读取标签失败: {e}")
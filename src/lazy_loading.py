@@ -0,0 +1,181 @@
+"""
+模型与 SDK 延迟加载模块
+
+LLMManager 启动时只校验配置，不创建模型对象、不导入 openai / anthropic SDK；
+模型在首次 get_model / generate_text 时才实例化，SDK 在首次真正发起调用时才导入。
+仅使用 mock 的测试、演示与工作进程因此可以快速启动。
+"""
+
+import importlib
+import logging
+import threading
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 提供商 -> (模块, 类名)；模块名相对于本包
+PROVIDER_CLASSES: Dict[str, Tuple[str, str]] = {
+    'openai': ('.llm_manager', 'OpenAILLM'),
+    'claude': ('.llm_manager', 'ClaudeLLM'),
+    'qwen': ('.llm_manager', 'QwenLLM'),
+    'deepseek': ('.llm_manager', 'DeepSeekLLM'),
+    'mock': ('.mock_server', 'ProfiledMockLLM'),
+    'local': ('.local_embedding', 'LocalEmbeddingLLM'),
+}
+
+_NUMERIC_RANGES = {
+    'max_tokens': (1, 1000000),
+    'temperature': (0.0, 2.0),
+    'timeout': (0.001, 3600),
+}
+
+
+class LazyModule(ModuleType):
+    """首次访问属性时才真正导入的模块代理"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._lazy_module: Optional[ModuleType] = None
+        self._lazy_lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        if self._lazy_module is None:
+            with self._lazy_lock:
+                if self._lazy_module is None:
+                    logger.debug(f"延迟导入模块: {self.__name__}")
+                    self._lazy_module = importlib.import_module(self.__name__)
+        return self._lazy_module
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._lazy_module is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._load(), name)
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    返回延迟导入的模块代理
+
+    用法（替换模块顶部的 ``import openai``）：
+        openai = lazy_import('openai')
+    """
+    return LazyModule(name)
+
+
+def validate_model_config(name: str, config: Any) -> None:
+    """
+    校验单个模型配置（在启动时立即执行）
+
+    Args:
+        name: 模型名称
+        config: LLMConfig 实例或等价的字典
+
+    Raises:
+        ValueError: 配置缺失字段、提供商未知或数值越界
+    """
+    def field(key: str) -> Any:
+        if isinstance(config, dict):
+            return config.get(key)
+        return getattr(config, key, None)
+
+    provider = field('provider')
+    provider = getattr(provider, 'value', provider)
+    if not provider:
+        raise ValueError(f"模型 '{name}' 缺少 provider 配置")
+    if provider not in PROVIDER_CLASSES:
+        raise ValueError(f"模型 '{name}' 使用了不支持的提供商: {provider}")
+    if not field('model_name'):
+        raise ValueError(f"模型 '{name}' 缺少 model_name 配置")
+    for key, (low, high) in _NUMERIC_RANGES.items():
+        value = field(key)
+        if value is None:
+            continue
+        if not isinstance(value, (int, float)) or not low <= value <= high:
+            raise ValueError(f"模型 '{name}' 的 {key} 超出范围 [{low}, {high}]: {value}")
+
+
+def default_factory(name: str, config: Any) -> Any:
+    """按提供商导入对应的模型类并实例化"""
+    provider = config.get('provider') if isinstance(config, dict) else getattr(config, 'provider')
+    provider = getattr(provider, 'value', provider)
+    module_name, class_name = PROVIDER_CLASSES[provider]
+    module = importlib.import_module(module_name, package=__package__)
+    cls = getattr(module, class_name)
+    if provider == 'local':
+        return cls.from_config(config if isinstance(config, dict) else vars(config))
+    if provider == 'mock':
+        # 无负载特性的 ProfiledMockLLM 直接返回固定回复
+        return cls()
+    return cls(config)
+
+
+class LazyModelRegistry:
+    """
+    延迟实例化的模型注册表
+
+    构造时校验全部配置；get() 首次访问某个模型时才调用 factory 创建实例，
+    并发首次访问只会创建一次。
+    """
+
+    def __init__(self, configs: Dict[str, Any],
+                 factory: Callable[[str, Any], Any] = default_factory):
+        self.factory = factory
+        self._configs: Dict[str, Any] = {}
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        for name, config in configs.items():
+            self.add(name, config)
+
+    def add(self, name: str, config: Any) -> None:
+        """注册（或替换）模型配置；已创建的旧实例会被丢弃"""
+        validate_model_config(name, config)
+        with self._lock:
+            self._configs[name] = config
+            self._models.pop(name, None)
+
+    def remove(self, name: str) -> None:
+        with self._lock:
+            self._configs.pop(name, None)
+            self._models.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """
+        获取模型实例，首次访问时创建
+
+        Raises:
+            ValueError: 模型未配置
+        """
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._lock:
+            model = self._models.get(name)
+            if model is None:
+                if name not in self._configs:
+                    raise ValueError(f"模型 '{name}' 不存在")
+                logger.debug(f"首次使用，创建模型实例: {name}")
+                model = self.factory(name, self._configs[name])
+                self._models[name] = model
+            return model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def loaded_models(self) -> List[str]:
+        return list(self._models)
+
+    @property
+    def configs(self) -> Dict[str, Any]:
+        return dict(self._configs)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._configs
+
+    def __iter__(self):
+        return iter(list(self._configs))
+
+    def __len__(self) -> int:
+        return len(self._configs)
@@ -0,0 +1,148 @@
+"""
+本地 CPU 嵌入向量模块
+
+无需网络的嵌入提供商（provider ``local``），用于离线环境下的语义检索与混合检索。
+
+实现为字符 n-gram 哈希向量化：对中文按字符切分 1~3 元组，
+经哈希映射到固定维度并带符号累加，可选再做一次高斯随机投影，最后 L2 归一化。
+全部计算使用 NumPy 向量化完成，单条查询亚毫秒级，百万行语料可在数分钟内完成嵌入。
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:  # pragma: no cover - 取决于运行环境
+    np = None
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_PRIME = 1099511628211
+_MIX_1 = 0xff51afd7ed558ccd
+_MIX_2 = 0xc4ceb9fe1a85ec53
+_WHITESPACE = re.compile(r'\s+')
+
+
+class LocalEmbeddingError(Exception):
+    """本地嵌入错误"""
+    pass
+
+
+class LocalEmbeddingLLM:
+    """
+    本地哈希 n-gram 嵌入模型
+
+    接口与 LLMManager 中其他模型一致：get_embedding / get_embeddings /
+    is_available / get_model_info；不支持文本生成。
+    """
+
+    def __init__(self, dim: int = 256, ngram_range: Tuple[int, int] = (1, 3),
+                 hash_dim: Optional[int] = None, seed: int = 42,
+                 ngram_weights: Optional[Dict[int, float]] = None):
+        """
+        初始化本地嵌入模型
+
+        Args:
+            dim: 输出向量维度
+            ngram_range: n-gram 长度范围（闭区间）
+            hash_dim: 哈希空间维度；设置后先哈希到该维度再随机投影到 dim，
+                      为 None 时直接哈希到 dim
+            seed: 随机投影矩阵的种子，相同种子保证向量可复现
+            ngram_weights: 各长度 n-gram 的权重，默认单字权重减半
+        """
+        if not NUMPY_AVAILABLE:
+            raise LocalEmbeddingError("本地嵌入需要安装 numpy: pip install numpy")
+        if dim <= 0:
+            raise LocalEmbeddingError(f"向量维度必须为正数: {dim}")
+
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.hash_dim = hash_dim
+        self.seed = seed
+        self.ngram_weights = ngram_weights or {1: 0.5}
+        self.model_name = f"hashed-ngram-{dim}"
+
+        self._projection = None
+        if hash_dim:
+            rng = np.random.default_rng(seed)
+            self._projection = (rng.standard_normal((hash_dim, dim)) / np.sqrt(dim)).astype(np.float32)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'LocalEmbeddingLLM':
+        """从 llm_config.json 的 ``local_embedding`` 段创建"""
+        return cls(
+            dim=config.get('dim', 256),
+            ngram_range=tuple(config.get('ngram_range', (1, 3))),
+            hash_dim=config.get('hash_dim'),
+            seed=config.get('seed', 42),
+        )
+
+    def _vectorize(self, text: str) -> 'np.ndarray':
+        buckets = self.hash_dim or self.dim
+        text = _WHITESPACE.sub(' ', text.strip().lower())
+        if not text:
+            return np.zeros(self.dim, dtype=np.float32)
+
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        length = len(codes)
+        counts = np.zeros(buckets, dtype=np.float64)
+
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            if length < n:
+                break
+            width = length - n + 1
+            hashes = np.full(width, n, dtype=np.uint64)
+            for k in range(n):
+                hashes = hashes * np.uint64(_PRIME) + codes[k:k + width]
+            # murmur3 终结混合，使低位分布均匀
+            hashes ^= hashes >> np.uint64(33)
+            hashes *= np.uint64(_MIX_1)
+            hashes ^= hashes >> np.uint64(33)
+            hashes *= np.uint64(_MIX_2)
+            hashes ^= hashes >> np.uint64(33)
+
+            index = (hashes % np.uint64(buckets)).astype(np.int64)
+            signs = np.where(hashes >> np.uint64(63), -1.0, 1.0)
+            weight = self.ngram_weights.get(n, 1.0)
+            counts += weight * np.bincount(index, weights=signs, minlength=buckets)
+
+        vector = counts.astype(np.float32)
+        if self._projection is not None:
+            vector = vector @ self._projection
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def embed(self, texts: Sequence[str]) -> 'np.ndarray':
+        """批量嵌入，返回形状为 (len(texts), dim) 的 float32 矩阵"""
+        matrix = np.empty((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            matrix[row] = self._vectorize(text)
+        return matrix
+
+    def get_embedding(self, text: str, **kwargs) -> List[float]:
+        return self._vectorize(text).tolist()
+
+    def get_embeddings(self, texts: Sequence[str]) -> List[List[float]]:
+        return self.embed(texts).tolist()
+
+    def generate_text(self, prompt: str, **kwargs) -> str:
+        raise NotImplementedError("本地嵌入模型不支持文本生成")
+
+    def is_available(self) -> bool:
+        return True
+
+    def get_model_info(self) -> Dict[str, Any]:
+        return {
+            'provider': 'local',
+            'model_name': self.model_name,
+            'dim': self.dim,
+            'ngram_range': list(self.ngram_range),
+            'hash_dim': self.hash_dim,
+        }
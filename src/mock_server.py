@@ -0,0 +1,586 @@
+"""
+负载测试用的模拟提供商模块
+
+提供三个可配置延迟、吞吐上限与错误注入的模拟组件：
+1. ProfiledMockLLM：进程内包装器，给任意模型（通常是 MockLLM）加上延迟/限流/错误
+2. MockOpenAIServer：本地 HTTP 服务，兼容 OpenAI 的 chat/completions、embeddings 接口，
+   QwenLLM / OpenAILLM 把 api_base 指向它即可在真实 HTTP 路径上压测
+3. BatchJobEmulator：挂到 MockOpenAIServer 上的批处理任务（files / batches）生命周期模拟
+
+延迟分布写法：
+    fixed:1.5            固定 1.5 秒
+    uniform:1,10         1~10 秒均匀分布
+    normal:3,1           均值 3 秒、标准差 1 秒（截断到 0 以上）
+    lognormal:1.0,0.5    ln(延迟) ~ N(1.0, 0.5)
+
+Usage:
+    python -m src.mock_server --port 8765 --latency lognormal:1.0,0.5 --max-rps 20 --rate-limit-rate 0.05
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .rate_limiter import TokenBucket, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESPONSE = json.dumps({
+    'theme': '主角在逆境中坚持理想，最终实现自我成长',
+    'characters': ['主角', '导师'],
+    'world_elements': '江湖门派与隐世高人',
+    'plot_points': ['初入江湖', '拜师学艺'],
+    'writing_style': '细腻的环境描写与人物心理刻画'
+}, ensure_ascii=False)
+
+
+class MockProviderError(Exception):
+    """模拟提供商返回的错误，带 HTTP 状态码"""
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"{status_code} {message}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LatencyProfile:
+    """延迟分布"""
+
+    KINDS = ('fixed', 'uniform', 'normal', 'lognormal')
+
+    def __init__(self, kind: str = 'fixed', params: Tuple[float, ...] = (0.0,), seed: Optional[int] = None):
+        if kind not in self.KINDS:
+            raise ValueError(f"不支持的延迟分布: {kind}")
+        self.kind = kind
+        self.params = tuple(params)
+        self._random = random.Random(seed)
+
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = None) -> 'LatencyProfile':
+        """解析 ``kind:p1,p2`` 格式的延迟分布描述"""
+        kind, _, raw = spec.partition(':')
+        params = tuple(float(part) for part in raw.split(',') if part.strip()) or (0.0,)
+        return cls(kind.strip(), params, seed=seed)
+
+    def sample(self) -> float:
+        """采样一次延迟（秒）"""
+        if self.kind == 'fixed':
+            return self.params[0]
+        if self.kind == 'uniform':
+            return self._random.uniform(self.params[0], self.params[1])
+        if self.kind == 'normal':
+            return max(0.0, self._random.gauss(self.params[0], self.params[1]))
+        return self._random.lognormvariate(self.params[0], self.params[1])
+
+
+class LoadProfile:
+    """模拟提供商的负载特性：延迟、吞吐上限与错误注入"""
+
+    def __init__(self, latency: Optional[LatencyProfile] = None, max_rps: Optional[float] = None,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 retry_after: float = 1.0, seed: Optional[int] = None):
+        """
+        Args:
+            latency: 延迟分布，默认无延迟
+            max_rps: 每秒请求数上限，超出返回 429
+            error_rate: 随机返回 500 的概率
+            rate_limit_rate: 随机返回 429 的概率（模拟限流风暴）
+            retry_after: 429 响应建议的重试等待秒数
+            seed: 随机种子
+        """
+        self.latency = latency or LatencyProfile()
+        self.max_rps = max_rps
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._bucket = TokenBucket(max_rps, max_rps) if max_rps else None
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'ok': 0, 'throttled': 0, 'errors': 0}
+
+    def admit(self) -> float:
+        """
+        判定一次请求的结果
+
+        Returns:
+            该请求应模拟的延迟秒数
+
+        Raises:
+            MockProviderError: 被限流（429）或注入错误（500）
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+            if self._bucket is not None:
+                if self._bucket.time_until(1, time.monotonic()) > 0:
+                    self.stats['throttled'] += 1
+                    raise MockProviderError(429, 'Too Many Requests', self.retry_after)
+                self._bucket.consume(1)
+            roll = self._random.random()
+            if roll < self.rate_limit_rate:
+                self.stats['throttled'] += 1
+                raise MockProviderError(429, 'Too Many Requests', self.retry_after)
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.stats['errors'] += 1
+                raise MockProviderError(500, 'Internal Server Error')
+            self.stats['ok'] += 1
+        return self.latency.sample()
+
+
+class ProfiledMockLLM:
+    """
+    带负载特性的进程内模拟模型
+
+    包装任意模型（默认直接返回固定回复），每次调用先按 LoadProfile 判定限流/错误并休眠。
+    """
+
+    def __init__(self, llm: Any = None, profile: Optional[LoadProfile] = None,
+                 fixed_response: str = DEFAULT_RESPONSE, sleep: Callable[[float], None] = time.sleep):
+        self.llm = llm
+        self.profile = profile or LoadProfile()
+        self.fixed_response = fixed_response
+        self.sleep = sleep
+        self.call_count = 0
+
+    def generate_text(self, prompt: str, **kwargs) -> str:
+        self.call_count += 1
+        self.sleep(self.profile.admit())
+        if self.llm is not None:
+            return self.llm.generate_text(prompt, **kwargs)
+        return self.fixed_response
+
+    def get_embedding(self, text: str, **kwargs) -> List[float]:
+        self.call_count += 1
+        self.sleep(self.profile.admit())
+        if self.llm is not None:
+            return self.llm.get_embedding(text, **kwargs)
+        return fake_embedding(text)
+
+    def get_embeddings(self, texts: Sequence[str]) -> List[List[float]]:
+        # 与真实批量接口一致：整批只占一次请求额度
+        self.call_count += 1
+        self.sleep(self.profile.admit())
+        if self.llm is not None:
+            if hasattr(self.llm, 'get_embeddings'):
+                return self.llm.get_embeddings(texts)
+            return [self.llm.get_embedding(text) for text in texts]
+        return [fake_embedding(text) for text in texts]
+
+    def is_available(self) -> bool:
+        return True
+
+    def get_model_info(self) -> Dict[str, Any]:
+        if self.llm is not None:
+            info = dict(self.llm.get_model_info())
+        else:
+            info = {'provider': 'mock', 'model_name': 'profiled-mock'}
+        info['load_profile'] = self.profile.stats
+        return info
+
+    def __getattr__(self, name: str) -> Any:
+        if self.llm is None:
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+def fake_embedding(text: str, dim: int = 64) -> List[float]:
+    """由文本哈希确定的伪嵌入向量（相同文本结果相同）"""
+    rng = random.Random(hashlib.sha256(text.encode('utf-8')).digest())
+    vector = [rng.gauss(0, 1) for _ in range(dim)]
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: 'MockOpenAIServer'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(format % args)
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        if isinstance(payload, RawResponse):
+            body, content_type = payload.content, payload.content_type
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _dispatch(self, method: str) -> None:
+        path = self.path.split('?', 1)[0].rstrip('/')
+        body = self._read_body()
+        handler, params = self.server.resolve(method, path)
+        if handler is None:
+            self._send_json(404, {'error': {'message': f'Unknown route {method} {path}', 'type': 'invalid_request_error'}})
+            return
+        try:
+            if handler.__name__ in self.server.profiled_routes:
+                time.sleep(self.server.profile.admit())
+            status, payload = handler(self, body, *params)
+            self._send_json(status, payload)
+        except MockProviderError as e:
+            headers = {'Retry-After': str(e.retry_after)} if e.retry_after else None
+            error_type = 'rate_limit_exceeded' if e.status_code == 429 else 'server_error'
+            self._send_json(e.status_code, {'error': {'message': str(e), 'type': error_type}}, headers)
+        except KeyError as e:
+            self._send_json(404, {'error': {'message': f'Not found: {e}', 'type': 'invalid_request_error'}})
+        except ValueError as e:
+            self._send_json(400, {'error': {'message': str(e), 'type': 'invalid_request_error'}})
+
+    def do_GET(self) -> None:
+        self._dispatch('GET')
+
+    def do_POST(self) -> None:
+        self._dispatch('POST')
+
+
+def _chat_completions(handler: _Handler, body: bytes) -> Tuple[int, Dict[str, Any]]:
+    request = json.loads(body or b'{}')
+    messages = request.get('messages') or []
+    prompt = ''.join(str(message.get('content', '')) for message in messages)
+    content = handler.server.responder(prompt)
+    prompt_tokens = estimate_tokens(prompt)
+    completion_tokens = estimate_tokens(content)
+    return 200, {
+        'id': f'chatcmpl-{uuid.uuid4().hex[:24]}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': request.get('model', 'mock-llm'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop',
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _embeddings(handler: _Handler, body: bytes) -> Tuple[int, Dict[str, Any]]:
+    request = json.loads(body or b'{}')
+    inputs = request.get('input', [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    dim = int(request.get('dimensions') or handler.server.embedding_dim)
+    tokens = sum(estimate_tokens(text) for text in inputs)
+    return 200, {
+        'object': 'list',
+        'model': request.get('model', 'mock-embedding'),
+        'data': [
+            {'object': 'embedding', 'index': index, 'embedding': fake_embedding(text, dim)}
+            for index, text in enumerate(inputs)
+        ],
+        'usage': {'prompt_tokens': tokens, 'total_tokens': tokens},
+    }
+
+
+def _models(handler: _Handler, body: bytes) -> Tuple[int, Dict[str, Any]]:
+    return 200, {'object': 'list', 'data': [{'id': 'mock-llm', 'object': 'model', 'owned_by': 'local'}]}
+
+
+class BatchJobEmulator:
+    """
+    OpenAI 批处理接口的本地模拟
+
+    支持 /v1/files 上传与下载、/v1/batches 创建/查询/取消。任务创建后先处于 validating，
+    随后 in_progress，经过 processing_time 秒后生成结果文件并变为 completed；
+    结果逐行调用服务的 responder 生成，custom_id 原样返回。
+    """
+
+    def __init__(self, processing_time: float = 1.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.processing_time = processing_time
+        self.failure_rate = failure_rate
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._started: Dict[str, float] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def install(self, server: 'MockOpenAIServer') -> None:
+        """在服务上注册批处理相关路由"""
+        self.server = server
+        server.add_route('POST', '/v1/files', self.upload_file)
+        server.add_route('GET', '/v1/files/{file_id}', self.retrieve_file)
+        server.add_route('GET', '/v1/files/{file_id}/content', self.file_content)
+        server.add_route('POST', '/v1/batches', self.create_batch)
+        server.add_route('GET', '/v1/batches/{batch_id}', self.retrieve_batch)
+        server.add_route('POST', '/v1/batches/{batch_id}/cancel', self.cancel_batch)
+
+    def _store_file(self, content: bytes, filename: str, purpose: str) -> Dict[str, Any]:
+        file_id = f'file-{uuid.uuid4().hex[:24]}'
+        meta = {
+            'id': file_id,
+            'object': 'file',
+            'bytes': len(content),
+            'created_at': int(time.time()),
+            'filename': filename,
+            'purpose': purpose,
+        }
+        self.files[file_id] = {'meta': meta, 'content': content}
+        return meta
+
+    def upload_file(self, handler: _Handler, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        content_type = handler.headers.get('Content-Type', '')
+        message = BytesParser(policy=default_policy).parsebytes(
+            f'Content-Type: {content_type}\r\n\r\n'.encode('latin-1') + body
+        )
+        fields: Dict[str, Any] = {}
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            fields[name] = (part.get_filename(), part.get_payload(decode=True))
+        if 'file' not in fields:
+            raise ValueError('缺少 file 字段')
+        filename, content = fields['file']
+        purpose = (fields.get('purpose') or (None, b'batch'))[1].decode('utf-8')
+        with self._lock:
+            return 200, self._store_file(content, filename or 'upload.jsonl', purpose)
+
+    def retrieve_file(self, handler: _Handler, body: bytes, file_id: str) -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            return 200, self.files[file_id]['meta']
+
+    def file_content(self, handler: _Handler, body: bytes, file_id: str) -> Tuple[int, Any]:
+        with self._lock:
+            content = self.files[file_id]['content']
+        return 200, RawResponse(content, 'application/jsonl')
+
+    def create_batch(self, handler: _Handler, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        request = json.loads(body or b'{}')
+        input_file_id = request['input_file_id']
+        with self._lock:
+            if input_file_id not in self.files:
+                raise KeyError(f'文件不存在: {input_file_id}')
+            batch_id = f'batch_{uuid.uuid4().hex[:24]}'
+            lines = self.files[input_file_id]['content'].decode('utf-8').splitlines()
+            total = sum(1 for line in lines if line.strip())
+            batch = {
+                'id': batch_id,
+                'object': 'batch',
+                'endpoint': request.get('endpoint', '/v1/chat/completions'),
+                'input_file_id': input_file_id,
+                'completion_window': request.get('completion_window', '24h'),
+                'status': 'validating',
+                'output_file_id': None,
+                'error_file_id': None,
+                'created_at': int(time.time()),
+                'metadata': request.get('metadata'),
+                'request_counts': {'total': total, 'completed': 0, 'failed': 0},
+            }
+            self.batches[batch_id] = batch
+            self._started[batch_id] = time.monotonic()
+            return 200, dict(batch)
+
+    def _advance(self, batch: Dict[str, Any]) -> None:
+        if batch['status'] not in ('validating', 'in_progress'):
+            return
+        elapsed = time.monotonic() - self._started[batch['id']]
+        if elapsed < self.processing_time * 0.2:
+            return
+        if elapsed < self.processing_time:
+            batch['status'] = 'in_progress'
+            return
+
+        outputs, errors = [], []
+        content = self.files[batch['input_file_id']]['content'].decode('utf-8')
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            custom_id = request.get('custom_id')
+            if self._random.random() < self.failure_rate:
+                errors.append({
+                    'id': f'batch_req_{uuid.uuid4().hex[:16]}',
+                    'custom_id': custom_id,
+                    'response': None,
+                    'error': {'code': 'server_error', 'message': '模拟的单条请求失败'},
+                })
+                continue
+            messages = request.get('body', {}).get('messages') or []
+            prompt = ''.join(str(message.get('content', '')) for message in messages)
+            reply = self.server.responder(prompt)
+            outputs.append({
+                'id': f'batch_req_{uuid.uuid4().hex[:16]}',
+                'custom_id': custom_id,
+                'response': {
+                    'status_code': 200,
+                    'request_id': uuid.uuid4().hex,
+                    'body': {
+                        'object': 'chat.completion',
+                        'model': request.get('body', {}).get('model', 'mock-llm'),
+                        'choices': [{
+                            'index': 0,
+                            'message': {'role': 'assistant', 'content': reply},
+                            'finish_reason': 'stop',
+                        }],
+                        'usage': {
+                            'prompt_tokens': estimate_tokens(prompt),
+                            'completion_tokens': estimate_tokens(reply),
+                            'total_tokens': estimate_tokens(prompt) + estimate_tokens(reply),
+                        },
+                    },
+                },
+                'error': None,
+            })
+
+        def to_jsonl(rows: List[Dict[str, Any]]) -> bytes:
+            return ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows).encode('utf-8')
+
+        batch['output_file_id'] = self._store_file(to_jsonl(outputs), f"{batch['id']}_output.jsonl",
+                                                   'batch_output')['id']
+        if errors:
+            batch['error_file_id'] = self._store_file(to_jsonl(errors), f"{batch['id']}_error.jsonl",
+                                                      'batch_output')['id']
+        batch['request_counts'] = {'total': len(outputs) + len(errors),
+                                   'completed': len(outputs), 'failed': len(errors)}
+        batch['status'] = 'completed'
+        batch['completed_at'] = int(time.time())
+
+    def retrieve_batch(self, handler: _Handler, body: bytes, batch_id: str) -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            batch = self.batches[batch_id]
+            self._advance(batch)
+            return 200, dict(batch)
+
+    def cancel_batch(self, handler: _Handler, body: bytes, batch_id: str) -> Tuple[int, Dict[str, Any]]:
+        with self._lock:
+            batch = self.batches[batch_id]
+            if batch['status'] in ('validating', 'in_progress'):
+                batch['status'] = 'cancelled'
+            return 200, dict(batch)
+
+
+class RawResponse:
+    """非 JSON 的原始响应体（如文件内容下载）"""
+
+    def __init__(self, content: bytes, content_type: str = 'application/octet-stream'):
+        self.content = content
+        self.content_type = content_type
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """
+    本地 OpenAI 兼容模拟服务
+
+    chat/completions 与 embeddings 接口受 LoadProfile 控制；其他模块可通过
+    add_route 注册额外接口（例如批处理任务接口）。
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, profile: Optional[LoadProfile] = None,
+                 responder: Optional[Callable[[str], str]] = None, embedding_dim: int = 64):
+        """
+        Args:
+            host: 监听地址
+            port: 监听端口，0 表示自动分配
+            profile: 负载特性
+            responder: 根据提示词生成回复的函数，默认返回固定的灵感 JSON
+            embedding_dim: 嵌入向量维度
+        """
+        super().__init__((host, port), _Handler)
+        self.profile = profile or LoadProfile()
+        self.responder = responder or (lambda prompt: DEFAULT_RESPONSE)
+        self.embedding_dim = embedding_dim
+        self.routes: List[Tuple[str, List[str], Callable[..., Tuple[int, Any]]]] = []
+        self.profiled_routes = {'_chat_completions', '_embeddings'}
+        self._thread: Optional[threading.Thread] = None
+        self.add_route('POST', '/v1/chat/completions', _chat_completions)
+        self.add_route('POST', '/v1/embeddings', _embeddings)
+        self.add_route('GET', '/v1/models', _models)
+
+    def add_route(self, method: str, pattern: str, handler: Callable[..., Tuple[int, Any]]) -> None:
+        """注册路由，pattern 中的 ``{name}`` 段作为位置参数传给 handler"""
+        self.routes.append((method, pattern.rstrip('/').split('/'), handler))
+
+    def resolve(self, method: str, path: str) -> Tuple[Optional[Callable[..., Tuple[int, Any]]], List[str]]:
+        parts = path.split('/')
+        for route_method, pattern, handler in self.routes:
+            if route_method != method or len(pattern) != len(parts):
+                continue
+            params = []
+            for expected, actual in zip(pattern, parts):
+                if expected.startswith('{') and expected.endswith('}'):
+                    params.append(actual)
+                elif expected != actual:
+                    break
+            else:
+                return handler, params
+        return None, []
+
+    @property
+    def url(self) -> str:
+        """可直接作为 api_base 使用的地址"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> 'MockOpenAIServer':
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self.serve_forever, name='mock-openai-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容模拟服务（负载测试用）")
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口')
+    parser.add_argument('--latency', default='fixed:0', help='延迟分布，如 lognormal:1.0,0.5')
+    parser.add_argument('--max-rps', type=float, help='每秒请求数上限，超出返回 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='随机返回 500 的概率')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='随机返回 429 的概率')
+    parser.add_argument('--seed', type=int, help='随机种子')
+    parser.add_argument('--batch-processing-time', type=float,
+                        help='启用批处理接口模拟，并设置每个任务的处理秒数')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    profile = LoadProfile(
+        latency=LatencyProfile.parse(args.latency, seed=args.seed),
+        max_rps=args.max_rps,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+    server = MockOpenAIServer(args.host, args.port, profile=profile)
+    if args.batch_processing_time is not None:
+        BatchJobEmulator(processing_time=args.batch_processing_time, seed=args.seed).install(server)
+    print(f"🚀 模拟服务已启动: {server.url}")
+    print("   在 llm_config.json 中将 api_base 设为该地址即可")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹ 服务已停止")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
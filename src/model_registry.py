@@ -0,0 +1,251 @@
+"""
+写时复制的模型注册表模块
+
+模型配置与当前模型状态保存在不可变快照中，写操作（切换模型、增删模型）
+在写锁内构造新快照后整体替换引用，读操作只读取一次引用，无需加锁，
+进行中的请求继续使用它开始时拿到的快照，不会被模型切换阻塞。
+
+set_current_model(persist=True) 不在请求路径上写 .env，而是交给后台线程：
+连续多次持久化请求会合并为一次写入，写入时先备份为 .env.bak，
+再写临时文件并原子替换。
+"""
+
+import logging
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# 厂商 -> API key 环境变量名
+VENDOR_ENV_KEYS = {
+    'openai': 'OPENAI_API_KEY',
+    'claude': 'ANTHROPIC_API_KEY',
+    'qwen': 'QWEN_API_KEY',
+    'deepseek': 'DEEPSEEK_API_KEY',
+}
+VENDOR_LABELS = {
+    'openai': 'OpenAI 模型',
+    'claude': 'Claude 模型',
+    'qwen': 'Qwen 模型',
+    'deepseek': 'DeepSeek 模型',
+    'mock': 'Mock 模型',
+}
+
+
+def mask_api_key(api_key: Optional[str]) -> str:
+    """脱敏 API key，仅保留末 4 位"""
+    if not api_key:
+        return ''
+    return '*' * 8 + (api_key[-4:] if len(api_key) > 4 else '****')
+
+
+@dataclass(frozen=True)
+class RegistrySnapshot:
+    """注册表的不可变快照"""
+    configs: Mapping[str, Any]
+    current_model: str
+    api_keys: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    version: int = 0
+
+    def provider_of(self, name: str) -> str:
+        config = self.configs[name]
+        provider = config.get('provider') if isinstance(config, dict) else getattr(config, 'provider', name)
+        return getattr(provider, 'value', provider)
+
+
+class EnvPersister:
+    """后台写入 .env 的持久化器"""
+
+    def __init__(self, env_path: str = '.env'):
+        self.env_path = Path(env_path)
+        self._pending: Dict[str, str] = {}
+        self._cond = threading.Condition()
+        self._writing = False
+        self._thread: Optional[threading.Thread] = None
+        self.writes = 0
+        self.last_error: Optional[str] = None
+
+    def submit(self, updates: Dict[str, str]) -> None:
+        """提交待写入的环境变量（立即返回）"""
+        with self._cond:
+            self._pending.update(updates)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='env-persister', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._pending:
+                    self._cond.notify_all()
+                    self._thread = None
+                    return
+                updates, self._pending = self._pending, {}
+                self._writing = True
+            try:
+                self._write(updates)
+                self.last_error = None
+            except OSError as e:
+                self.last_error = str(e)
+                logger.error(f"写入 {self.env_path} 失败: {e}")
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def _write(self, updates: Dict[str, str]) -> None:
+        lines: List[str] = []
+        if self.env_path.exists():
+            shutil.copy2(self.env_path, self.env_path.with_name(self.env_path.name + '.bak'))
+            lines = self.env_path.read_text(encoding='utf-8').splitlines()
+
+        remaining = dict(updates)
+        for index, line in enumerate(lines):
+            key = line.split('=', 1)[0].strip()
+            if key in remaining and not line.lstrip().startswith('#'):
+                lines[index] = f"{key}={remaining.pop(key)}"
+        lines.extend(f"{key}={value}" for key, value in remaining.items())
+
+        tmp_path = self.env_path.with_name(self.env_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.env_path)
+        self.writes += 1
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待所有待写入内容落盘，返回是否在超时前完成"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._writing, timeout=timeout)
+
+
+class ModelRegistry:
+    """写时复制的模型注册表"""
+
+    def __init__(self, configs: Dict[str, Any], current_model: str = 'mock',
+                 persister: Optional[EnvPersister] = None):
+        """
+        初始化注册表
+
+        Args:
+            configs: 模型名称 -> 配置（LLMConfig 或字典）
+            current_model: 初始的当前模型
+            persister: .env 持久化器，默认写当前目录下的 .env
+        """
+        self._write_lock = threading.Lock()
+        self.persister = persister or EnvPersister()
+        self._snapshot = RegistrySnapshot(
+            configs=MappingProxyType(dict(configs)),
+            current_model=current_model,
+        )
+
+    @property
+    def snapshot(self) -> RegistrySnapshot:
+        """当前快照（无锁读取）"""
+        return self._snapshot
+
+    def _swap(self, **changes) -> RegistrySnapshot:
+        # 仅在持有写锁时调用
+        current = self._snapshot
+        values = {
+            'configs': current.configs,
+            'current_model': current.current_model,
+            'api_keys': current.api_keys,
+            'version': current.version + 1,
+        }
+        values.update(changes)
+        self._snapshot = RegistrySnapshot(**values)
+        return self._snapshot
+
+    # ---- 读取 ----
+
+    def list_models(self) -> List[str]:
+        return list(self._snapshot.configs)
+
+    def get_config(self, name: str) -> Any:
+        snapshot = self._snapshot
+        if name not in snapshot.configs:
+            raise ValueError(f"模型 '{name}' 不存在")
+        return snapshot.configs[name]
+
+    def get_api_key(self, vendor: str, snapshot: Optional[RegistrySnapshot] = None) -> Optional[str]:
+        """按 快照覆盖 > 环境变量 > 配置文件 的优先级取 API key"""
+        snapshot = snapshot or self._snapshot
+        if vendor in snapshot.api_keys:
+            return snapshot.api_keys[vendor]
+        env_key = VENDOR_ENV_KEYS.get(vendor)
+        if env_key and os.getenv(env_key):
+            return os.getenv(env_key)
+        config = snapshot.configs.get(vendor)
+        if config is None:
+            return None
+        return config.get('api_key') if isinstance(config, dict) else getattr(config, 'api_key', None)
+
+    def get_current_model(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        vendor = snapshot.current_model
+        api_key = self.get_api_key(vendor, snapshot) if vendor != 'mock' else None
+        return {
+            'vendor': vendor,
+            'has_api_key': bool(api_key),
+            'api_key_masked': mask_api_key(api_key),
+            'version': snapshot.version,
+        }
+
+    # ---- 写入 ----
+
+    def set_current_model(self, vendor: str, api_key: Optional[str] = None,
+                          persist: bool = False) -> Dict[str, Any]:
+        """
+        切换当前模型
+
+        Args:
+            vendor: 模型厂商（与配置中的模型名称一致）
+            api_key: 可选的 API key
+            persist: 是否写入 .env（后台异步完成）
+
+        Returns:
+            {'ok': bool, 'message': str}
+        """
+        with self._write_lock:
+            snapshot = self._snapshot
+            if vendor not in snapshot.configs:
+                return {'ok': False, 'message': f"不支持的模型厂商: {vendor}"}
+            api_keys = dict(snapshot.api_keys)
+            if api_key:
+                api_keys[vendor] = api_key
+            if vendor != 'mock' and not (api_key or self.get_api_key(vendor, snapshot)):
+                return {'ok': False, 'message': f"{VENDOR_LABELS.get(vendor, vendor)}需要提供 API Key"}
+            self._swap(current_model=vendor, api_keys=MappingProxyType(api_keys))
+
+        message = f"已切换到 {VENDOR_LABELS.get(vendor, vendor)}"
+        env_key = VENDOR_ENV_KEYS.get(vendor)
+        if persist and api_key and env_key:
+            self.persister.submit({env_key: api_key})
+            message += "，配置将在后台写入 .env"
+        return {'ok': True, 'message': message}
+
+    def add_model(self, name: str, config: Any) -> None:
+        with self._write_lock:
+            configs = dict(self._snapshot.configs)
+            configs[name] = config
+            self._swap(configs=MappingProxyType(configs))
+
+    def remove_model(self, name: str) -> None:
+        with self._write_lock:
+            snapshot = self._snapshot
+            if name not in snapshot.configs:
+                return
+            configs = dict(snapshot.configs)
+            del configs[name]
+            current = snapshot.current_model
+            if current == name:
+                current = 'mock' if 'mock' in configs else next(iter(configs), '')
+            self._swap(configs=MappingProxyType(configs), current_model=current)
@@ -0,0 +1,253 @@
+"""
+游标分页模块
+
+所有检索函数的键集（keyset）分页实现：翻页条件写成
+"排序键 严格位于上一页最后一条之后"，而不是 OFFSET，因此第 N 页与第 1 页的开销相同。
+
+排序键：
+- 关键词检索（like / fts）/ 标签检索：id
+- 源文件 / 日期范围检索：(created_at, id)
+
+fts 分页不按 bm25 排序：相关度会随写入和索引同步变化，作为键集会导致翻页时重复或遗漏。
+MATCH 只作为过滤条件，结果与 like 分页一样按 id 倒序；需要相关度排序时使用 search_fts。
+
+游标对调用方不透明（URL 安全的 base64），内含排序键与查询指纹；
+把一个查询的游标用于另一个查询会被拒绝。
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .compression import get_compressor
+from .errors import SearchError
+from .fts import build_match_query, get_index
+from .indexed_search import RESULT_COLUMNS, _open, date_range_bounds
+
+_COLUMNS = ', '.join(f'i.{name}' for name in RESULT_COLUMNS)
+
+
+@dataclass
+class Page:
+    """一页检索结果"""
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Web 接口的响应格式"""
+        return {'results': self.items, 'next_cursor': self.next_cursor, 'has_more': self.has_more}
+
+
+def _fingerprint(kind: str, query: Sequence[Any]) -> str:
+    raw = json.dumps([kind, *query], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:12]
+
+
+def encode_cursor(kind: str, query: Sequence[Any], key: Sequence[Any]) -> str:
+    """把排序键编码为不透明游标"""
+    payload = json.dumps([_fingerprint(kind, query), list(key)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], kind: str, query: Sequence[Any]) -> Optional[List[Any]]:
+    """
+    解码游标
+
+    Returns:
+        排序键；cursor 为空时返回 None
+
+    Raises:
+        SearchError: 游标损坏或不属于该查询
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        fingerprint, key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        raise SearchError("无效的分页游标")
+    if fingerprint != _fingerprint(kind, query) or not isinstance(key, list):
+        raise SearchError("分页游标与当前查询不匹配")
+    return key
+
+
+def _cursor_kind(cursor: str, query: Sequence[Any]) -> Optional[str]:
+    for kind in ('fts', 'like'):
+        try:
+            decode_cursor(cursor, kind, query)
+            return kind
+        except SearchError:
+            continue
+    return None
+
+
+def _page(pool, rows: List[sqlite3.Row], limit: int, kind: str, query: Sequence[Any],
+          key_of) -> Page:
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = get_compressor(pool).decode_records([dict(zip(RESULT_COLUMNS, row)) for row in rows])
+    next_cursor = encode_cursor(kind, query, key_of(rows[-1])) if has_more else None
+    return Page(items, next_cursor)
+
+
+def _run(pool, sql: str, params: Tuple[Any, ...]) -> List[sqlite3.Row]:
+    try:
+        with pool.reader() as conn:
+            return conn.execute(sql, params).fetchall()
+    except sqlite3.Error as e:
+        raise SearchError(f"检索失败: {e}")
+
+
+def _check_limit(limit: int) -> None:
+    if not isinstance(limit, int) or limit <= 0:
+        raise SearchError(f"limit 必须为正整数: {limit}")
+
+
+def search_inspirations_page(db_path: str, keyword: str, limit: int = 10, cursor: Optional[str] = None,
+                             search_mode: str = 'like', tokenizer: str = 'bigram') -> Page:
+    """
+    关键词检索（游标分页）
+
+    Args:
+        db_path: 数据库文件路径
+        keyword: 关键词
+        limit: 每页条数
+        cursor: 上一页返回的 next_cursor，首页为 None
+        search_mode: 'like' 或 'fts'
+        tokenizer: fts 模式的分词方式
+
+    Returns:
+        Page
+
+    两种模式都按 id 倒序分页。fts 模式在索引尚未建立时按 like 分页；待同步的行
+    （刚写入、尚未分词）与 FullTextIndex.search 一样按 LIKE 匹配当前文本，
+    因此翻页途中的索引同步不会让结果重复或遗漏。
+    """
+    _check_limit(limit)
+    if not keyword or not keyword.strip():
+        raise SearchError("搜索关键词不能为空")
+    keyword = keyword.strip()
+    pool = _open(db_path)
+    query = (keyword, search_mode, tokenizer)
+    match = None
+    if search_mode == 'fts':
+        index = get_index(db_path, tokenizer)
+        if index.is_ready():
+            match = build_match_query(keyword, tokenizer)
+        # 翻页途中索引建好时，沿用首页所用的 like 分页
+        if match is not None and cursor and _cursor_kind(cursor, query) == 'like':
+            match = None
+    elif search_mode != 'like':
+        raise SearchError(f"不支持的检索模式: {search_mode}")
+
+    kind = 'like' if match is None else 'fts'
+    key = decode_cursor(cursor, kind, query)
+    pattern = f"%{keyword}%"
+    where = f"({get_compressor(pool).sql_expr('i.raw_text')} LIKE ? OR i.idea LIKE ? OR i.tags LIKE ?)"
+    params: Tuple[Any, ...] = (pattern, pattern, pattern)
+    if match is not None:
+        # 已同步的行用 MATCH 过滤，待同步的行按 LIKE 匹配当前文本
+        where = (f"((i.id IN (SELECT rowid FROM {index.table} WHERE {index.table} MATCH ?) "
+                 f"AND i.id NOT IN (SELECT id FROM {index.pending_table})) "
+                 f"OR (i.id IN (SELECT id FROM {index.pending_table}) AND {where}))")
+        params = (match,) + params
+    if key is not None:
+        where += " AND i.id < ?"
+        params += (key[0],)
+    rows = _run(pool, f"SELECT {_COLUMNS} FROM inspirations i WHERE {where} ORDER BY i.id DESC LIMIT ?",
+                params + (limit + 1,))
+    return _page(pool, rows, limit, kind, query, lambda row: [row[0]])
+
+
+def _created_at_page(pool, kind: str, query: Sequence[Any], where: str, params: Tuple[Any, ...],
+                     limit: int, cursor: Optional[str], upper: Optional[str] = None) -> Page:
+    key = decode_cursor(cursor, kind, query)
+    if key is not None:
+        # 行值比较可直接利用 (…, created_at) 索引做范围扫描；游标本身已在上界之内，
+        # 不再附加原上界（两个上界并存时 SQLite 只会用其中一个定位索引）
+        where += " AND (i.created_at, i.id) < (?, ?)"
+        params += (key[0], key[1])
+    elif upper is not None:
+        where += " AND i.created_at < ?"
+        params += (upper,)
+    rows = _run(pool, f"SELECT {_COLUMNS} FROM inspirations i WHERE {where} "
+                      "ORDER BY i.created_at DESC, i.id DESC LIMIT ?", params + (limit + 1,))
+    return _page(pool, rows, limit, kind, query, lambda row: [row[6], row[0]])
+
+
+def search_by_source_page(db_path: str, source_file: str, limit: int = 10,
+                          cursor: Optional[str] = None) -> Page:
+    """按源文件检索（游标分页，按创建时间倒序）"""
+    _check_limit(limit)
+    if not source_file or not source_file.strip():
+        raise SearchError("源文件名不能为空")
+    source_file = source_file.strip()
+    return _created_at_page(_open(db_path), 'source', (source_file,), "i.source_file = ?", (source_file,),
+                            limit, cursor)
+
+
+def search_by_date_range_page(db_path: str, start_date: str, end_date: str, limit: int = 10,
+                              cursor: Optional[str] = None) -> Page:
+    """按创建日期范围检索（游标分页，按创建时间倒序）"""
+    _check_limit(limit)
+    lower, upper = date_range_bounds(start_date, end_date)
+    return _created_at_page(_open(db_path), 'date', (lower, upper), "i.created_at >= ?", (lower,),
+                            limit, cursor, upper=upper)
+
+
+def search_by_tag_page(db_path: str, tag: str, limit: int = 10, cursor: Optional[str] = None) -> Page:
+    """按标签检索（游标分页，按 ID 倒序）"""
+    _check_limit(limit)
+    if not tag or not tag.strip():
+        raise SearchError("标签不能为空")
+    tag = tag.strip()
+    key = decode_cursor(cursor, 'tag', (tag,))
+    where, params = "t.tag = ?", (tag,)
+    if key is not None:
+        where += " AND t.inspiration_id < ?"
+        params += (key[0],)
+    pool = _open(db_path)
+    rows = _run(pool, f"SELECT {_COLUMNS} FROM inspiration_tags t JOIN inspirations i ON i.id = t.inspiration_id "
+                      f"WHERE {where} ORDER BY t.inspiration_id DESC LIMIT ?", params + (limit + 1,))
+    return _page(pool, rows, limit, 'tag', (tag,), lambda row: [row[0]])
+
+
+def paginate_ranked(results: List[Dict[str, Any]], query: Sequence[Any], limit: int = 10,
+                    cursor: Optional[str] = None, score_key: str = 'score') -> Page:
+    """
+    对已按 (分数降序, id 降序) 排好的结果做游标分页
+
+    用于 SearchEnhancement.search 等在 Python 中打分的检索：游标记录上一页最后一条的
+    (分数, id)，下一页从其后开始，结果集在两次请求之间变化时也不会重复或遗漏。
+
+    Args:
+        results: 检索结果，每条需包含 score_key 与 'id'
+        query: 用于生成查询指纹的参数
+        limit: 每页条数
+        cursor: 上一页返回的 next_cursor
+        score_key: 分数字段名
+
+    Returns:
+        Page
+    """
+    _check_limit(limit)
+    key = decode_cursor(cursor, 'ranked', query)
+    ordered = sorted(results, key=lambda item: (-item[score_key], -item['id']))
+    if key is not None:
+        score, last_id = key
+        ordered = [item for item in ordered
+                   if item[score_key] < score or (item[score_key] == score and item['id'] < last_id)]
+    items = ordered[:limit]
+    next_cursor = None
+    if len(ordered) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor('ranked', query, [last[score_key], last['id']])
+    return Page(items, next_cursor)
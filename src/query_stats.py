@@ -0,0 +1,411 @@
+"""
+SQL 语句统计与慢查询日志模块
+
+对 db_pool 创建的连接逐条计时（含取结果的时间），按"查询形状"（去掉字面量、
+折叠 IN 列表后的 SQL）聚合延迟直方图；超过阈值的语句写入慢查询日志，附带
+EXPLAIN QUERY PLAN 输出、返回行数与虚拟机步数，便于在上线前发现全表扫描。
+
+Python 的 sqlite3 没有暴露 sqlite3_stmt_status，扫描量用进度回调统计的虚拟机
+指令数近似（每 progress_steps 条指令计一次），与扫描的行数成正比。
+
+启用后只影响之后新建的连接，应在打开连接池之前调用：
+
+    from src.query_stats import enable_query_stats, get_query_stats
+
+    enable_query_stats(slow_ms=100)
+    ...
+    get_query_stats().summary()      # 挂到状态接口
+
+配置示例（config.json 的 database 段）：
+
+    "query_stats": {"enabled": false, "slow_ms": 100, "explain": true}
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+from .db_pool import register_connection_hook, set_connection_factory
+from .telemetry import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# 语句延迟直方图桶上界（秒），比 LLM 调用细得多
+QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+OTHER_SHAPE = '<other>'
+_EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT', 'REPLACE')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES = re.compile(r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql: str) -> str:
+    """
+    把 SQL 归一化为查询形状：字面量替换为 ?，IN 列表与多行 VALUES 折叠，空白合并
+
+    Args:
+        sql: 原始 SQL
+
+    Returns:
+        查询形状
+    """
+    shape = _STRING.sub('?', sql)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('IN (...)', shape)
+    shape = _VALUES.sub(r'\1, ...', shape)
+    return _SPACE.sub(' ', shape).strip().rstrip(';')
+
+
+def _is_full_scan(plan: Sequence[str]) -> bool:
+    for detail in plan:
+        if detail.startswith('SCAN ') and 'VIRTUAL TABLE' not in detail and 'CONSTANT ROW' not in detail:
+            return True
+    return False
+
+
+class ShapeStats:
+    """单个查询形状的累计统计"""
+
+    def __init__(self, shape: str):
+        self.shape = shape
+        self.latency = LatencyHistogram(sample_size=256, bounds=QUERY_BUCKETS)
+        self.rows = 0
+        self.vm_steps = 0
+        self.slow = 0
+        self.errors = 0
+        self.plan: Optional[List[str]] = None
+        self.last_logged = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        latency = self.latency.to_dict()
+        return {
+            'shape': self.shape,
+            'count': latency['count'],
+            'total': self.latency.total,
+            'mean': latency['mean'],
+            'p50': latency['p50'],
+            'p95': latency['p95'],
+            'p99': latency['p99'],
+            'max': latency['max'],
+            'rows': self.rows,
+            'vm_steps': self.vm_steps,
+            'slow': self.slow,
+            'errors': self.errors,
+            'full_scan': _is_full_scan(self.plan) if self.plan is not None else None,
+            'plan': self.plan,
+            'buckets': latency['buckets'],
+        }
+
+
+class QueryStats:
+    """按查询形状聚合的语句统计"""
+
+    def __init__(self, slow_ms: float = 100.0, explain: bool = True, max_shapes: int = 500,
+                 recent_slow: int = 100, log_interval: float = 60.0, progress_steps: int = 1000):
+        """
+        初始化统计
+
+        Args:
+            slow_ms: 慢查询阈值（毫秒）
+            explain: 慢查询是否执行 EXPLAIN QUERY PLAN（每个形状只执行一次）
+            max_shapes: 最多跟踪的形状数，超出后归入 '<other>'
+            recent_slow: 保留最近慢查询的条数
+            log_interval: 同一形状写慢查询日志的最小间隔（秒），避免刷屏
+            progress_steps: 进度回调间隔的虚拟机指令数，0 表示不统计扫描量
+        """
+        self.slow_threshold = slow_ms / 1000.0
+        self.explain = explain
+        self.max_shapes = max_shapes
+        self.log_interval = log_interval
+        self.progress_steps = progress_steps
+        self._shapes: 'OrderedDict[str, ShapeStats]' = OrderedDict()
+        self._slow: Deque[Dict[str, Any]] = deque(maxlen=recent_slow)
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def _entry(self, shape: str) -> ShapeStats:
+        entry = self._shapes.get(shape)
+        if entry is None:
+            if len(self._shapes) >= self.max_shapes:
+                shape = OTHER_SHAPE
+                entry = self._shapes.get(shape)
+            if entry is None:
+                entry = self._shapes[shape] = ShapeStats(shape)
+        return entry
+
+    def record(self, conn: sqlite3.Connection, sql: str, parameters: Any, elapsed: float,
+               rows: int = 0, vm_steps: int = 0, error: bool = False) -> None:
+        """记录一条语句；超过阈值时写慢查询日志"""
+        shape = normalize_sql(sql)
+        with self._lock:
+            entry = self._entry(shape)
+            entry.latency.observe(elapsed)
+            entry.rows += rows
+            entry.vm_steps += vm_steps
+            if error:
+                entry.errors += 1
+            if elapsed < self.slow_threshold:
+                return
+            entry.slow += 1
+            need_plan = self.explain and entry.plan is None and entry.shape != OTHER_SHAPE
+        plan = self._explain(conn, sql, parameters) if need_plan else None
+        now = time.time()
+        with self._lock:
+            if plan is not None:
+                entry.plan = plan
+            plan = entry.plan
+            self._slow.append({
+                'shape': shape,
+                'sql': sql,
+                'elapsed': elapsed,
+                'rows': rows,
+                'vm_steps': vm_steps,
+                'plan': plan,
+                'at': now,
+            })
+            should_log = now - entry.last_logged >= self.log_interval
+            if should_log:
+                entry.last_logged = now
+        if should_log:
+            plan_text = '; '.join(plan) if plan else '（无）'
+            logger.warning(f"慢查询 {elapsed * 1000:.1f} ms，返回 {rows} 行，约 {vm_steps} 条虚拟机指令: "
+                           f"{shape} | 查询计划: {plan_text}")
+
+    @staticmethod
+    def _explain(conn: sqlite3.Connection, sql: str, parameters: Any) -> Optional[List[str]]:
+        if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return None
+        try:
+            # 使用基类的 execute，不计入统计
+            rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+        except sqlite3.Error as e:
+            logger.debug(f"EXPLAIN QUERY PLAN 失败: {e}")
+            return None
+        return [row[3] for row in rows]
+
+    def summary(self, top: int = 20, order_by: str = 'total') -> Dict[str, Any]:
+        """
+        汇总统计（可直接挂到状态接口）
+
+        Args:
+            top: 返回的形状数
+            order_by: 排序字段，'total'（累计耗时）/ 'p95' / 'count' / 'slow'
+
+        Returns:
+            {'statements', 'slow_statements', 'slow_threshold_ms', 'shapes', 'full_scans', 'recent_slow'}
+        """
+        with self._lock:
+            shapes = [entry.to_dict() for entry in self._shapes.values()]
+            recent = list(self._slow)
+        shapes.sort(key=lambda item: item[order_by] or 0, reverse=True)
+        return {
+            'since': self.started,
+            'slow_threshold_ms': self.slow_threshold * 1000,
+            'statements': sum(item['count'] for item in shapes),
+            'slow_statements': sum(item['slow'] for item in shapes),
+            'tracked_shapes': len(shapes),
+            'shapes': shapes[:top],
+            'full_scans': [item['shape'] for item in shapes if item['full_scan']],
+            'recent_slow': recent[-top:],
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._shapes.clear()
+            self._slow.clear()
+            self.started = time.time()
+
+
+_active: Optional[QueryStats] = None
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    逐条计时的游标
+
+    SELECT 的耗时包括取结果：语句在结果取完、游标关闭、再次 execute 或游标被回收时结束计时。
+    """
+
+    _pending: Optional[list] = None
+
+    def execute(self, sql: str, parameters: Any = ()) -> 'InstrumentedCursor':
+        self._finish()
+        if _active is None:
+            return super().execute(sql, parameters)
+        steps = getattr(self.connection, 'vm_steps', 0)
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except sqlite3.Error:
+            self._pending = [sql, parameters, time.perf_counter() - start, steps, 0]
+            self._finish(error=True)
+            raise
+        self._pending = [sql, parameters, time.perf_counter() - start, steps, 0]
+        if self.description is None:
+            # 非查询语句没有结果可取
+            self._pending[4] = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> 'InstrumentedCursor':
+        self._finish()
+        if _active is None:
+            return super().executemany(sql, seq_of_parameters)
+        steps = getattr(self.connection, 'vm_steps', 0)
+        start = time.perf_counter()
+        error = False
+        try:
+            super().executemany(sql, seq_of_parameters)
+        except sqlite3.Error:
+            error = True
+            raise
+        finally:
+            self._pending = [sql, (), time.perf_counter() - start, steps, max(self.rowcount, 0)]
+            self._finish(error=error)
+        return self
+
+    def _timed(self, fetch, *args):
+        pending = self._pending
+        if pending is None:
+            return fetch(*args)
+        start = time.perf_counter()
+        try:
+            return fetch(*args)
+        finally:
+            pending[2] += time.perf_counter() - start
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if self._pending is not None:
+            if row is None:
+                self._finish()
+            else:
+                self._pending[4] += 1
+        return row
+
+    def fetchmany(self, size: Optional[int] = None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        if self._pending is not None:
+            self._pending[4] += len(rows)
+            if len(rows) < size:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._pending is not None:
+            self._pending[4] += len(rows)
+            self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        if self._pending is not None:
+            self._pending[4] += 1
+        return row
+
+    def close(self) -> None:
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _finish(self, error: bool = False) -> None:
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        stats = _active
+        if stats is None:
+            return
+        sql, parameters, elapsed, steps, rows = pending
+        try:
+            conn = self.connection
+            vm_steps = (getattr(conn, 'vm_steps', 0) - steps) * stats.progress_steps
+            stats.record(conn, sql, parameters, elapsed, rows, vm_steps, error)
+        except Exception as e:
+            # 统计失败不影响业务语句
+            logger.debug(f"记录语句统计失败: {e}")
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """游标默认使用 InstrumentedCursor 的连接"""
+
+    vm_steps = 0
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _install_progress_handler(conn: sqlite3.Connection, role: str) -> None:
+    """连接钩子：为带计时的连接安装进度回调，累计虚拟机指令数"""
+    stats = _active
+    if stats is None or not stats.progress_steps or not isinstance(conn, InstrumentedConnection):
+        return
+
+    def count_steps() -> int:
+        conn.vm_steps += 1
+        return 0
+
+    conn.set_progress_handler(count_steps, stats.progress_steps)
+
+
+def enable_query_stats(slow_ms: float = 100.0, explain: bool = True, **kwargs) -> QueryStats:
+    """
+    启用语句统计（之后新建的连接生效）
+
+    Args:
+        slow_ms: 慢查询阈值（毫秒）
+        explain: 慢查询是否记录查询计划
+        **kwargs: 传给 QueryStats 的其他参数
+
+    Returns:
+        当前生效的 QueryStats
+    """
+    global _active
+    _active = QueryStats(slow_ms=slow_ms, explain=explain, **kwargs)
+    set_connection_factory(InstrumentedConnection)
+    register_connection_hook(_install_progress_handler)
+    logger.info(f"已启用 SQL 语句统计，慢查询阈值 {slow_ms} ms")
+    return _active
+
+
+def enable_from_config(config: Dict[str, Any]) -> Optional[QueryStats]:
+    """根据 config.json 的 database.query_stats 段启用；未启用时返回 None"""
+    section = config.get('database', {}).get('query_stats', {})
+    if not section.get('enabled', False):
+        return None
+    return enable_query_stats(slow_ms=section.get('slow_ms', 100), explain=section.get('explain', True))
+
+
+def disable_query_stats() -> None:
+    """停止统计；已创建的连接仍使用计时游标，但不再记录"""
+    global _active
+    _active = None
+    set_connection_factory(sqlite3.Connection)
+
+
+def get_query_stats() -> Optional[QueryStats]:
+    """当前生效的 QueryStats，未启用时返回 None"""
+    return _active
@@ -0,0 +1,363 @@
+"""
+LLM 请求限流模块
+
+按提供商与 API key 维护令牌桶，同时约束每分钟请求数（RPM）和每分钟 token 数（TPM）。
+额度不足时请求按到达顺序排队等待，而不是直接失败返回，
+从而可以在接近提供商上限的并发下运行而不丢失文本块。
+
+限流参数来自 llm_config.json 的 ``rate_limits`` 段：
+
+    "rate_limits": {
+        "default": {"requests_per_minute": 60, "tokens_per_minute": 60000},
+        "qwen": {"requests_per_minute": 300, "tokens_per_minute": 300000}
+    }
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitError(Exception):
+    """限流错误：排队等待超时"""
+    pass
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    预估文本的 token 数
+
+    中日韩字符按每字 1 个 token 计算（偏保守），其余字符约 4 个字符 1 个 token。
+
+    Args:
+        text: 待估算的文本
+
+    Returns:
+        预估 token 数（至少为 1）
+    """
+    if not text:
+        return 1
+    cjk = 0
+    for ch in text:
+        if '\u3000' <= ch <= '\u9fff' or '\uac00' <= ch <= '\ud7af' or '\uff00' <= ch <= '\uffef':
+            cjk += 1
+    other = len(text) - cjk
+    return max(1, cjk + (other + 3) // 4)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """判断异常是否为提供商返回的限流错误（HTTP 429）"""
+    status = getattr(error, 'status_code', None) or getattr(error, 'status', None)
+    if status == 429:
+        return True
+    message = str(error).lower()
+    return '429' in message or 'rate limit' in message or 'too many requests' in message
+
+
+class TokenBucket:
+    """令牌桶：容量为 capacity，每秒补充 refill_rate 个令牌"""
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self.updated_at = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        """返回凑够 amount 个令牌还需等待的秒数（0 表示可立即获取）"""
+        self._refill(now)
+        # 单次请求超过桶容量时按容量计，避免永远等不到
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_rate
+
+    def consume(self, amount: float) -> None:
+        """扣除令牌（允许为负，表示透支，后续请求会相应等待更久）"""
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        """归还令牌"""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ProviderLimiter:
+    """单个（提供商, API key）组合的限流器，内部按 FIFO 公平排队"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self._tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self._cond = threading.Condition()
+        self._queue: Deque[object] = deque()
+        self._blocked_until = 0.0
+        self.stats = {
+            'acquired': 0,
+            'queued': 0,
+            'total_wait': 0.0,
+            'timeouts': 0,
+            'throttled': 0,
+        }
+
+    def acquire(self, tokens: int, timeout: Optional[float] = None) -> float:
+        """
+        获取一次请求额度，额度不足时排队等待
+
+        Args:
+            tokens: 本次请求预估消耗的 token 数
+            timeout: 最长等待秒数，None 表示一直等待
+
+        Returns:
+            实际等待的秒数
+
+        Raises:
+            RateLimitError: 等待超时
+        """
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        ticket = object()
+        blocked = False
+
+        with self._cond:
+            self._queue.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait: Optional[float] = None
+                    if self._queue[0] is ticket:
+                        wait = max(
+                            self._blocked_until - now,
+                            self._requests.time_until(1, now),
+                            self._tokens.time_until(tokens, now),
+                        )
+                        if wait <= 0:
+                            self._requests.consume(1)
+                            self._tokens.consume(tokens)
+                            waited = now - start
+                            self.stats['acquired'] += 1
+                            self.stats['total_wait'] += waited
+                            if blocked:
+                                self.stats['queued'] += 1
+                            return waited
+
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self.stats['timeouts'] += 1
+                            raise RateLimitError(f"限流排队超时（{timeout} 秒）")
+                        wait = remaining if wait is None else min(wait, remaining)
+
+                    blocked = True
+                    self._cond.wait(timeout=wait)
+            finally:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                self._cond.notify_all()
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """按实际用量修正 TPM 令牌桶：多退少补"""
+        with self._cond:
+            diff = estimated - actual
+            if diff > 0:
+                self._tokens.refund(diff)
+            elif diff < 0:
+                self._tokens.consume(-diff)
+            self._cond.notify_all()
+
+    def throttle(self, seconds: float) -> None:
+        """收到 429 后暂停该限流器的全部放行"""
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self.stats['throttled'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self.stats)
+            stats['queue_length'] = len(self._queue)
+            stats['requests_per_minute'] = self.requests_per_minute
+            stats['tokens_per_minute'] = self.tokens_per_minute
+            return stats
+
+
+class RateLimiter:
+    """
+    多提供商请求调度器
+
+    每个（提供商, API key）组合拥有独立的 RPM / TPM 令牌桶，
+    同一个 key 被多个模型配置共用时共享额度。
+    """
+
+    DEFAULT_LIMITS = {'requests_per_minute': 60, 'tokens_per_minute': 60000}
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None):
+        """
+        初始化调度器
+
+        Args:
+            limits: 提供商到限流参数的映射，可包含 ``default`` 作为兜底
+        """
+        self.limits = dict(limits or {})
+        self._limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'RateLimiter':
+        """从 llm_config.json 的完整配置字典创建"""
+        return cls(config.get('rate_limits', {}))
+
+    def _limits_for(self, provider: str) -> Dict[str, float]:
+        limits = dict(self.DEFAULT_LIMITS)
+        limits.update(self.limits.get('default', {}))
+        limits.update(self.limits.get(provider, {}))
+        return limits
+
+    @staticmethod
+    def _key_fingerprint(api_key: Optional[str]) -> str:
+        # 不在内存中保留明文 key 作为字典键
+        if not api_key:
+            return ''
+        return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+
+    def get_limiter(self, provider: str, api_key: Optional[str] = None) -> Optional[ProviderLimiter]:
+        """
+        获取（必要时创建）对应的限流器
+
+        Returns:
+            限流器；mock 提供商或未设置上限时返回 None
+        """
+        if provider == 'mock' and provider not in self.limits:
+            return None
+        key = (provider, self._key_fingerprint(api_key))
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limits = self._limits_for(provider)
+                rpm = limits.get('requests_per_minute')
+                tpm = limits.get('tokens_per_minute')
+                if not rpm or not tpm:
+                    return None
+                limiter = ProviderLimiter(rpm, tpm)
+                self._limiters[key] = limiter
+            return limiter
+
+    def acquire(self, provider: str, prompt: str, api_key: Optional[str] = None,
+                max_tokens: int = 0, timeout: Optional[float] = None) -> int:
+        """
+        为一次调用申请额度
+
+        Args:
+            provider: 提供商名称
+            prompt: 提示词，用于预估输入 token
+            api_key: 调用使用的 API key
+            max_tokens: 预留的输出 token 数
+            timeout: 最长排队秒数
+
+        Returns:
+            本次预扣的 token 数，调用结束后可用于 settle
+        """
+        estimated = estimate_tokens(prompt) + max(0, int(max_tokens or 0))
+        limiter = self.get_limiter(provider, api_key)
+        if limiter is not None:
+            waited = limiter.acquire(estimated, timeout=timeout)
+            if waited > 1.0:
+                logger.debug(f"{provider} 请求排队 {waited:.2f} 秒")
+        return estimated
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """返回各限流器的统计信息，键为 ``provider`` 或 ``provider:key指纹``"""
+        with self._lock:
+            items = list(self._limiters.items())
+        result = {}
+        for (provider, fingerprint), limiter in items:
+            name = f"{provider}:{fingerprint}" if fingerprint else provider
+            result[name] = limiter.get_stats()
+        return result
+
+
+class RateLimitedLLM:
+    """
+    为 LLM 实例加上限流调度的包装器
+
+    对外保持与被包装模型相同的接口（generate_text / get_embedding / 其余属性透传），
+    遇到 429 时暂停对应限流器并重新排队，最多 max_requeue 次。
+    """
+
+    def __init__(self, llm: Any, limiter: RateLimiter, provider: str,
+                 api_key: Optional[str] = None, max_tokens: int = 0,
+                 max_requeue: int = 3, throttle_seconds: float = 5.0,
+                 timeout: Optional[float] = None):
+        self.llm = llm
+        self.limiter = limiter
+        self.provider = provider
+        self.api_key = api_key
+        self.max_tokens = max_tokens
+        self.max_requeue = max_requeue
+        self.throttle_seconds = throttle_seconds
+        self.timeout = timeout
+
+    def _actual_tokens(self, text: str, response: Any) -> int:
+        """本次调用的实际 token 数：优先取模型的 last_usage，否则按输入输出文本估算"""
+        if not isinstance(response, str):
+            # 嵌入接口只计输入；last_usage 可能是上一次文本生成留下的
+            return estimate_tokens(text)
+        usage = getattr(self.llm, 'last_usage', None)
+        if isinstance(usage, dict):
+            if 'total_tokens' in usage:
+                return int(usage['total_tokens'])
+            if 'prompt_tokens' in usage:
+                return int(usage['prompt_tokens']) + int(usage.get('completion_tokens', 0))
+        return estimate_tokens(text) + estimate_tokens(response)
+
+    def _call(self, func: Callable[..., Any], text: str, max_tokens: int, *args, **kwargs) -> Any:
+        attempt = 0
+        while True:
+            estimated = self.limiter.acquire(
+                self.provider, text, api_key=self.api_key,
+                max_tokens=max_tokens, timeout=self.timeout
+            )
+            try:
+                response = func(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt >= self.max_requeue:
+                    raise
+                attempt += 1
+                retry_after = getattr(e, 'retry_after', None) or self.throttle_seconds * attempt
+                limiter = self.limiter.get_limiter(self.provider, self.api_key)
+                if limiter is not None:
+                    limiter.settle(estimated, 0)
+                    limiter.throttle(float(retry_after))
+                logger.warning(f"{self.provider} 返回限流错误，{retry_after} 秒后重新排队（第 {attempt} 次）")
+                continue
+            limiter = self.limiter.get_limiter(self.provider, self.api_key)
+            if limiter is not None:
+                # 预扣按 max_tokens 上限计算，按实际用量退还多扣的部分
+                limiter.settle(estimated, self._actual_tokens(text, response))
+            return response
+
+    def generate_text(self, prompt: str, **kwargs) -> str:
+        max_tokens = kwargs.get('max_tokens', self.max_tokens)
+        return self._call(self.llm.generate_text, prompt, max_tokens, prompt, **kwargs)
+
+    def get_embedding(self, text: str, **kwargs):
+        return self._call(self.llm.get_embedding, text, 0, text, **kwargs)
+
+    def get_embeddings(self, texts: Sequence[str]) -> List[List[float]]:
+        # 整批一次请求，按全部文本的 token 数占用额度
+        if hasattr(self.llm, 'get_embeddings'):
+            return self._call(self.llm.get_embeddings, '\n'.join(texts), 0, texts)
+        return [self.get_embedding(text) for text in texts]
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
@@ -0,0 +1,319 @@
+"""
+LLM 调用容错模块
+
+为 LLM 调用提供三层保护：
+1. 重试：对瞬时错误（超时、连接失败、限流、5xx）做带抖动的指数退避重试
+2. 熔断：每个模型一个熔断器，连续瞬时错误后暂停调用，冷却后半开试探；
+   参数错误、鉴权失败等非瞬时错误说明的是请求本身的问题，不计入熔断
+3. 故障转移：按 llm_config.json 中 ``failover.order`` 的顺序切换到下一个模型
+
+配置示例：
+
+    "failover": {
+        "enabled": true,
+        "order": ["qwen", "deepseek", "openai", "claude", "mock"],
+        "max_retries": 2,
+        "base_delay": 0.5,
+        "max_delay": 8.0,
+        "failure_threshold": 5,
+        "recovery_timeout": 30
+    }
+"""
+
+import logging
+import random
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# 各 SDK / HTTP 库中表示瞬时错误的异常类名（openai、anthropic、httpx、requests），
+# 按类名匹配继承链，无需导入这些可选依赖
+TRANSIENT_ERROR_NAMES = {
+    'APITimeoutError', 'APIConnectionError', 'RateLimitError', 'InternalServerError',
+    'ServiceUnavailableError', 'OverloadedError',
+    'TimeoutException', 'NetworkError', 'RemoteProtocolError',
+    'Timeout', 'ConnectionError',
+}
+
+
+class FailoverError(Exception):
+    """所有候选模型均调用失败"""
+
+    def __init__(self, message: str, errors: Optional[Dict[str, Exception]] = None):
+        super().__init__(message)
+        self.errors = errors or {}
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    for source in (error, getattr(error, 'response', None)):
+        status = getattr(source, 'status_code', None) or getattr(source, 'status', None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    判断异常是否为值得重试的瞬时错误
+
+    按异常类型（含 SDK 异常的类名）与 HTTP 状态码判断，不解析错误信息文本：
+    信息中偶然出现的 "502"、"timeout" 等字样不会把参数错误误判为瞬时错误。
+    """
+    if isinstance(error, (TimeoutError, socket.timeout, ConnectionError)):
+        return True
+    if any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    return _status_code(error) in TRANSIENT_STATUS_CODES
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    closed: 正常放行；连续失败达到阈值后进入 open
+    open: 拒绝调用；经过 recovery_timeout 秒后进入 half_open
+    half_open: 仅放行少量试探请求，成功则恢复 closed，失败则重新 open
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+        self.stats = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def allow_request(self) -> bool:
+        """判断当前是否允许发起调用"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def release(self) -> None:
+        """放行后没有实际发起调用时归还半开试探名额"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.stats['successes'] += 1
+            self._failures = 0
+            self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.stats['failures'] += 1
+            self._failures += 1
+            state = self._current_state()
+            if state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if state != self.OPEN:
+                    self.stats['opened'] += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['state'] = self._current_state()
+            stats['consecutive_failures'] = self._failures
+            return stats
+
+
+class RetryPolicy:
+    """带完全抖动（full jitter）的指数退避重试策略"""
+
+    def __init__(self, max_retries: int = 2, base_delay: float = 0.5,
+                 max_delay: float = 8.0, multiplier: float = 2.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+
+    def compute_delay(self, attempt: int) -> float:
+        """计算第 attempt 次重试（从 0 开始）前的等待秒数"""
+        ceiling = min(self.max_delay, self.base_delay * (self.multiplier ** attempt))
+        return random.uniform(0, ceiling)
+
+
+class FailoverExecutor:
+    """
+    带重试、熔断与故障转移的调用执行器
+
+    执行器本身不持有模型，而是通过 get_model 回调按名称获取，
+    因此可以直接挂在 LLMManager 上：``FailoverExecutor(manager.get_model, order)``。
+    """
+
+    def __init__(self, get_model: Callable[[str], Any], order: Optional[List[str]] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        初始化执行器
+
+        Args:
+            get_model: 根据模型名称返回模型实例的函数
+            order: 故障转移顺序
+            retry_policy: 单个模型上的重试策略
+            failure_threshold: 熔断阈值（连续失败次数）
+            recovery_timeout: 熔断后进入半开状态前的冷却秒数
+            sleep: 等待函数，便于测试替换
+        """
+        self.get_model = get_model
+        self.order = list(order or [])
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.sleep = sleep
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, get_model: Callable[[str], Any], config: Dict[str, Any]) -> 'FailoverExecutor':
+        """从 llm_config.json 的完整配置字典创建"""
+        section = config.get('failover', {})
+        policy = RetryPolicy(
+            max_retries=section.get('max_retries', 2),
+            base_delay=section.get('base_delay', 0.5),
+            max_delay=section.get('max_delay', 8.0),
+        )
+        order = section.get('order') if section.get('enabled', True) else []
+        return cls(
+            get_model,
+            order=order,
+            retry_policy=policy,
+            failure_threshold=section.get('failure_threshold', 5),
+            recovery_timeout=section.get('recovery_timeout', 30.0),
+        )
+
+    def get_breaker(self, model_name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(model_name)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.recovery_timeout)
+                self._breakers[model_name] = breaker
+                self._counters[model_name] = {'retries': 0, 'failovers_from': 0, 'failovers_to': 0}
+            return breaker
+
+    def _count(self, model_name: str, key: str) -> None:
+        self.get_breaker(model_name)
+        with self._lock:
+            self._counters[model_name][key] += 1
+
+    def _candidates(self, model_name: Optional[str]) -> List[str]:
+        if not model_name:
+            return list(self.order)
+        return [model_name] + [name for name in self.order if name != model_name]
+
+    def call(self, method: str, *args, model_name: Optional[str] = None, **kwargs) -> Any:
+        """
+        以容错方式调用模型方法
+
+        Args:
+            method: 模型方法名，如 ``generate_text`` / ``get_embedding``
+            model_name: 首选模型，其后按 order 依次故障转移
+            *args, **kwargs: 透传给模型方法的参数
+
+        Returns:
+            第一个成功模型的返回值
+
+        Raises:
+            FailoverError: 所有候选模型都失败或被熔断
+        """
+        candidates = self._candidates(model_name)
+        errors: Dict[str, Exception] = {}
+        primary = candidates[0] if candidates else None
+
+        for name in candidates:
+            breaker = self.get_breaker(name)
+            if not breaker.allow_request():
+                logger.debug(f"模型 {name} 处于熔断状态，跳过")
+                continue
+            # 以下两种情况没有实际发起调用，需归还半开试探名额，否则熔断器会一直停在半开
+            try:
+                model = self.get_model(name)
+            except (KeyError, ValueError) as e:
+                breaker.release()
+                errors[name] = e
+                continue
+            if hasattr(model, 'is_available') and not model.is_available():
+                breaker.release()
+                continue
+
+            for attempt in range(self.retry_policy.max_retries + 1):
+                try:
+                    result = getattr(model, method)(*args, **kwargs)
+                    breaker.record_success()
+                    if name != primary:
+                        self._count(primary, 'failovers_from')
+                        self._count(name, 'failovers_to')
+                        logger.warning(f"故障转移: {primary} -> {name}")
+                    return result
+                except NotImplementedError:
+                    breaker.release()
+                    raise
+                except Exception as e:
+                    errors[name] = e
+                    if not is_transient_error(e):
+                        # 非瞬时错误不说明模型不健康：不计入熔断，归还半开试探名额
+                        breaker.release()
+                        break
+                    breaker.record_failure()
+                    if attempt >= self.retry_policy.max_retries:
+                        break
+                    # 重试同样需要熔断器放行；放行后紧接着就是下一次调用，名额由其结果结算
+                    if not breaker.allow_request():
+                        break
+                    self._count(name, 'retries')
+                    delay = self.retry_policy.compute_delay(attempt)
+                    logger.info(f"模型 {name} 调用失败（{e}），{delay:.2f} 秒后重试")
+                    self.sleep(delay)
+
+        detail = '; '.join(f"{name}: {error}" for name, error in errors.items())
+        raise FailoverError(f"所有候选模型均调用失败: {detail or '无可用模型'}", errors)
+
+    def get_model_status(self, model_name: str) -> Dict[str, Any]:
+        """返回单个模型的熔断状态与重试/故障转移计数，用于合并进 get_model_info()"""
+        breaker = self.get_breaker(model_name)
+        status = breaker.get_stats()
+        with self._lock:
+            status.update(self._counters[model_name])
+        return {
+            'circuit_state': status.pop('state'),
+            **status,
+        }
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            names = list(self._breakers)
+        return {name: self.get_model_status(name) for name in names}
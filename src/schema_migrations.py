@@ -0,0 +1,115 @@
+"""
+数据库结构迁移模块
+
+按 PRAGMA user_version 记录的版本号依次执行迁移，每个迁移在一个写事务内完成。
+db_pool 在创建连接池（即进程内首次打开数据库）时调用 migrate()，之后的读写不再检查。
+
+当前迁移：
+1. source_file / created_at 索引，供按源文件、按日期范围检索使用
+2. 规范化的 inspiration_tags 表（每个标签一行，标签列有索引），由触发器
+   与 inspirations.tags 保持同步，并回填已有数据
+3. compression_dicts 表，保存文本压缩使用的共享字典
+"""
+
+import logging
+import weakref
+from typing import Callable, List, Optional, Tuple
+
+from .db_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# tags 字符串 -> JSON 数组：统一中文逗号/顿号为半角逗号后按逗号切分，
+# 先 json_quote 再替换逗号，标签内的引号与反斜杠都能被正确转义
+_TAGS_JSON = (
+    "'[' || replace(json_quote(replace(replace({col}, '，', ','), '、', ',')), ',', '\",\"') || ']'"
+)
+
+
+def _tag_rows_sql(id_expr: str, tags_expr: str) -> str:
+    return (
+        f"SELECT DISTINCT {id_expr}, trim(value) FROM json_each({_TAGS_JSON.format(col=tags_expr)}) "
+        f"WHERE trim(value) != ''"
+    )
+
+
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, '为 source_file / created_at 建立索引', [
+        "CREATE INDEX IF NOT EXISTS idx_inspirations_source_created "
+        "ON inspirations(source_file, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_inspirations_created_at ON inspirations(created_at)",
+    ]),
+    (2, '建立规范化标签表 inspiration_tags', [
+        "CREATE TABLE IF NOT EXISTS inspiration_tags ("
+        "inspiration_id INTEGER NOT NULL, "
+        "tag TEXT NOT NULL, "
+        "PRIMARY KEY (tag, inspiration_id)"
+        ") WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS idx_inspiration_tags_inspiration ON inspiration_tags(inspiration_id)",
+        "CREATE TRIGGER IF NOT EXISTS inspiration_tags_ai AFTER INSERT ON inspirations "
+        "WHEN new.tags IS NOT NULL BEGIN "
+        f"INSERT OR IGNORE INTO inspiration_tags(inspiration_id, tag) {_tag_rows_sql('new.id', 'new.tags')}; "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS inspiration_tags_au AFTER UPDATE OF tags ON inspirations BEGIN "
+        "DELETE FROM inspiration_tags WHERE inspiration_id = old.id; "
+        f"INSERT OR IGNORE INTO inspiration_tags(inspiration_id, tag) {_tag_rows_sql('new.id', 'new.tags')} "
+        "AND new.tags IS NOT NULL; "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS inspiration_tags_ad AFTER DELETE ON inspirations BEGIN "
+        "DELETE FROM inspiration_tags WHERE inspiration_id = old.id; "
+        "END",
+        "INSERT OR IGNORE INTO inspiration_tags(inspiration_id, tag) "
+        f"SELECT i.id, trim(t.value) FROM inspirations i, json_each({_TAGS_JSON.format(col='i.tags')}) t "
+        "WHERE i.tags IS NOT NULL AND trim(t.value) != ''",
+    ]),
+    (3, '建立压缩字典表 compression_dicts', [
+        "CREATE TABLE IF NOT EXISTS compression_dicts ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "codec TEXT NOT NULL, "
+        "level INTEGER NOT NULL, "
+        "data BLOB NOT NULL, "
+        "active INTEGER NOT NULL DEFAULT 0, "
+        "created_at DATETIME DEFAULT CURRENT_TIMESTAMP"
+        ")",
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+_migrated: 'weakref.WeakSet[ConnectionPool]' = weakref.WeakSet()
+
+
+def get_schema_version(pool: ConnectionPool) -> int:
+    with pool.reader() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(pool: ConnectionPool, progress: Optional[Callable[[int, str], None]] = None) -> int:
+    """
+    把数据库升级到最新结构
+
+    Args:
+        pool: 数据库连接池
+        progress: 每执行一个迁移时回调 (版本号, 说明)
+
+    Returns:
+        执行的迁移个数
+    """
+    if pool in _migrated:
+        return 0
+    applied = 0
+    with pool.writer() as conn:
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            logger.info(f"执行数据库迁移 {version}: {description}")
+            if progress:
+                progress(version, description)
+            for statement in statements:
+                conn.execute(statement)
+            # PRAGMA 不支持参数绑定，version 为内部整数常量
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            applied += 1
+    _migrated.add(pool)
+    return applied
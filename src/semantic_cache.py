@@ -0,0 +1,274 @@
+"""
+语义提示词缓存模块
+
+为 generate_text 提供可选的近似重复缓存：提示词先做空白规范化并精确匹配，
+未命中时用本地哈希 n-gram 嵌入（见 local_embedding）在同一（模型, 模板）作用域内
+查找最相似的已缓存内容，相似度不低于阈值即直接返回缓存的回复。
+
+近似匹配只比较提示词中的可变部分（调用方通过 content 传入的文本块），不比较模板：
+同一模板包裹的两段无关文本，整条提示词的嵌入被模板主导，相似度可以高达 0.98。
+未传入 content 的调用只做精确匹配。近似命中还要求两段内容长度相差不超过 length_tolerance。
+
+缓存条目总数有上限，按 LRU 淘汰；每次近似命中都会记录相似度，便于评估命中质量。
+
+配置示例（llm_config.json）：
+
+    "semantic_cache": {"enabled": false, "threshold": 0.99, "max_entries": 10000, "dim": 1024}
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .local_embedding import LocalEmbeddingLLM, np
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_SIMILARITY_BUCKETS = (0.90, 0.95, 0.97, 0.98, 0.99, 1.0)
+
+Scope = Tuple[str, str]
+
+
+def normalize_prompt(prompt: str) -> str:
+    """规范化提示词：去除首尾空白并合并连续空白"""
+    return _WHITESPACE.sub(' ', prompt.strip())
+
+
+class _Entry:
+    __slots__ = ('scope', 'prompt', 'response', 'length')
+
+    def __init__(self, scope: Scope, prompt: str, response: str, length: int):
+        self.scope = scope
+        self.prompt = prompt
+        self.response = response
+        self.length = length
+
+
+class _ScopeIndex:
+    """单个作用域的嵌入矩阵：预分配行，写入与删除都是原地操作"""
+
+    def __init__(self, dim: int, capacity: int = 64):
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.lengths = np.zeros(capacity, dtype=np.int64)
+        self.keys: List[str] = []
+        self.rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: str, vector, length: int) -> None:
+        row = len(self.keys)
+        if row == self.matrix.shape[0]:
+            # 容量翻倍，均摊 O(1)
+            self.matrix = np.concatenate([self.matrix, np.zeros_like(self.matrix)])
+            self.lengths = np.concatenate([self.lengths, np.zeros_like(self.lengths)])
+        self.matrix[row] = vector
+        self.lengths[row] = length
+        self.keys.append(key)
+        self.rows[key] = row
+
+    def remove(self, key: str) -> None:
+        """把最后一行移到被删除的位置"""
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self.keys) - 1
+        if row != last:
+            last_key = self.keys[last]
+            self.matrix[row] = self.matrix[last]
+            self.lengths[row] = self.lengths[last]
+            self.keys[row] = last_key
+            self.rows[last_key] = row
+        self.keys.pop()
+
+
+class SemanticPromptCache:
+    """按（模型, 模板）作用域划分的近似重复提示词缓存"""
+
+    def __init__(self, threshold: float = 0.99, max_entries: int = 10000,
+                 embedder: Optional[LocalEmbeddingLLM] = None, dim: int = 1024,
+                 length_tolerance: float = 0.02):
+        """
+        初始化缓存
+
+        Args:
+            threshold: 近似命中所需的最低余弦相似度（只比较可变内容）
+            max_entries: 全局最大条目数，超出后按 LRU 淘汰
+            embedder: 内容嵌入模型，默认使用本地哈希 n-gram 嵌入
+            dim: 默认嵌入模型的维度
+            length_tolerance: 近似命中允许的内容长度相对差
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.length_tolerance = length_tolerance
+        self.embedder = embedder or LocalEmbeddingLLM(dim=dim)
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self._scopes: Dict[Scope, _ScopeIndex] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'lookups': 0,
+            'exact_hits': 0,
+            'semantic_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+        self.similarity_histogram = {bucket: 0 for bucket in _SIMILARITY_BUCKETS}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional['SemanticPromptCache']:
+        """从 llm_config.json 的完整配置字典创建；未启用时返回 None"""
+        section = config.get('semantic_cache', {})
+        if not section.get('enabled', False):
+            return None
+        return cls(
+            threshold=section.get('threshold', 0.99),
+            max_entries=section.get('max_entries', 10000),
+            dim=section.get('dim', 1024),
+        )
+
+    @staticmethod
+    def _entry_key(scope: Scope, normalized: str) -> str:
+        raw = '\x00'.join((scope[0], scope[1], normalized))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _record_similarity(self, similarity: float) -> None:
+        for bucket in _SIMILARITY_BUCKETS:
+            if similarity <= bucket:
+                self.similarity_histogram[bucket] += 1
+                return
+
+    def get(self, prompt: str, model: str, template: str = '', content: Optional[str] = None) -> Optional[str]:
+        """
+        查找缓存的回复
+
+        Args:
+            prompt: 提示词
+            model: 模型名称
+            template: 提示词模板标识，不同模板互不命中
+            content: 提示词中的可变部分（如待提取的文本块），None 时只做精确匹配
+
+        Returns:
+            命中时返回缓存的回复，否则返回 None
+        """
+        scope = (model, template)
+        normalized = normalize_prompt(prompt)
+        key = self._entry_key(scope, normalized)
+        with self._lock:
+            self.stats['lookups'] += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats['exact_hits'] += 1
+                return entry.response
+            if content is None or scope not in self._scopes:
+                self.stats['misses'] += 1
+                return None
+
+        content = normalize_prompt(content)
+        vector = self.embedder.embed([content])[0]
+        with self._lock:
+            index = self._scopes.get(scope)
+            if index is None or not len(index):
+                self.stats['misses'] += 1
+                return None
+            count = len(index)
+            similarities = index.matrix[:count] @ vector
+            # 长度相差过大的候选直接排除
+            lengths = index.lengths[:count]
+            allowed = np.abs(lengths - len(content)) <= self.length_tolerance * np.maximum(lengths, len(content))
+            similarities = np.where(allowed, similarities, -1.0)
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self.stats['misses'] += 1
+                return None
+            best_key = index.keys[best]
+            entry = self._entries[best_key]
+            self._entries.move_to_end(best_key)
+            self.stats['semantic_hits'] += 1
+            self._record_similarity(similarity)
+        logger.info(
+            f"语义缓存命中 model={model} template={template or '-'} similarity={similarity:.4f} "
+            f"query={normalized[:40]!r} cached={entry.prompt[:40]!r}"
+        )
+        return entry.response
+
+    def put(self, prompt: str, model: str, response: str, template: str = '',
+            content: Optional[str] = None) -> None:
+        """写入缓存；传入 content 时该条目才参与近似匹配"""
+        scope = (model, template)
+        normalized = normalize_prompt(prompt)
+        key = self._entry_key(scope, normalized)
+        if content is not None:
+            content = normalize_prompt(content)
+            vector = self.embedder.embed([content])[0]
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._entries[key].response = response
+                return
+            entry = _Entry(scope, normalized, response, len(content) if content is not None else -1)
+            self._entries[key] = entry
+            if content is not None:
+                index = self._scopes.get(scope)
+                if index is None:
+                    index = self._scopes[scope] = _ScopeIndex(len(vector))
+                index.add(key, vector, entry.length)
+            while len(self._entries) > self.max_entries:
+                old_key, old_entry = self._entries.popitem(last=False)
+                index = self._scopes.get(old_entry.scope)
+                if index is not None:
+                    index.remove(old_key)
+                    if not len(index):
+                        self._scopes.pop(old_entry.scope, None)
+                self.stats['evictions'] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """返回命中统计与近似命中的相似度分布"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['similarity_histogram'] = {
+                f"<={bucket}": count for bucket, count in self.similarity_histogram.items()
+            }
+        lookups = stats['lookups']
+        hits = stats['exact_hits'] + stats['semantic_hits']
+        stats['hit_rate'] = hits / lookups if lookups else 0.0
+        return stats
+
+
+class SemanticCacheLLM:
+    """
+    为 generate_text 加上语义缓存的模型包装器
+
+    影响输出的调用参数（如 temperature）会并入模板作用域，参数不同的请求互不命中。
+    调用方传入 content（提示词中的文本块）时才启用近似匹配。
+    """
+
+    def __init__(self, llm: Any, model_name: str, cache: SemanticPromptCache):
+        self.llm = llm
+        self.model_name = model_name
+        self.cache = cache
+
+    def generate_text(self, prompt: str, template: str = '', content: Optional[str] = None, **kwargs) -> str:
+        scope = template
+        if kwargs:
+            scope = f"{template}|{sorted(kwargs.items())!r}"
+        cached = self.cache.get(prompt, self.model_name, scope, content)
+        if cached is not None:
+            return cached
+        response = self.llm.generate_text(prompt, **kwargs)
+        self.cache.put(prompt, self.model_name, response, scope, content)
+        return response
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
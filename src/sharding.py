@@ -0,0 +1,257 @@
+"""
+分片存储模块
+
+把灵感记录分散到多个 SQLite 文件，突破单文件的写锁与体积上限：
+- hash：按 source_file 的稳定哈希分到固定数量的分片，同一本书的记录总在同一分片，
+  按源文件检索只需访问一个分片
+- time：按创建月份分片（shard-YYYY-MM.db），旧分片不再写入，便于归档、备份与 VACUUM；
+  按日期范围检索只访问重叠的月份
+
+写入按分片分组后并行执行（各分片有独立的写锁）。检索并行扇出到相关分片，
+各分片返回前 k 条后归并出全局前 k 条。记录 ID 只在分片内唯一，结果中的 'shard'
+字段与 'id' 一起构成全局标识。
+
+分片策略与分片数在首次打开时写入 shard_dir/sharding.json，之后以不同的参数打开
+同一目录会被拒绝（否则记录会被路由到错误的分片，按源文件检索会漏掉已有数据）。
+
+配置示例（config.json）：
+
+    "sharding": {
+        "enabled": false,
+        "strategy": "hash",
+        "num_shards": 4,
+        "dir": "shards"
+    }
+"""
+
+import heapq
+import json
+import logging
+import os
+import re
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .bulk_writer import DEFAULT_BATCH_SIZE, BulkWriteResult, bulk_save
+from .errors import DatabaseError, SearchError, ValidationError
+from .fts import NEWEST_FIRST, get_index, keyword_search
+from .indexed_search import date_range_bounds, search_by_date_range, search_by_source
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ('hash', 'time')
+META_FILE = 'sharding.json'
+
+_MONTH = re.compile(r'\d{4}-(0[1-9]|1[0-2])')
+
+
+def shard_key(source_file: str, num_shards: int) -> int:
+    """source_file 的稳定分片号（不使用受 PYTHONHASHSEED 影响的 hash()）"""
+    return zlib.crc32(source_file.encode('utf-8')) % num_shards
+
+
+class ShardedDatabase:
+    """分片存储"""
+
+    def __init__(self, shard_dir: str, strategy: str = 'hash', num_shards: int = 4,
+                 max_workers: Optional[int] = None, search_mode: str = 'like', tokenizer: str = 'bigram'):
+        """
+        初始化分片存储
+
+        Args:
+            shard_dir: 分片文件所在目录
+            strategy: 'hash'（按源文件哈希）或 'time'（按创建月份）
+            num_shards: hash 策略的分片数（建好后不能修改）
+            max_workers: 扇出查询的线程数，默认与分片数相同（最多 8）
+            search_mode: 关键词检索模式，'like' 或 'fts'
+            tokenizer: fts 模式的分词方式
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"不支持的分片策略: {strategy}")
+        if num_shards <= 0:
+            raise ValueError("num_shards 必须大于 0")
+        self.shard_dir = shard_dir
+        self.strategy = strategy
+        self.num_shards = num_shards
+        self.search_mode = search_mode
+        self.tokenizer = tokenizer
+        os.makedirs(shard_dir, exist_ok=True)
+        self._check_meta()
+        workers = max_workers or min(num_shards if strategy == 'hash' else 8, 8)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='shard')
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional['ShardedDatabase']:
+        """根据 config.json 创建；未启用分片时返回 None"""
+        section = config.get('sharding', {})
+        if not section.get('enabled', False):
+            return None
+        search = config.get('search', {})
+        return cls(
+            section.get('dir', 'shards'),
+            strategy=section.get('strategy', 'hash'),
+            num_shards=section.get('num_shards', 4),
+            search_mode=search.get('search_mode', 'like'),
+            tokenizer=search.get('fts_tokenizer', 'bigram'),
+        )
+
+    def _check_meta(self) -> None:
+        """
+        校验或写入分片元数据
+
+        Raises:
+            DatabaseError: 目录已按不同的策略或分片数建立
+        """
+        path = os.path.join(self.shard_dir, META_FILE)
+        meta = {'strategy': self.strategy, 'num_shards': self.num_shards if self.strategy == 'hash' else None}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    stored = json.load(f)
+            except (OSError, ValueError) as e:
+                raise DatabaseError(f"无法读取分片元数据 {path}: {e}")
+            if stored != meta:
+                raise DatabaseError(
+                    f"分片目录 {self.shard_dir} 的配置为 {stored}，与当前配置 {meta} 不一致；"
+                    "修改策略或分片数需要重新分片"
+                )
+            return
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    # ---- 路由 ----
+
+    def shard_path(self, name: str) -> str:
+        return os.path.join(self.shard_dir, f"shard-{name}.db")
+
+    def shard_for(self, record: Dict[str, Any]) -> str:
+        """
+        返回记录应写入的分片名
+
+        Raises:
+            ValidationError: time 策略下 created_at 不以 YYYY-MM 开头
+        """
+        if self.strategy == 'hash':
+            return f"{shard_key(record.get('source_file') or '', self.num_shards):02d}"
+        created_at = record.get('created_at')
+        if created_at:
+            month = str(created_at)[:7]
+            if not _MONTH.fullmatch(month) or str(created_at)[7:8] not in ('', '-'):
+                raise ValidationError(f"created_at 格式错误，应以 YYYY-MM 开头: {created_at!r}")
+            return month
+        # 与 CURRENT_TIMESTAMP 一致使用 UTC
+        return datetime.now(timezone.utc).strftime('%Y-%m')
+
+    def list_shards(self) -> List[str]:
+        """已存在的分片名（hash 策略返回全部固定分片）"""
+        if self.strategy == 'hash':
+            return [f"{index:02d}" for index in range(self.num_shards)]
+        names = []
+        for filename in os.listdir(self.shard_dir):
+            name = filename[len('shard-'):-len('.db')]
+            if filename.startswith('shard-') and filename.endswith('.db') and _MONTH.fullmatch(name):
+                names.append(name)
+        return sorted(names)
+
+    def _existing(self, names: Iterable[str]) -> List[str]:
+        return [name for name in names if os.path.exists(self.shard_path(name))]
+
+    # ---- 写入 ----
+
+    def save_batch(self, records: Iterable[Dict[str, Any]],
+                   batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, BulkWriteResult]:
+        """
+        按分片分组后并行写入
+
+        Args:
+            records: 记录字典
+            batch_size: 每个写事务的行数
+
+        Returns:
+            分片名 -> 该分片的写入结果（ID 区间为分片内 ID）
+        """
+        groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for record in records:
+            groups[self.shard_for(record)].append(record)
+        futures = {
+            name: self._executor.submit(bulk_save, group, self.shard_path(name), batch_size)
+            for name, group in groups.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+    # ---- 检索 ----
+
+    def _fan_out(self, names: List[str], fn: Callable[[str], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        futures = [(name, self._executor.submit(fn, self.shard_path(name))) for name in names]
+        results: List[Dict[str, Any]] = []
+        for name, future in futures:
+            for item in future.result():
+                item['shard'] = name
+                results.append(item)
+        return results
+
+    @staticmethod
+    def _newest(item: Dict[str, Any]) -> Tuple[str, int]:
+        # created_at 为 'YYYY-MM-DD HH:MM:SS' 文本，可直接比较
+        return item.get('created_at') or '', item['id']
+
+    def search_inspirations(self, keyword: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        关键词检索：并行扇出到全部分片，归并前 limit 条
+
+        fts 模式按 bm25 相关度归并（各分片独立统计词频，跨分片分数为近似可比）；
+        like 模式各分片按创建时间取最新的 limit 条，再按同一键归并。
+        """
+        names = self._existing(self.list_shards())
+        if not names:
+            if not keyword or not keyword.strip():
+                raise SearchError("搜索关键词不能为空")
+            return []
+        if self.search_mode == 'fts':
+            items = self._fan_out(names, lambda path: get_index(path, self.tokenizer).search(
+                keyword, limit, with_score=True))
+            if all(item['score'] is not None for item in items):
+                return heapq.nsmallest(limit, items, key=lambda item: item['score'])
+            # 有分片回退到了 LIKE，没有可比的相关度；各分片的前 limit 条是按 id 取的，
+            # 与 created_at 归并键不一致，按 like 模式重新扇出
+        items = self._fan_out(names, lambda path: keyword_search(path, keyword, limit, 'like',
+                                                                 order_by=NEWEST_FIRST))
+        return heapq.nlargest(limit, items, key=self._newest)
+
+    def search_by_source(self, source_file: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按源文件检索；hash 策略下只访问该源文件所在的分片"""
+        if not source_file or not source_file.strip():
+            raise SearchError("源文件名不能为空")
+        if self.strategy == 'hash':
+            names = self._existing([self.shard_for({'source_file': source_file.strip()})])
+        else:
+            names = self._existing(self.list_shards())
+        items = self._fan_out(names, lambda path: search_by_source(path, source_file, limit))
+        items.sort(key=self._newest, reverse=True)
+        return items if limit is None else items[:limit]
+
+    def search_by_date_range(self, start_date: str, end_date: str,
+                             limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按日期范围检索；time 策略下只访问与范围重叠的月份分片"""
+        lower, upper = date_range_bounds(start_date, end_date)
+        names = self._existing(self.list_shards())
+        if self.strategy == 'time':
+            names = [name for name in names if lower[:7] <= name <= upper[:7]]
+        items = self._fan_out(names, lambda path: search_by_date_range(path, start_date, end_date, limit))
+        items.sort(key=self._newest, reverse=True)
+        return items if limit is None else items[:limit]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """各分片的文件大小"""
+        shards = {}
+        for name in self._existing(self.list_shards()):
+            shards[name] = os.path.getsize(self.shard_path(name))
+        return {'strategy': self.strategy, 'shards': shards, 'total_bytes': sum(shards.values())}
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
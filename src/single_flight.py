@@ -0,0 +1,133 @@
+"""
+相同请求合并（single-flight）模块
+
+多个线程同时发起完全相同的（模型, 提示词, 参数）请求时，只有第一个真正调用提供商，
+其余请求等待并共享同一个结果（或同一个异常）。请求完成后立即从在途表中移除，
+因此它不是缓存：之后的相同请求会重新发起调用。
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def make_request_key(kind: str, model: str, payload: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    计算请求合并键
+
+    Args:
+        kind: 请求类型，如 ``generate`` / ``embedding``
+        model: 模型名称
+        payload: 提示词或待嵌入文本
+        params: 影响结果的其他参数
+
+    Returns:
+        十六进制摘要字符串
+    """
+    raw = json.dumps([kind, model, payload, params or {}], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class _InFlightCall:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """在途请求合并器"""
+
+    def __init__(self):
+        self._calls: Dict[str, _InFlightCall] = {}
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'executed': 0, 'coalesced': 0}
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        执行 func，若同键请求正在进行则等待其结果
+
+        Args:
+            key: 请求合并键
+            func: 实际执行的无参函数
+
+        Returns:
+            func 的返回值（与同批请求共享）
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.stats['coalesced'] += 1
+                leader = False
+            else:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self.stats['executed'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            if call.waiters:
+                logger.debug(f"合并了 {call.waiters} 个相同的在途请求")
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['in_flight'] = len(self._calls)
+        requests = stats['requests']
+        stats['coalesced_ratio'] = stats['coalesced'] / requests if requests else 0.0
+        return stats
+
+
+class CoalescingLLM:
+    """
+    合并相同在途请求的模型包装器
+
+    generate_text / get_embedding 按（模型, 输入, 参数）合并，其余属性透传。
+    """
+
+    def __init__(self, llm: Any, model_name: str, flight: Optional[SingleFlight] = None):
+        self.llm = llm
+        self.model_name = model_name
+        self.flight = flight or SingleFlight()
+
+    def generate_text(self, prompt: str, **kwargs) -> str:
+        key = make_request_key('generate', self.model_name, prompt, kwargs)
+        return self.flight.do(key, lambda: self.llm.generate_text(prompt, **kwargs))
+
+    def get_embedding(self, text: str, **kwargs):
+        key = make_request_key('embedding', self.model_name, text, kwargs)
+        return self.flight.do(key, lambda: self.llm.get_embedding(text, **kwargs))
+
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        return self.flight.get_stats()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
@@ -0,0 +1,265 @@
+"""
+LLM 调用遥测模块
+
+按模型记录每次调用的延迟分布（p50/p95/p99）、首 token 时间、输入/输出 token 数、
+重试次数与按价格表估算的费用，可在进程内查询，也可导出为 JSON，
+用于基于实测吞吐量选择模型。
+
+价格表来自 llm_config.json 的 ``pricing`` 段（每千 token 价格，键与 ``llm`` 段一致）：
+
+    "pricing": {
+        "qwen": {"prompt_per_1k": 0.002, "completion_per_1k": 0.006, "currency": "CNY"}
+    }
+"""
+
+import bisect
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .rate_limiter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# 延迟直方图桶上界（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class LatencyHistogram:
+    """
+    延迟直方图
+
+    固定桶计数用于长期分布，最近 sample_size 个样本用于计算百分位。
+    """
+
+    def __init__(self, sample_size: int = 2048, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.samples: Deque[float] = deque(maxlen=sample_size)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """返回最近样本的第 q 百分位（q 取 0~100），无样本时返回 None"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, int(round(q / 100.0 * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def to_dict(self) -> Dict[str, Any]:
+        bucket_labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'max': self.max if self.count else None,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': dict(zip(bucket_labels, self.buckets)),
+        }
+
+
+class ModelMetrics:
+    """单个模型的累计指标"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.latency = LatencyHistogram()
+        self.ttft = LatencyHistogram()
+        self.first_seen = time.time()
+        self.error_types: Dict[str, int] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = max(time.time() - self.first_seen, 1e-9)
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': self.errors / self.requests if self.requests else 0.0,
+            'error_types': dict(self.error_types),
+            'retries': self.retries,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'estimated_cost': round(self.cost, 6),
+            'requests_per_second': self.requests / elapsed,
+            'completion_tokens_per_second': self.completion_tokens / elapsed,
+            'latency': self.latency.to_dict(),
+            'time_to_first_token': self.ttft.to_dict(),
+        }
+
+
+class LLMTelemetry:
+    """按模型汇总的 LLM 调用遥测"""
+
+    def __init__(self, pricing: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.pricing = dict(pricing or {})
+        self._metrics: Dict[str, ModelMetrics] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'LLMTelemetry':
+        """从 llm_config.json 的完整配置字典创建"""
+        return cls(config.get('pricing', {}))
+
+    def _get(self, model: str) -> ModelMetrics:
+        metrics = self._metrics.get(model)
+        if metrics is None:
+            metrics = ModelMetrics()
+            self._metrics[model] = metrics
+        return metrics
+
+    def estimate_cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """按价格表估算一次调用的费用，未配置价格时为 0"""
+        price = self.pricing.get(model)
+        if not price:
+            return 0.0
+        return (prompt_tokens * price.get('prompt_per_1k', 0.0)
+                + completion_tokens * price.get('completion_per_1k', 0.0)) / 1000.0
+
+    def record(self, model: str, latency: float, prompt_tokens: int = 0,
+               completion_tokens: int = 0, ttft: Optional[float] = None,
+               retries: int = 0, error: Optional[BaseException] = None) -> None:
+        """
+        记录一次调用
+
+        Args:
+            model: 模型名称（与 llm_config.json 中的键一致）
+            latency: 总耗时（秒）
+            prompt_tokens: 输入 token 数
+            completion_tokens: 输出 token 数
+            ttft: 首 token 时间（秒），非流式调用可不填
+            retries: 本次调用内部的重试次数
+            error: 调用失败时的异常
+        """
+        with self._lock:
+            metrics = self._get(model)
+            metrics.requests += 1
+            metrics.retries += retries
+            metrics.latency.observe(latency)
+            if ttft is not None:
+                metrics.ttft.observe(ttft)
+            if error is not None:
+                metrics.errors += 1
+                name = type(error).__name__
+                metrics.error_types[name] = metrics.error_types.get(name, 0) + 1
+                return
+            metrics.prompt_tokens += prompt_tokens
+            metrics.completion_tokens += completion_tokens
+            metrics.cost += self.estimate_cost(model, prompt_tokens, completion_tokens)
+
+    def record_retry(self, model: str, count: int = 1) -> None:
+        """单独记录重试（供重试/故障转移逻辑调用）"""
+        with self._lock:
+            self._get(model).retries += count
+
+    def get_latency_percentile(self, model: str, q: float) -> Optional[float]:
+        with self._lock:
+            metrics = self._metrics.get(model)
+            return metrics.latency.percentile(q) if metrics else None
+
+    def get_metrics(self, model: Optional[str] = None) -> Dict[str, Any]:
+        """
+        返回指标快照
+
+        Args:
+            model: 指定模型；为 None 时返回全部模型
+
+        Returns:
+            指标字典
+        """
+        with self._lock:
+            if model is not None:
+                metrics = self._metrics.get(model)
+                return metrics.to_dict() if metrics else {}
+            result = {name: metrics.to_dict() for name, metrics in self._metrics.items()}
+        for name, entry in result.items():
+            currency = self.pricing.get(name, {}).get('currency')
+            if currency:
+                entry['currency'] = currency
+        return result
+
+    def export_json(self, path: Optional[str] = None) -> str:
+        """导出全部指标为 JSON 字符串，指定 path 时同时写入文件"""
+        payload = json.dumps(
+            {'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'models': self.get_metrics()},
+            ensure_ascii=False, indent=2
+        )
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+        return payload
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+
+class InstrumentedLLM:
+    """
+    记录遥测的模型包装器
+
+    token 数优先取底层模型 ``last_usage``（``prompt_tokens`` / ``completion_tokens``），
+    否则按文本长度估算。若底层模型提供 ``stream_text`` 生成器，则额外记录首 token 时间。
+    """
+
+    def __init__(self, llm: Any, model_name: str, telemetry: LLMTelemetry):
+        self.llm = llm
+        self.model_name = model_name
+        self.telemetry = telemetry
+
+    def _usage(self, prompt: str, completion: str) -> Dict[str, int]:
+        usage = getattr(self.llm, 'last_usage', None)
+        if isinstance(usage, dict) and 'prompt_tokens' in usage:
+            return {
+                'prompt_tokens': int(usage.get('prompt_tokens', 0)),
+                'completion_tokens': int(usage.get('completion_tokens', 0)),
+            }
+        return {
+            'prompt_tokens': estimate_tokens(prompt),
+            'completion_tokens': estimate_tokens(completion) if completion else 0,
+        }
+
+    def generate_text(self, prompt: str, **kwargs) -> str:
+        start = time.perf_counter()
+        try:
+            response = self.llm.generate_text(prompt, **kwargs)
+        except Exception as e:
+            self.telemetry.record(self.model_name, time.perf_counter() - start, error=e)
+            raise
+        self.telemetry.record(self.model_name, time.perf_counter() - start, **self._usage(prompt, response))
+        return response
+
+    def stream_text(self, prompt: str, **kwargs) -> Iterator[str]:
+        start = time.perf_counter()
+        ttft = None
+        parts: List[str] = []
+        try:
+            for chunk in self.llm.stream_text(prompt, **kwargs):
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                parts.append(chunk)
+                yield chunk
+        except Exception as e:
+            self.telemetry.record(self.model_name, time.perf_counter() - start, ttft=ttft, error=e)
+            raise
+        self.telemetry.record(self.model_name, time.perf_counter() - start, ttft=ttft,
+                              **self._usage(prompt, ''.join(parts)))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
@@ -0,0 +1,39 @@
+"""
+测试公共配置：把项目根目录加入 sys.path，以 src.xxx 的方式导入被测模块
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """临时数据库文件路径；用例结束后关闭本进程内的全部连接池"""
+    from src.db_pool import close_all_pools
+
+    yield str(tmp_path / 'inspirations.db')
+    close_all_pools()
+
+
+@pytest.fixture
+def make_records():
+    """生成测试记录的工厂：make_records(count, source_file, keyword)，created_at 按秒递增"""
+    def factory(count, source_file='novel.txt', keyword='灵感'):
+        return [
+            {
+                'source_file': source_file,
+                'chapter': f'第{index + 1}章',
+                'raw_text': f'{keyword}原文片段 {index}',
+                'idea': f'想法 {index}',
+                'tags': '测试',
+                'created_at': f'2026-01-01 {index // 3600:02d}:{index // 60 % 60:02d}:{index % 60:02d}',
+            }
+            for index in range(count)
+        ]
+    return factory
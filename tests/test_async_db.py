@@ -0,0 +1,81 @@
+"""
+异步数据库门面测试
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from src.async_db import AsyncDatabase, DatabaseBusyError
+
+
+def test_search_and_save_batch_run_in_worker_threads(db_path, make_records):
+    async def scenario():
+        adb = AsyncDatabase(db_path, max_workers=2)
+        try:
+            result = await adb.save_batch(make_records(12, keyword='青云峰'))
+            page = await adb.search_page('青云峰', limit=5)
+            found = await adb.search('青云峰', limit=3)
+            return result, page, found, adb.get_metrics()
+        finally:
+            adb.close()
+
+    result, page, found, metrics = asyncio.run(scenario())
+    assert result.inserted == 12
+    assert len(page.items) == 5 and page.has_more
+    assert [item['id'] for item in found] == [12, 11, 10]
+    assert metrics['completed'] == 3 and metrics['queue_depth'] == 0
+
+
+def test_full_queue_rejects_immediately(db_path):
+    release = threading.Event()
+
+    async def scenario():
+        adb = AsyncDatabase(db_path, max_workers=1, max_queue=1)
+        try:
+            blocked = [asyncio.ensure_future(adb.run(release.wait, 5)) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            # 一个在执行、一个在排队，队列已满
+            with pytest.raises(DatabaseBusyError):
+                await adb.run(lambda: None)
+            release.set()
+            await asyncio.gather(*blocked)
+            return adb.get_metrics()
+        finally:
+            release.set()
+            adb.close()
+
+    metrics = asyncio.run(scenario())
+    assert metrics['rejected'] == 1 and metrics['queue_depth'] == 0
+
+
+def test_cancelled_waiters_release_their_queue_slot(db_path):
+    release = threading.Event()
+
+    async def scenario():
+        adb = AsyncDatabase(db_path, max_workers=1, max_queue=2)
+        try:
+            # 占住唯一的工作线程，后续任务只能排队
+            running = asyncio.ensure_future(adb.run(release.wait, 5))
+            await asyncio.sleep(0.05)
+            waiters = [asyncio.ensure_future(adb.run(lambda: 'late')) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            for waiter in waiters:
+                waiter.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+            depth = adb.get_metrics()['queue_depth']
+            release.set()
+            await running
+            # 名额已归还：队列上限内的新任务照常执行
+            results = await asyncio.gather(adb.run(lambda: 1), adb.run(lambda: 2))
+            return depth, results, adb.get_metrics()
+        finally:
+            release.set()
+            adb.close()
+
+    depth, results, metrics = asyncio.run(scenario())
+    assert depth == 0
+    assert results == [1, 2]
+    assert metrics['cancelled'] == 2
+    assert metrics['rejected'] == 0 and metrics['queue_depth'] == 0
@@ -0,0 +1,104 @@
+"""
+在线备份与恢复测试
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.backup import BackupError, list_backups, online_backup, prune_backups, restore_backup
+from src.bulk_writer import bulk_save
+from src.db_pool import get_pool
+
+
+def _count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM inspirations").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_backup_is_a_consistent_standalone_copy(db_path, make_records, tmp_path):
+    bulk_save(make_records(200), db_path)
+    dest = str(tmp_path / 'backups' / 'inspirations-20260101-000000.db')
+
+    info = online_backup(db_path, dest, pages=4)
+
+    assert info['path'] == dest and info['bytes'] > 0
+    assert not os.path.exists(dest + '.tmp')
+    assert _count(dest) == 200
+    conn = sqlite3.connect(dest)
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'delete'
+    finally:
+        conn.close()
+
+
+def test_backup_completes_under_concurrent_writes(db_path, make_records, tmp_path):
+    bulk_save(make_records(2000), db_path)
+    pool = get_pool(db_path)
+    stop = threading.Event()
+
+    def keep_writing():
+        while not stop.is_set():
+            with pool.writer() as conn:
+                conn.execute("INSERT INTO inspirations (source_file, raw_text, idea) VALUES ('w', 'x', 'y')")
+
+    writer = threading.Thread(target=keep_writing, daemon=True)
+    writer.start()
+    try:
+        info = online_backup(db_path, str(tmp_path / 'copy.db'), pages=1, step_sleep=0.001, max_restarts=2)
+    finally:
+        stop.set()
+        writer.join(5)
+    assert info['restarts'] <= 2
+    assert _count(str(tmp_path / 'copy.db')) >= 2000
+
+
+def test_missing_source_raises(tmp_path):
+    with pytest.raises(BackupError):
+        online_backup(str(tmp_path / 'missing.db'), str(tmp_path / 'copy.db'))
+
+
+def test_restore_replaces_content_and_keeps_safety_copy(db_path, make_records, tmp_path):
+    bulk_save(make_records(10), db_path)
+    backup = str(tmp_path / 'snapshot.db')
+    online_backup(db_path, backup)
+    bulk_save(make_records(5), db_path)
+    assert _count(db_path) == 15
+
+    result = restore_backup(backup, db_path, safety_dir=str(tmp_path / 'safety'))
+
+    assert _count(db_path) == 10
+    assert _count(result['safety_backup']) == 15
+    # 恢复后重新获取的连接池读到恢复后的内容
+    with get_pool(db_path).reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM inspirations").fetchone()[0] == 10
+
+
+def test_restore_rejects_corrupt_backup(db_path, make_records, tmp_path):
+    bulk_save(make_records(3), db_path)
+    corrupt = tmp_path / 'corrupt.db'
+    corrupt.write_bytes(b'SQLite format 3\x00' + b'\xff' * 4096)
+
+    with pytest.raises(BackupError):
+        restore_backup(str(corrupt), db_path)
+    assert _count(db_path) == 3
+
+
+def test_prune_keeps_recent_and_removes_old(tmp_path):
+    now = datetime(2026, 6, 1)
+    for days in range(10):
+        stamp = (now - timedelta(days=days * 10)).strftime('%Y%m%d-%H%M%S')
+        (tmp_path / f'inspirations-{stamp}.db').write_bytes(b'')
+
+    removed = prune_backups(str(tmp_path), 'inspirations', keep_last=3, max_age_days=30, now=now)
+
+    remaining = list_backups(str(tmp_path), 'inspirations')
+    assert len(remaining) == 4
+    assert len(removed) == 6
+    assert remaining[0][1] == now
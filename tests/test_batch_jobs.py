@@ -0,0 +1,79 @@
+"""
+离线批处理提取测试（对接本地 BatchJobEmulator）
+"""
+
+import json
+
+import pytest
+
+from src.batch_jobs import BatchClient, BatchExtractionJob, BatchJobError
+from src.mock_server import BatchJobEmulator, MockOpenAIServer
+
+
+@pytest.fixture
+def emulator():
+    server = MockOpenAIServer(responder=lambda prompt: f'灵感:{prompt}')
+    emulator = BatchJobEmulator(processing_time=0.05, failure_rate=0.0, seed=1)
+    emulator.install(server)
+    server.start()
+    yield server, emulator
+    server.stop()
+
+
+def _job(work_dir, server):
+    return BatchExtractionJob(str(work_dir), BatchClient(server.url, api_key='test'), 'mock-llm',
+                              prompt_builder=lambda text: f'提取:{text}')
+
+
+def test_run_maps_results_back_to_chunk_ids(tmp_path, emulator):
+    server, _ = emulator
+    job = _job(tmp_path / 'job', server)
+    results = job.run([('c1', '第一段'), ('c2', '第二段')], poll_interval=0.02, timeout=5)
+    assert results['c1']['content'] == '灵感:提取:第一段'
+    assert results['c2']['content'] == '灵感:提取:第二段'
+    assert results['c1']['usage']['total_tokens'] > 0
+    assert job.missing_ids() == []
+
+    requests = [json.loads(line) for line in (tmp_path / 'job' / 'requests.jsonl').read_text('utf-8').splitlines()]
+    assert [request['custom_id'] for request in requests] == ['c1', 'c2']
+    assert requests[0]['body']['max_tokens'] == 1000
+
+
+def test_resume_does_not_resubmit(tmp_path, emulator):
+    server, emulator_state = emulator
+    job = _job(tmp_path / 'job', server)
+    job.prepare([('c1', '文本')])
+    batch_id = job.submit()
+
+    resumed = _job(tmp_path / 'job', server)
+    assert resumed.state['batch_id'] == batch_id
+    assert resumed.submit() == batch_id
+    results = resumed.run(poll_interval=0.02, timeout=5)
+    assert list(results) == ['c1']
+    assert len(emulator_state.batches) == 1
+    # 已下载的任务再次运行直接读取本地结果
+    assert _job(tmp_path / 'job', server).run() == results
+
+
+def test_failed_requests_are_reported_as_missing(tmp_path):
+    server = MockOpenAIServer()
+    BatchJobEmulator(processing_time=0.05, failure_rate=1.0, seed=1).install(server)
+    server.start()
+    try:
+        job = _job(tmp_path / 'job', server)
+        results = job.run([('c1', '文本'), ('c2', '文本')], poll_interval=0.02, timeout=5)
+    finally:
+        server.stop()
+    assert all(item['content'] is None and item['error'] for item in results.values())
+    assert job.missing_ids() == ['c1', 'c2']
+
+
+def test_invalid_usage_is_rejected(tmp_path, emulator):
+    server, _ = emulator
+    job = _job(tmp_path / 'job', server)
+    with pytest.raises(BatchJobError):
+        job.submit()
+    with pytest.raises(BatchJobError):
+        job.run()
+    with pytest.raises(BatchJobError):
+        job.prepare([('c1', 'a'), ('c1', 'b')])
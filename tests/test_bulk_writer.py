@@ -0,0 +1,69 @@
+"""
+流式批量写入测试
+"""
+
+import pytest
+
+from src.bulk_writer import BulkWriter, bulk_save, validate_chunk
+from src.db_pool import get_pool
+from src.errors import ValidationError
+
+
+def test_bulk_save_streams_chunks_and_returns_id_ranges(db_path, make_records):
+    result = bulk_save(iter(make_records(25)), db_path, batch_size=10)
+    assert result.inserted == 25
+    assert result.id_ranges == [(1, 25)]
+    assert list(result.ids()) == list(range(1, 26))
+    with get_pool(db_path).reader() as conn:
+        assert conn.execute("SELECT created_at FROM inspirations WHERE id = 3").fetchone()[0] == '2026-01-01 00:00:02'
+
+
+def test_validate_chunk_fast_path_normalizes_columns():
+    records = [
+        {'source_file': 'a.txt', 'raw_text': '原文', 'idea': '想法', 'chapter': 3, 'tags': ['甲', ' 乙 ', '']},
+        {'source_file': 'a.txt', 'raw_text': '原文', 'idea': '想法', 'created_at': '2026-02-28 23:59:59'},
+    ]
+    params, errors = validate_chunk(records)
+    assert errors == []
+    assert params == [
+        ('a.txt', '3', '原文', '想法', '甲,乙', None),
+        ('a.txt', None, '原文', '想法', None, '2026-02-28 23:59:59'),
+    ]
+
+
+@pytest.mark.parametrize('created_at', [
+    '2026-01-01', '2026-01-01T08:00:00', '2026-13-01 00:00:00', '2026-01-01 24:00:00',
+    '2026-01-01 08:00:00\n2026-01-01 08:00:00', '', 20260101,
+])
+def test_validate_chunk_rejects_malformed_created_at(created_at):
+    records = [
+        {'source_file': 'a.txt', 'raw_text': '原文', 'idea': '想法', 'created_at': '2026-01-01 08:00:00'},
+        {'source_file': 'a.txt', 'raw_text': '原文', 'idea': '想法', 'created_at': created_at},
+    ]
+    params, errors = validate_chunk(records, offset=100)
+    assert len(params) == 1
+    assert [index for index, _ in errors] == [101]
+    assert 'created_at' in errors[0][1]
+
+
+def test_validate_chunk_reports_each_bad_record_once():
+    records = [
+        'not a dict',
+        {'source_file': 'a.txt', 'raw_text': '   ', 'idea': None},
+        {'source_file': 'a.txt', 'raw_text': '原文', 'idea': '想法'},
+    ]
+    params, errors = validate_chunk(records)
+    assert len(params) == 1
+    assert errors == [(0, "记录必须是字典"), (1, "字段 raw_text 不能为空")]
+
+
+def test_on_error_modes(db_path, make_records):
+    records = make_records(5)
+    records[2]['created_at'] = '2026/01/01'
+    with pytest.raises(ValidationError):
+        bulk_save(records, db_path)
+
+    result = BulkWriter(get_pool(db_path), on_error='skip').write(records)
+    assert result.inserted == 4
+    assert result.skipped == 1
+    assert result.errors[0][0] == 2
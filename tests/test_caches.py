@@ -0,0 +1,177 @@
+"""
+嵌入向量缓存与在途请求合并测试
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.embedding_cache import CachedEmbeddingLLM, EmbeddingCache
+from src.single_flight import CoalescingLLM, SingleFlight, make_request_key
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = 0
+        self.batch_calls = 0
+
+    def get_embedding(self, text, **kwargs):
+        self.calls += 1
+        return [float(len(text)), 0.5, -1.0]
+
+    def get_embeddings(self, texts):
+        self.batch_calls += 1
+        return [[float(len(text)), 0.5, -1.0] for text in texts]
+
+
+def test_embedding_cache_roundtrip_and_persistence(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    assert cache.get('m', '文本') is None
+    cache.put('m', '文本', [0.25, -0.5, 1.0])
+    assert cache.get('m', '文本') == [0.25, -0.5, 1.0]
+    # 不同模型的同一文本互不干扰
+    assert cache.get('other', '文本') is None
+    cache.close()
+
+    reopened = EmbeddingCache(str(tmp_path))
+    assert reopened.get('m', '文本') == [0.25, -0.5, 1.0]
+    reopened.close()
+
+
+def test_embedding_cache_ignores_truncated_index_tail(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put('m', 'a', [1.0, 2.0])
+    cache.close()
+    with open(tmp_path / 'index-0.bin', 'ab') as f:
+        f.write(b'\x00' * 7)
+
+    reopened = EmbeddingCache(str(tmp_path))
+    assert reopened.get('m', 'a') == [1.0, 2.0]
+    reopened.close()
+
+
+def test_embedding_cache_compaction_keeps_recent_entries(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_bytes=64 * 2 * 10, compact_ratio=0.5)
+    for index in range(30):
+        cache.put('m', f't{index}', [float(index)] * 64)
+    assert cache.compactions > 0
+    assert cache.get('m', 't29') == [29.0] * 64
+    assert cache.get('m', 't0') is None
+    cache.close()
+
+
+def test_embedding_cache_from_config(tmp_path):
+    assert EmbeddingCache.from_config({'embedding_cache': {'enabled': False}}) is None
+    assert EmbeddingCache.from_config({}) is None
+
+    cache_dir = tmp_path / 'emb'
+    cache = EmbeddingCache.from_config({
+        'embedding_cache': {'enabled': True, 'path': str(cache_dir), 'max_size_mb': 2},
+    })
+    assert cache.cache_dir == cache_dir
+    assert cache.max_bytes == 2 * 1024 * 1024
+    assert cache_dir.is_dir()
+    cache.close()
+
+
+def test_cached_llm_only_requests_missing_texts(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    embedder = CountingEmbedder()
+    llm = CachedEmbeddingLLM(embedder, cache, 'm')
+
+    assert llm.get_embedding('a') == [1.0, 0.5, -1.0]
+    assert llm.get_embedding('a') == [1.0, 0.5, -1.0]
+    assert embedder.calls == 1
+
+    vectors = llm.get_embeddings(['a', 'bb', 'ccc'])
+    assert [vector[0] for vector in vectors] == [1.0, 2.0, 3.0]
+    assert embedder.batch_calls == 1
+    llm.get_embeddings(['bb', 'ccc'])
+    assert embedder.batch_calls == 1
+    cache.close()
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    started = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return 'result'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('k', slow)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do('k', slow))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert results == ['result'] * 5
+    assert len(calls) == 1
+    assert flight.get_stats()['coalesced'] == 4
+    assert flight.in_flight() == 0
+
+
+def test_single_flight_shares_errors_and_does_not_cache():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        flight.do('k', fail)
+    assert flight.do('k', lambda: 'ok') == 'ok'
+
+
+def test_coalescing_llm_merges_identical_requests_only():
+    release = threading.Event()
+
+    class SlowModel:
+        def __init__(self):
+            self.prompts = []
+            self.lock = threading.Lock()
+
+        def generate_text(self, prompt, **kwargs):
+            with self.lock:
+                self.prompts.append((prompt, kwargs.get('temperature')))
+            release.wait(5)
+            return f'{prompt}:{kwargs.get("temperature")}'
+
+    model = SlowModel()
+    llm = CoalescingLLM(model, 'mock')
+    requests = [('写开头', 0.7)] * 4 + [('写开头', 0.2), ('写结尾', 0.7)]
+    results = [None] * len(requests)
+
+    def run(index, prompt, temperature):
+        results[index] = llm.generate_text(prompt, temperature=temperature)
+
+    threads = [threading.Thread(target=run, args=(i, *request)) for i, request in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while llm.get_coalescing_stats()['requests'] < len(requests) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ['写开头:0.7'] * 4 + ['写开头:0.2', '写结尾:0.7']
+    assert sorted(model.prompts) == [('写开头', 0.2), ('写开头', 0.7), ('写结尾', 0.7)]
+    assert llm.get_coalescing_stats()['coalesced'] == 3
+    # 未包装的属性透传
+    assert llm.prompts is model.prompts
+
+
+def test_request_key_depends_on_kind_model_payload_and_params():
+    base = make_request_key('generate', 'mock', '提示', {'temperature': 0.7, 'max_tokens': 10})
+    assert base == make_request_key('generate', 'mock', '提示', {'max_tokens': 10, 'temperature': 0.7})
+    assert base != make_request_key('embedding', 'mock', '提示', {'temperature': 0.7, 'max_tokens': 10})
+    assert base != make_request_key('generate', 'other', '提示', {'temperature': 0.7, 'max_tokens': 10})
+    assert base != make_request_key('generate', 'mock', '提示', {'temperature': 0.2, 'max_tokens': 10})
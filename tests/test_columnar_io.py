@@ -0,0 +1,70 @@
+"""
+列式导入导出测试
+"""
+
+import pytest
+
+from src.bulk_writer import bulk_save
+from src.columnar_io import ColumnarIOError, export_table, import_table, iter_record_batches
+from src.db_pool import get_pool
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+
+def _rows(db_path):
+    with get_pool(db_path).reader() as conn:
+        return [tuple(row) for row in conn.execute(
+            "SELECT id, source_file, chapter, raw_text, idea, tags, created_at FROM inspirations ORDER BY id")]
+
+
+@pytest.fixture
+def populated(db_path, make_records):
+    bulk_save(make_records(25), db_path)
+    return db_path
+
+
+def test_iter_record_batches_pages_by_id(populated):
+    batches = list(iter_record_batches(populated, batch_size=10))
+    assert [batch.num_rows for batch in batches] == [10, 10, 5]
+    ids = [value for batch in batches for value in batch.column('id').to_pylist()]
+    assert ids == list(range(1, 26))
+    assert batches[0].column('raw_text')[0].as_py() == '灵感原文片段 0'
+
+
+@pytest.mark.parametrize('filename', ['export.parquet', 'export.arrow'])
+def test_round_trip_preserves_rows(populated, tmp_path, filename):
+    output = str(tmp_path / filename)
+    assert export_table(populated, output, batch_size=10) == 25
+    target = str(tmp_path / 'restored.db')
+    assert import_table(output, target, batch_size=7) == 25
+    assert _rows(target) == _rows(populated)
+
+
+def test_parquet_row_groups_follow_batch_size(populated, tmp_path):
+    output = str(tmp_path / 'export.parquet')
+    export_table(populated, output, batch_size=10)
+    assert pq.ParquetFile(output).metadata.num_row_groups == 3
+    assert not (tmp_path / 'export.parquet.tmp').exists()
+
+
+def test_import_without_ids_appends(populated, tmp_path):
+    output = str(tmp_path / 'export.arrow')
+    export_table(populated, output)
+    with pytest.raises(ColumnarIOError):
+        import_table(output, populated)
+    assert import_table(output, populated, preserve_ids=False) == 25
+    assert len(_rows(populated)) == 50
+
+
+def test_invalid_inputs_are_rejected(db_path, tmp_path):
+    with pytest.raises(ColumnarIOError):
+        list(iter_record_batches(str(tmp_path / 'missing.db')))
+    with pytest.raises(ColumnarIOError):
+        import_table(str(tmp_path / 'missing.parquet'), db_path)
+    incomplete = str(tmp_path / 'incomplete.parquet')
+    pq.write_table(pa.table({'source_file': ['a.txt'], 'idea': ['x']}), incomplete)
+    with pytest.raises(ColumnarIOError):
+        import_table(incomplete, db_path)
+    with pytest.raises(ColumnarIOError):
+        export_table(db_path, str(tmp_path / 'out.csv'), format='csv')
@@ -0,0 +1,59 @@
+"""
+文本列透明压缩测试
+"""
+
+from src.bulk_writer import bulk_save
+from src.compression import TextCompressor, enable_compression, get_compressor, train_zlib_dictionary
+from src.db_pool import ConnectionPool, get_pool
+from src.fts import keyword_search
+
+
+def _long_records(count):
+    return [
+        {'source_file': 'novel.txt', 'raw_text': f'青云峰上云海翻涌，少年独立崖边，回望来路。第{index}段' * 8,
+         'idea': f'想法 {index}', 'created_at': f'2026-01-01 00:00:{index:02d}'}
+        for index in range(count)
+    ]
+
+
+def test_roundtrip_with_trained_dictionary(db_path):
+    bulk_save(_long_records(20), db_path)
+    result = enable_compression(db_path, sample_size=20)
+    assert result['rewritten'] == 20
+    assert result['bytes_after'] < result['bytes_before']
+
+    pool = get_pool(db_path)
+    with pool.reader() as conn:
+        stored = conn.execute("SELECT raw_text FROM inspirations WHERE id = 1").fetchone()[0]
+    assert isinstance(stored, bytes)
+    assert get_compressor(pool).decompress(stored) == _long_records(1)[0]['raw_text']
+    # 短文本不压缩
+    assert get_compressor(pool).compress('短') == '短'
+
+
+def test_dictionary_keeps_only_shared_fragments_within_size():
+    data = train_zlib_dictionary(['青云峰上云海翻涌' * 4, '青云峰上云海翻涌' * 3, '其他内容不重复'], dict_size=64)
+    assert 0 < len(data) <= 64
+    assert '云海'.encode('utf-8') in data
+    # 只在一条样本中出现的片段不收录
+    assert '不重复'.encode('utf-8') not in data
+
+
+def test_compression_enabled_by_another_process_is_detected(db_path):
+    bulk_save(_long_records(10), db_path)
+    server = get_compressor(get_pool(db_path))
+    assert server.sql_expr('raw_text') == 'raw_text'
+
+    # 模拟命令行进程：独立的连接池与压缩器
+    other = ConnectionPool(db_path)
+    try:
+        cli = TextCompressor(other)
+        cli.train(sample_size=10)
+        assert cli.recompress() == 10
+    finally:
+        other.close()
+
+    assert server.sql_expr('raw_text') == 'iz_text(raw_text)'
+    found = keyword_search(db_path, '青云峰', 20, 'like')
+    assert len(found) == 10
+    assert all(isinstance(item['raw_text'], str) for item in found)
@@ -0,0 +1,78 @@
+"""
+连接池测试
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.db_pool import ConnectionPool, close_pool, get_pool
+
+
+def test_writer_commits_and_rolls_back(db_path):
+    pool = get_pool(db_path)
+    with pool.writer() as conn:
+        conn.execute("INSERT INTO inspirations (source_file, raw_text, idea) VALUES ('a', 'b', 'c')")
+    with pytest.raises(RuntimeError):
+        with pool.writer() as conn:
+            conn.execute("INSERT INTO inspirations (source_file, raw_text, idea) VALUES ('x', 'y', 'z')")
+            raise RuntimeError('abort')
+
+    with pool.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM inspirations").fetchone()[0] == 1
+
+
+def test_readers_are_query_only(db_path):
+    pool = get_pool(db_path)
+    with pool.reader() as conn:
+        with pytest.raises(Exception):
+            conn.execute("INSERT INTO inspirations (source_file, raw_text, idea) VALUES ('a', 'b', 'c')")
+
+
+def test_reader_is_not_blocked_by_open_write_transaction(db_path):
+    pool = get_pool(db_path)
+    holding = threading.Event()
+    release = threading.Event()
+
+    def hold_writer():
+        with pool.writer() as conn:
+            conn.execute("INSERT INTO inspirations (source_file, raw_text, idea) VALUES ('a', 'b', 'c')")
+            holding.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=hold_writer, daemon=True)
+    thread.start()
+    try:
+        assert holding.wait(5)
+        start = time.perf_counter()
+        with pool.reader() as conn:
+            # WAL 读快照看不到未提交的行
+            assert conn.execute("SELECT COUNT(*) FROM inspirations").fetchone()[0] == 0
+        assert time.perf_counter() - start < 1.0
+    finally:
+        release.set()
+        thread.join(5)
+
+
+def test_reader_count_is_bounded(db_path):
+    pool = ConnectionPool(db_path, max_readers=2, timeout=0.2)
+    try:
+        with pool.reader(), pool.reader():
+            with pytest.raises(Exception, match='只读连接'):
+                with pool.reader():
+                    pass
+        assert pool.stats()['readers_open'] == 2
+        assert pool.stats()['readers_idle'] == 2
+    finally:
+        pool.close()
+
+
+def test_get_pool_is_shared_and_reopened_after_close(db_path):
+    pool = get_pool(db_path)
+    assert get_pool(db_path) is pool
+    close_pool(db_path)
+    reopened = get_pool(db_path)
+    assert reopened is not pool
+    with reopened.reader() as conn:
+        conn.execute("SELECT 1").fetchone()
@@ -0,0 +1,75 @@
+"""
+批量嵌入向量测试
+"""
+
+import threading
+from types import SimpleNamespace
+
+from src.embedding_batch import batch_size_for, get_embeddings, openai_compatible_embeddings
+
+
+class BatchModel:
+    def __init__(self, bad=()):
+        self.bad = set(bad)
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def get_embeddings(self, texts):
+        with self.lock:
+            self.batches.append(list(texts))
+        if self.bad & set(texts):
+            raise ValueError('含有非法文本')
+        return [[float(len(text))] for text in texts]
+
+
+class SingleModel:
+    def __init__(self):
+        self.calls = 0
+
+    def get_embedding(self, text):
+        self.calls += 1
+        return [float(len(text))]
+
+
+def test_results_keep_input_order_and_duplicates_are_requested_once():
+    model = BatchModel()
+    texts = ['a', 'bb', 'a', 'ccc', 'dddd', 'bb']
+    result = get_embeddings(model, texts, batch_size=2)
+    assert result.ok
+    assert list(result) == [[1.0], [2.0], [1.0], [3.0], [4.0], [2.0]]
+    assert sorted(text for batch in model.batches for text in batch) == ['a', 'bb', 'ccc', 'dddd']
+    assert all(len(batch) <= 2 for batch in model.batches)
+
+
+def test_failed_batch_is_retried_per_text():
+    model = BatchModel(bad={'bad'})
+    result = get_embeddings(model, ['x', 'bad', 'yy'], batch_size=3)
+    assert result.failed_indices == [1]
+    assert result[0] == [1.0] and result[2] == [2.0]
+    assert isinstance(result.errors[1], ValueError)
+
+
+def test_model_without_batch_api_falls_back_to_single_calls():
+    model = SingleModel()
+    result = get_embeddings(model, ['a', 'bb', 'ccc'], provider='qwen')
+    assert list(result) == [[1.0], [2.0], [3.0]]
+    assert model.calls == 3
+
+
+def test_provider_batch_sizes():
+    assert batch_size_for('qwen') == 10
+    assert batch_size_for('unknown') == batch_size_for(None) == 16
+
+
+def test_openai_compatible_embeddings_orders_by_index():
+    captured = {}
+
+    def create(model, input, **kwargs):
+        captured.update(model=model, input=input, **kwargs)
+        return SimpleNamespace(data=[SimpleNamespace(index=1, embedding=(2.0,)),
+                                     SimpleNamespace(index=0, embedding=(1.0,))])
+
+    client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+    assert openai_compatible_embeddings(client, 'emb', ['a', 'b'], dimensions=1) == [[1.0], [2.0]]
+    assert captured == {'model': 'emb', 'input': ['a', 'b'], 'dimensions': 1}
+    assert openai_compatible_embeddings(client, 'emb', []) == []
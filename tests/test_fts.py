@@ -0,0 +1,102 @@
+"""
+FTS 索引同步测试
+"""
+
+import pytest
+
+from src.bulk_writer import bulk_save
+from src.db_pool import get_pool
+from src.errors import SearchError
+from src.fts import FullTextIndex, build_match_query, fts_tables, keyword_search, segment
+
+
+@pytest.fixture
+def index(db_path, make_records):
+    bulk_save(make_records(20, keyword='青云峰'), db_path)
+    return FullTextIndex(get_pool(db_path))
+
+
+def test_segment_and_match_query_use_bigrams():
+    assert segment('青云峰顶') == '青云 云峰 峰顶'
+    assert build_match_query('青云峰') == '"青云 云峰"'
+    assert build_match_query('') is None
+
+
+def test_search_falls_back_to_like_before_index_exists(index):
+    assert not index.is_ready()
+    results = index.search('青云峰', limit=5, with_score=True)
+    assert len(results) == 5
+    assert all(item['score'] is None for item in results)
+
+
+def test_ensure_backfills_existing_rows(index):
+    assert index.ensure() == 20
+    assert index.is_ready()
+    assert index.pending_count() == 0
+    results = index.search('青云峰', limit=50, with_score=True)
+    assert len(results) == 20
+    assert all(item['score'] is not None for item in results)
+
+
+def test_new_and_updated_rows_are_searchable_before_and_after_sync(index, db_path):
+    index.ensure()
+    pool = get_pool(db_path)
+    with pool.writer() as conn:
+        conn.execute("INSERT INTO inspirations (source_file, raw_text, idea) VALUES ('n', '紫霄宫的钟声', '想法')")
+        conn.execute("UPDATE inspirations SET raw_text = '天机阁密录' WHERE id = 1")
+    assert index.pending_count() == 2
+
+    # 待同步的行按 LIKE 匹配当前文本，不返回索引中的旧内容
+    assert [item['raw_text'] for item in index.search('紫霄宫')] == ['紫霄宫的钟声']
+    assert [item['id'] for item in index.search('天机阁')] == [1]
+    assert 1 not in [item['id'] for item in index.search('青云峰', limit=50)]
+
+    assert index.sync() == 2
+    assert index.pending_count() == 0
+    assert [item['raw_text'] for item in index.search('紫霄宫', with_score=True)] == ['紫霄宫的钟声']
+    assert index.search('天机阁', with_score=True)[0]['score'] < 0
+
+
+def test_deleted_rows_leave_the_index(index, db_path):
+    index.ensure()
+    with get_pool(db_path).writer() as conn:
+        conn.execute("DELETE FROM inspirations WHERE id <= 5")
+    index.sync()
+    ids = [item['id'] for item in index.search('青云峰', limit=50)]
+    assert len(ids) == 15 and min(ids) == 6
+
+
+def test_sync_is_batched(index):
+    index.sync_batch_size = 7
+    assert index.ensure() == 20
+    assert index.pending_count() == 0
+
+
+def test_keyword_search_like_mode(index, db_path):
+    results = keyword_search(db_path, '青云峰', limit=3, search_mode='like')
+    assert [item['id'] for item in results] == [20, 19, 18]
+
+
+def test_latin_and_single_char_queries_fall_back_to_like(index, db_path):
+    assert build_match_query('drag') is None
+    assert build_match_query('青云 v2') is None
+    assert build_match_query('峰') is None
+    with get_pool(db_path).writer() as conn:
+        conn.execute("INSERT INTO inspirations (source_file, raw_text, idea) VALUES ('n', 'dragon 青云峰', 'x')")
+    index.ensure()
+    # 按整词索引的 MATCH 命中不了 dragon，回退到 LIKE 后与 like 模式一致
+    results = index.search('drag', limit=5, with_score=True)
+    assert [item['raw_text'] for item in results] == ['dragon 青云峰']
+    assert results[0]['score'] is None
+
+
+def test_each_tokenizer_has_its_own_tables(index):
+    assert fts_tables('bigram') == ('inspirations_fts', 'inspirations_fts_pending')
+    assert fts_tables('jieba') == ('inspirations_fts_jieba', 'inspirations_fts_pending_jieba')
+    with pytest.raises(SearchError):
+        fts_tables('unknown')
+    index.ensure()
+    # bigram 索引不会被当作 jieba 索引使用
+    jieba_index = FullTextIndex(index.pool, 'jieba')
+    assert not jieba_index.is_ready()
+    assert all(item['score'] is None for item in jieba_index.search('青云峰', limit=3, with_score=True))
@@ -0,0 +1,85 @@
+"""
+健康检查缓存测试
+"""
+
+import threading
+import time
+
+from src.health_check import HealthCheckCache
+
+
+class Probe:
+    def __init__(self, hung=()):
+        self.hung = set(hung)
+        self.release = threading.Event()
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, name):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if name in self.hung:
+            self.release.wait(5)
+        return True
+
+
+def test_prime_marks_models_available_and_caches_within_ttl():
+    probe = Probe()
+    cache = HealthCheckCache(probe, ['a', 'b'], default_ttl=60, probe_timeout=1)
+    cache.refresh(wait=True)
+    assert cache.get_available_models() == ('a', 'b')
+    cache.refresh(wait=True)
+    assert probe.calls == {'a': 1, 'b': 1}
+
+
+def test_hung_probes_do_not_delay_healthy_models():
+    hung = ['h1', 'h2', 'h3', 'h4', 'h5']
+    probe = Probe(hung=hung)
+    cache = HealthCheckCache(probe, hung + ['ok'], default_ttl=0, probe_timeout=0.3)
+    try:
+        start = time.monotonic()
+        cache.refresh(wait=True)
+        assert time.monotonic() - start < 1.0
+        status = cache.get_status()
+        assert status['ok']['available'] is True
+        assert status['ok']['error'] is None
+        for name in hung:
+            assert status[name]['available'] is False
+            assert '超时' in status[name]['error']
+    finally:
+        probe.release.set()
+
+
+def test_no_new_probe_while_previous_is_running():
+    probe = Probe(hung=['slow'])
+    cache = HealthCheckCache(probe, ['slow', 'fast'], default_ttl=0, probe_timeout=0.1)
+    try:
+        for _ in range(3):
+            cache.refresh(wait=True)
+        assert probe.calls['slow'] == 1
+        assert probe.calls['fast'] == 3
+    finally:
+        probe.release.set()
+
+
+def test_late_result_is_recorded_after_timeout():
+    probe = Probe(hung=['slow'])
+    cache = HealthCheckCache(probe, ['slow'], default_ttl=60, probe_timeout=0.1)
+    cache.refresh(wait=True)
+    assert not cache.is_available('slow')
+    probe.release.set()
+    deadline = time.monotonic() + 2
+    while not cache.is_available('slow') and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.is_available('slow')
+
+
+def test_probe_exception_marks_unavailable():
+    def probe(name):
+        raise ConnectionError('连接失败')
+
+    cache = HealthCheckCache(probe, ['x'], probe_timeout=1)
+    cache.refresh(wait=True)
+    status = cache.get_status()['x']
+    assert status['available'] is False
+    assert '连接失败' in status['error']
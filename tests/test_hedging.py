@@ -0,0 +1,116 @@
+"""
+对冲请求测试
+"""
+
+import threading
+import time
+
+from src.hedging import HedgedExecutor, supports_streaming
+from src.rate_limiter import RateLimitedLLM, RateLimiter
+from src.telemetry import InstrumentedLLM, LLMTelemetry
+
+
+class BlockingModel:
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+
+    def generate_text(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        return f'blocking:{self.delay}'
+
+
+class StreamingModel:
+    def __init__(self, delay, chunks=20):
+        self.delay = delay
+        self.chunks = chunks
+        self.streamed = 0
+        self.generated = 0
+        self.closed = threading.Event()
+
+    def stream_text(self, prompt, **kwargs):
+        try:
+            for _ in range(self.chunks):
+                time.sleep(self.delay / self.chunks)
+                self.streamed += 1
+                yield 'x'
+        finally:
+            self.closed.set()
+
+    def generate_text(self, prompt, **kwargs):
+        self.generated += 1
+        time.sleep(self.delay)
+        return 'generated'
+
+
+def _executor(models, **kwargs):
+    return HedgedExecutor(models.get, initial_delay=0.05, alternates={'slow': 'fast'}, **kwargs)
+
+
+def test_supports_streaming_looks_through_wrappers():
+    telemetry = LLMTelemetry()
+    assert supports_streaming(StreamingModel(0.1))
+    assert not supports_streaming(BlockingModel(0.1))
+    assert supports_streaming(InstrumentedLLM(StreamingModel(0.1), 'm', telemetry))
+    # InstrumentedLLM 总是定义 stream_text，但被包装的模型不能流式
+    assert not supports_streaming(InstrumentedLLM(BlockingModel(0.1), 'm', telemetry))
+    # 只靠 __getattr__ 透传的包装器不能被流式调用绕过
+    assert not supports_streaming(RateLimitedLLM(StreamingModel(0.1), RateLimiter(), 'mock'))
+
+
+def test_instrumented_blocking_model_is_hedged_through_generate_text():
+    telemetry = LLMTelemetry()
+    models = {
+        'slow': InstrumentedLLM(BlockingModel(0.5), 'slow', telemetry),
+        'fast': InstrumentedLLM(BlockingModel(0.01), 'fast', telemetry),
+    }
+    executor = _executor(models, streaming=True)
+
+    assert executor.generate_text('p', 'slow') == 'blocking:0.01'
+    stats = executor.get_stats()
+    assert stats['hedge_wins'] == 1
+    assert stats['abandoned'] == 1 and stats['cancelled'] == 0
+
+
+def test_streaming_is_opt_in():
+    models = {'slow': StreamingModel(0.3), 'fast': StreamingModel(0.01)}
+    executor = _executor(models)
+
+    assert executor.generate_text('p', 'slow') == 'generated'
+    assert models['slow'].streamed == 0 and models['fast'].streamed == 0
+
+
+def test_losing_stream_is_closed_and_recorded_as_censored_sample():
+    models = {'slow': StreamingModel(1.0), 'fast': StreamingModel(0.02)}
+    executor = _executor(models, streaming=True)
+
+    assert executor.generate_text('p', 'slow') == 'x' * 20
+    assert models['slow'].closed.wait(2)
+    assert models['slow'].streamed < models['slow'].chunks
+    time.sleep(0.05)
+    stats = executor.get_stats()
+    assert stats['cancelled'] == 1 and stats['abandoned'] == 0
+    assert stats['censored_samples'] == 1
+    # 截止时间的样本包含落败请求被中止时的耗时，而不只是胜出者
+    assert len(executor._histograms['slow'].samples) == 1
+
+
+def test_no_hedge_when_primary_is_fast():
+    models = {'slow': BlockingModel(0.0), 'fast': BlockingModel(0.0)}
+    executor = _executor(models)
+
+    assert executor.generate_text('p', 'slow') == 'blocking:0.0'
+    assert models['fast'].calls == 0
+    assert executor.get_stats()['hedged'] == 0
+
+
+def test_budget_limits_hedges():
+    models = {'slow': BlockingModel(0.1), 'fast': BlockingModel(0.0)}
+    executor = _executor(models, max_hedge_ratio=0.0, burst=1)
+
+    for _ in range(3):
+        executor.generate_text('p', 'slow')
+    stats = executor.get_stats()
+    assert stats['hedged'] == 1
+    assert stats['budget_denied'] == 2
@@ -0,0 +1,66 @@
+"""
+索引化筛选检索与规范化标签表测试
+"""
+
+import pytest
+
+from src.bulk_writer import bulk_save
+from src.db_pool import get_pool
+from src.errors import SearchError
+from src.indexed_search import date_range_bounds, list_tags, search_by_date_range, search_by_source, search_by_tag
+from src.schema_migrations import SCHEMA_VERSION, get_schema_version
+
+
+@pytest.fixture
+def populated(db_path):
+    bulk_save([
+        {'source_file': 'a.txt', 'raw_text': '一', 'idea': 'x', 'tags': '江湖, 门派', 'created_at': '2026-01-01 08:00:00'},
+        {'source_file': 'a.txt', 'raw_text': '二', 'idea': 'x', 'tags': ['江湖'], 'created_at': '2026-01-02 23:59:59'},
+        {'source_file': 'b.txt', 'raw_text': '三', 'idea': 'x', 'tags': '江湖门派', 'created_at': '2026-01-03 00:00:00'},
+    ], db_path)
+    return db_path
+
+
+def _plan(db_path, sql, params):
+    with get_pool(db_path).reader() as conn:
+        return ' '.join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+
+def test_migrations_are_applied(populated):
+    assert get_schema_version(get_pool(populated)) == SCHEMA_VERSION
+
+
+def test_date_range_bounds_are_half_open():
+    assert date_range_bounds('2026-01-01', '2026-01-31') == ('2026-01-01', '2026-02-01')
+    with pytest.raises(SearchError):
+        date_range_bounds('2026-02-01', '2026-01-01')
+    with pytest.raises(SearchError):
+        date_range_bounds('2026/01/01', '2026-01-02')
+
+
+def test_source_and_date_queries(populated):
+    assert [item['raw_text'] for item in search_by_source(populated, 'a.txt')] == ['二', '一']
+    assert [item['raw_text'] for item in search_by_source(populated, 'a.txt', limit=1)] == ['二']
+    # 结束日当天 23:59:59 的记录包含在内，次日 00:00:00 不包含
+    assert [item['raw_text'] for item in search_by_date_range(populated, '2026-01-01', '2026-01-02')] == ['二', '一']
+
+
+def test_filters_use_indexes(populated):
+    source_plan = _plan(populated, "SELECT id FROM inspirations WHERE source_file = ? "
+                                   "ORDER BY created_at DESC, id DESC", ('a.txt',))
+    assert 'idx_inspirations_source_created' in source_plan
+    date_plan = _plan(populated, "SELECT id FROM inspirations WHERE created_at >= ? AND created_at < ?",
+                      ('2026-01-01', '2026-01-02'))
+    assert 'idx_inspirations_created_at' in date_plan
+
+
+def test_tag_table_is_exact_and_follows_updates(populated):
+    assert [item['raw_text'] for item in search_by_tag(populated, '江湖')] == ['二', '一']
+    # 精确匹配：'江湖门派' 不会被 '门派' 命中
+    assert [item['raw_text'] for item in search_by_tag(populated, '门派')] == ['一']
+    with get_pool(populated).writer() as conn:
+        conn.execute("UPDATE inspirations SET tags = '门派' WHERE id = 2")
+        conn.execute("DELETE FROM inspirations WHERE id = 1")
+    assert [item['raw_text'] for item in search_by_tag(populated, '门派')] == ['二']
+    assert search_by_tag(populated, '江湖') == []
+    assert dict(list_tags(populated)) == {'门派': 1, '江湖门派': 1}
@@ -0,0 +1,70 @@
+"""
+模型延迟加载测试
+"""
+
+import threading
+
+import pytest
+
+from src.lazy_loading import LazyModelRegistry, lazy_import, validate_model_config
+
+
+def test_registry_validates_eagerly_and_creates_lazily():
+    created = []
+
+    def factory(name, config):
+        created.append(name)
+        return object()
+
+    registry = LazyModelRegistry({'a': {'provider': 'mock', 'model_name': 'm'},
+                                  'b': {'provider': 'qwen', 'model_name': 'q'}}, factory=factory)
+    assert created == [] and registry.loaded_models() == []
+    model = registry.get('a')
+    assert registry.get('a') is model
+    assert created == ['a']
+    with pytest.raises(ValueError):
+        registry.get('missing')
+
+
+def test_invalid_config_is_rejected_at_startup():
+    with pytest.raises(ValueError):
+        validate_model_config('x', {'provider': 'unknown', 'model_name': 'm'})
+    with pytest.raises(ValueError):
+        validate_model_config('x', {'provider': 'mock', 'model_name': 'm', 'temperature': 5})
+    with pytest.raises(ValueError):
+        LazyModelRegistry({'x': {'provider': 'mock'}})
+
+
+def test_concurrent_first_access_creates_once():
+    created = []
+    barrier = threading.Barrier(8)
+
+    def factory(name, config):
+        created.append(name)
+        return object()
+
+    registry = LazyModelRegistry({'a': {'provider': 'mock', 'model_name': 'm'}}, factory=factory)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(registry.get('a'))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(created) == 1 and len(set(map(id, results))) == 1
+
+
+def test_default_factory_builds_the_mock_provider():
+    registry = LazyModelRegistry({'mock': {'provider': 'mock', 'model_name': 'mock-llm'}})
+    assert registry.get('mock').generate_text('hi')
+
+
+def test_lazy_import_defers_module_load():
+    module = lazy_import('json')
+    assert not module.is_loaded
+    assert module.dumps([1]) == '[1]'
+    assert module.is_loaded
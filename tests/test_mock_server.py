@@ -0,0 +1,91 @@
+"""
+负载测试用模拟提供商测试
+"""
+
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.mock_server import (
+    LatencyProfile, LoadProfile, MockOpenAIServer, MockProviderError, ProfiledMockLLM, fake_embedding
+)
+
+
+def _post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.status, json.loads(response.read())
+
+
+@pytest.fixture
+def server():
+    server = MockOpenAIServer(responder=lambda prompt: f'回复:{prompt}').start()
+    yield server
+    server.stop()
+
+
+def test_latency_profile_parse_and_sample():
+    assert LatencyProfile.parse('fixed:1.5').sample() == 1.5
+    uniform = LatencyProfile.parse('uniform:1,2', seed=1)
+    assert all(1 <= uniform.sample() <= 2 for _ in range(20))
+    assert all(LatencyProfile.parse('normal:0,5', seed=1).sample() >= 0 for _ in range(20))
+    with pytest.raises(ValueError):
+        LatencyProfile.parse('poisson:1')
+
+
+def test_load_profile_injects_throttling_and_errors():
+    throttled = LoadProfile(rate_limit_rate=1.0, retry_after=2.0)
+    with pytest.raises(MockProviderError) as info:
+        throttled.admit()
+    assert info.value.status_code == 429 and info.value.retry_after == 2.0
+
+    with pytest.raises(MockProviderError) as info:
+        LoadProfile(error_rate=1.0).admit()
+    assert info.value.status_code == 500
+
+    capped = LoadProfile(max_rps=2)
+    capped.admit()
+    capped.admit()
+    with pytest.raises(MockProviderError):
+        capped.admit()
+    assert capped.stats == {'requests': 3, 'ok': 2, 'throttled': 1, 'errors': 0}
+
+
+def test_profiled_mock_sleeps_for_sampled_latency():
+    slept = []
+    llm = ProfiledMockLLM(profile=LoadProfile(LatencyProfile('fixed', (0.25,))), sleep=slept.append)
+    assert llm.generate_text('提示')
+    assert llm.get_embeddings(['a', 'b']) == [fake_embedding('a'), fake_embedding('b')]
+    # 批量嵌入只占一次请求
+    assert slept == [0.25, 0.25]
+    assert llm.get_model_info()['load_profile']['ok'] == 2
+
+
+def test_server_chat_and_embeddings(server):
+    status, body = _post(f'{server.url}/chat/completions',
+                         {'model': 'm', 'messages': [{'role': 'user', 'content': '你好'}]})
+    assert status == 200
+    assert body['choices'][0]['message']['content'] == '回复:你好'
+    assert body['usage']['total_tokens'] == body['usage']['prompt_tokens'] + body['usage']['completion_tokens']
+
+    status, body = _post(f'{server.url}/embeddings', {'input': ['a', 'b'], 'dimensions': 8})
+    assert [item['index'] for item in body['data']] == [0, 1]
+    assert body['data'][0]['embedding'] == fake_embedding('a', 8)
+
+
+def test_server_returns_429_with_retry_after(server):
+    server.profile = LoadProfile(rate_limit_rate=1.0, retry_after=3)
+    with pytest.raises(urllib.error.HTTPError) as info:
+        _post(f'{server.url}/chat/completions', {'messages': []})
+    assert info.value.code == 429
+    assert info.value.headers['Retry-After'] == '3'
+    assert json.loads(info.value.read())['error']['type'] == 'rate_limit_exceeded'
+
+
+def test_unknown_route_is_404(server):
+    with pytest.raises(urllib.error.HTTPError) as info:
+        _post(f'{server.url}/nope', {})
+    assert info.value.code == 404
@@ -0,0 +1,87 @@
+"""
+写时复制模型注册表测试
+"""
+
+import threading
+
+import pytest
+
+from src.model_registry import EnvPersister, ModelRegistry, mask_api_key
+
+CONFIGS = {'mock': {'provider': 'mock'}, 'qwen': {'provider': 'qwen'}, 'deepseek': {'provider': 'deepseek'}}
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    for name in ('QWEN_API_KEY', 'DEEPSEEK_API_KEY'):
+        monkeypatch.delenv(name, raising=False)
+    return ModelRegistry(dict(CONFIGS), persister=EnvPersister(str(tmp_path / '.env')))
+
+
+def test_mask_api_key():
+    assert mask_api_key(None) == ''
+    assert mask_api_key('sk-abcdef1234') == '********1234'
+
+
+def test_switch_requires_key_and_snapshots_are_immutable(registry):
+    before = registry.snapshot
+    result = registry.set_current_model('qwen')
+    assert not result['ok']
+    assert registry.snapshot is before
+
+    assert registry.set_current_model('qwen', api_key='sk-qwen-9999')['ok']
+    # 旧快照不受切换影响
+    assert before.current_model == 'mock'
+    current = registry.get_current_model()
+    assert current == {'vendor': 'qwen', 'has_api_key': True, 'api_key_masked': '********9999',
+                       'version': before.version + 1}
+    assert not registry.set_current_model('unknown')['ok']
+
+
+def test_remove_current_model_falls_back_to_mock(registry):
+    registry.set_current_model('qwen', api_key='k')
+    registry.remove_model('qwen')
+    assert registry.snapshot.current_model == 'mock'
+    assert 'qwen' not in registry.list_models()
+    with pytest.raises(ValueError):
+        registry.get_config('qwen')
+
+
+def test_persisted_keys_are_merged_into_env_with_backup(registry, tmp_path):
+    env_path = tmp_path / '.env'
+    env_path.write_text('# 注释\nQWEN_API_KEY=old\nOTHER=1\n', encoding='utf-8')
+    registry.set_current_model('qwen', api_key='new-qwen', persist=True)
+    registry.set_current_model('deepseek', api_key='new-ds', persist=True)
+    assert registry.persister.flush(timeout=5)
+    lines = env_path.read_text(encoding='utf-8').splitlines()
+    assert lines[:3] == ['# 注释', 'QWEN_API_KEY=new-qwen', 'OTHER=1']
+    assert 'DEEPSEEK_API_KEY=new-ds' in lines
+    assert (tmp_path / '.env.bak').exists()
+    assert registry.persister.writes <= 2
+
+
+def test_concurrent_readers_always_see_a_consistent_snapshot(registry):
+    stop = threading.Event()
+    bad = []
+
+    def reader():
+        while not stop.is_set():
+            snapshot = registry.snapshot
+            if snapshot.current_model not in snapshot.configs:
+                bad.append(snapshot)
+
+    def writer():
+        for index in range(200):
+            registry.add_model(f'extra{index}', {'provider': 'mock'})
+            registry.set_current_model('mock')
+            registry.remove_model(f'extra{index}')
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    writer()
+    stop.set()
+    for thread in readers:
+        thread.join(5)
+    assert bad == []
+    assert registry.list_models() == list(CONFIGS)
@@ -0,0 +1,122 @@
+"""
+游标分页测试
+"""
+
+import pytest
+
+from src.bulk_writer import bulk_save
+from src.db_pool import get_pool
+from src.fts import get_index
+from src.pagination import (
+    decode_cursor, encode_cursor, paginate_ranked, search_by_date_range_page, search_by_source_page,
+    search_by_tag_page, search_inspirations_page
+)
+from src.errors import SearchError
+
+
+def _collect(fetch):
+    ids, cursor = [], None
+    while True:
+        page = fetch(cursor)
+        ids.extend(item['id'] for item in page.items)
+        if not page.has_more:
+            return ids
+        cursor = page.next_cursor
+
+
+@pytest.fixture
+def populated(db_path, make_records):
+    bulk_save(make_records(23, keyword='青云峰'), db_path)
+    return db_path
+
+
+def test_cursor_roundtrip_and_query_binding():
+    cursor = encode_cursor('like', ('青云峰', 'like', 'bigram'), [42])
+    assert decode_cursor(cursor, 'like', ('青云峰', 'like', 'bigram')) == [42]
+    assert decode_cursor(None, 'like', ('青云峰',)) is None
+    with pytest.raises(SearchError):
+        decode_cursor(cursor, 'like', ('紫霄宫', 'like', 'bigram'))
+    with pytest.raises(SearchError):
+        decode_cursor('not-a-cursor!', 'like', ('青云峰',))
+
+
+def test_like_pages_cover_all_rows_once(populated):
+    ids = _collect(lambda cursor: search_inspirations_page(populated, '青云峰', limit=5, cursor=cursor))
+    assert ids == list(range(23, 0, -1))
+
+
+def test_fts_pages_cover_all_rows_once(populated):
+    get_index(populated, background_sync=False).ensure()
+    ids = _collect(lambda cursor: search_inspirations_page(populated, '青云峰', limit=4, cursor=cursor,
+                                                           search_mode='fts'))
+    assert sorted(ids) == list(range(1, 24))
+
+
+def test_fts_pages_stay_stable_across_inserts_and_sync(populated):
+    index = get_index(populated, background_sync=False)
+    index.ensure()
+    first = search_inspirations_page(populated, '青云峰', limit=5, search_mode='fts')
+    assert [item['id'] for item in first.items] == [23, 22, 21, 20, 19]
+    with get_pool(populated).writer() as conn:
+        # 新行与改写后的行都会改变 bm25 统计；改写的行在同步前仍按当前文本匹配
+        conn.execute("INSERT INTO inspirations (source_file, raw_text, idea) VALUES ('n', '青云峰青云峰', 'x')")
+        conn.execute("UPDATE inspirations SET raw_text = '无关内容' WHERE id = 10")
+    second = search_inspirations_page(populated, '青云峰', limit=5, cursor=first.next_cursor, search_mode='fts')
+    index.sync()
+    rest = _collect(lambda cursor: search_inspirations_page(populated, '青云峰', limit=5,
+                                                            cursor=cursor or second.next_cursor, search_mode='fts'))
+    ids = [item['id'] for item in first.items + second.items] + rest
+    assert ids == [i for i in range(23, 0, -1) if i != 10]
+
+
+def test_fts_page_excludes_stale_index_entries_of_pending_rows(populated):
+    index = get_index(populated, background_sync=False)
+    index.ensure()
+    with get_pool(populated).writer() as conn:
+        conn.execute("UPDATE inspirations SET raw_text = '无关内容' WHERE id = 5")
+    ids = _collect(lambda cursor: search_inspirations_page(populated, '青云峰', limit=50, cursor=cursor,
+                                                           search_mode='fts'))
+    assert 5 not in ids and len(ids) == 22
+
+
+def test_like_cursor_keeps_working_after_index_is_built(populated):
+    index = get_index(populated, background_sync=False)
+    first = search_inspirations_page(populated, '青云峰', limit=10, search_mode='fts')
+    index.ensure()
+    second = search_inspirations_page(populated, '青云峰', limit=10, cursor=first.next_cursor, search_mode='fts')
+    assert [item['id'] for item in second.items] == list(range(13, 3, -1))
+
+
+def test_pages_are_stable_when_rows_are_inserted_between_requests(populated):
+    first = search_inspirations_page(populated, '青云峰', limit=5)
+    with get_pool(populated).writer() as conn:
+        conn.execute("INSERT INTO inspirations (source_file, raw_text, idea) VALUES ('n', '青云峰新片段', 'x')")
+    second = search_inspirations_page(populated, '青云峰', limit=5, cursor=first.next_cursor)
+    assert [item['id'] for item in second.items] == [18, 17, 16, 15, 14]
+
+
+def test_source_date_and_tag_pages(populated):
+    by_source = _collect(lambda cursor: search_by_source_page(populated, 'novel.txt', limit=6, cursor=cursor))
+    assert by_source == list(range(23, 0, -1))
+
+    by_date = _collect(lambda cursor: search_by_date_range_page(populated, '2026-01-01', '2026-01-01',
+                                                                limit=6, cursor=cursor))
+    assert by_date == list(range(23, 0, -1))
+
+    by_tag = _collect(lambda cursor: search_by_tag_page(populated, '测试', limit=6, cursor=cursor))
+    assert by_tag == list(range(23, 0, -1))
+
+
+def test_cursor_from_another_search_is_rejected(populated):
+    page = search_by_source_page(populated, 'novel.txt', limit=5)
+    with pytest.raises(SearchError):
+        search_by_tag_page(populated, '测试', limit=5, cursor=page.next_cursor)
+
+
+def test_paginate_ranked_orders_by_score_then_id():
+    results = [{'id': index, 'score': score} for index, score in enumerate([0.5, 0.9, 0.5, 0.1, 0.9], 1)]
+    first = paginate_ranked(results, ('q',), limit=2)
+    assert [item['id'] for item in first.items] == [5, 2]
+    second = paginate_ranked(results, ('q',), limit=2, cursor=first.next_cursor)
+    assert [item['id'] for item in second.items] == [3, 1]
+    assert paginate_ranked(results, ('q',), limit=2, cursor=second.next_cursor).next_cursor is None
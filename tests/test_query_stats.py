@@ -0,0 +1,94 @@
+"""
+SQL 语句统计与慢查询日志测试
+"""
+
+import logging
+import sqlite3
+
+import pytest
+
+from src.db_pool import close_all_pools, get_pool
+from src.query_stats import (
+    OTHER_SHAPE, InstrumentedConnection, QueryStats, disable_query_stats, enable_from_config, enable_query_stats,
+    get_query_stats, normalize_sql
+)
+
+
+@pytest.fixture
+def stats_db(db_path):
+    close_all_pools()
+    yield db_path
+    close_all_pools()
+    disable_query_stats()
+
+
+def _create_table(db_path):
+    with get_pool(db_path).writer() as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.executemany("INSERT INTO items (name) VALUES (?)", [(f'n{index}',) for index in range(50)])
+
+
+def test_normalize_sql_folds_literals_and_lists():
+    assert normalize_sql("SELECT * FROM t WHERE a = 'x''y' AND b = -1.5;") == "SELECT * FROM t WHERE a = ? AND b = ?"
+    assert normalize_sql("SELECT * FROM t2 WHERE id IN (?, ?,?)") == "SELECT * FROM t2 WHERE id IN (...)"
+    assert normalize_sql("INSERT INTO t VALUES (?, ?), (?, ?),\n (?, ?)") == "INSERT INTO t VALUES (?, ?), ..."
+
+
+def test_statements_are_grouped_by_shape(stats_db):
+    stats = enable_query_stats(slow_ms=10000)
+    assert get_query_stats() is stats
+    _create_table(stats_db)
+    with get_pool(stats_db).reader() as conn:
+        assert isinstance(conn, InstrumentedConnection)
+        for index in (1, 2, 3):
+            conn.execute(f"SELECT name FROM items WHERE id = {index}").fetchall()
+        assert len(list(conn.execute("SELECT name FROM items"))) == 50
+    shapes = {item['shape']: item for item in stats.summary(top=100)['shapes']}
+    point = shapes['SELECT name FROM items WHERE id = ?']
+    assert point['count'] == 3 and point['rows'] == 3
+    assert shapes['SELECT name FROM items']['rows'] == 50
+    assert shapes['INSERT INTO items (name) VALUES (?)']['rows'] == 50
+    assert stats.summary()['slow_statements'] == 0
+
+
+def test_slow_statements_are_logged_with_plan(stats_db, caplog):
+    stats = enable_query_stats(slow_ms=0)
+    _create_table(stats_db)
+    with caplog.at_level(logging.WARNING, logger='src.query_stats'):
+        with get_pool(stats_db).reader() as conn:
+            conn.execute("SELECT name FROM items WHERE name = 'n1'").fetchall()
+    summary = stats.summary(top=100)
+    assert 'SELECT name FROM items WHERE name = ?' in summary['full_scans']
+    slow = [item for item in summary['recent_slow'] if item['shape'] == 'SELECT name FROM items WHERE name = ?']
+    assert slow and any(detail.startswith('SCAN') for detail in slow[0]['plan'])
+    assert '慢查询' in caplog.text
+
+
+def test_errors_are_counted_and_reraised(stats_db):
+    stats = enable_query_stats(slow_ms=10000)
+    with get_pool(stats_db).reader() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("SELECT * FROM missing_table")
+    shapes = {item['shape']: item for item in stats.summary(top=100)['shapes']}
+    assert shapes['SELECT * FROM missing_table']['errors'] == 1
+
+
+def test_shape_overflow_goes_to_other():
+    stats = QueryStats(max_shapes=2)
+    for index in range(4):
+        stats.record(None, f"SELECT * FROM t{index}", (), 0.001)
+    summary = stats.summary()
+    assert summary['tracked_shapes'] == 3
+    assert {item['shape']: item['count'] for item in summary['shapes']}[OTHER_SHAPE] == 2
+    stats.reset()
+    assert stats.summary()['statements'] == 0
+
+
+def test_enable_from_config_and_disable(stats_db):
+    assert enable_from_config({'database': {'query_stats': {'enabled': False}}}) is None
+    stats = enable_from_config({'database': {'query_stats': {'enabled': True, 'slow_ms': 50}}})
+    assert stats.slow_threshold == pytest.approx(0.05)
+    disable_query_stats()
+    assert get_query_stats() is None
+    with get_pool(stats_db).reader() as conn:
+        assert not isinstance(conn, InstrumentedConnection)
@@ -0,0 +1,109 @@
+"""
+请求限流测试
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.rate_limiter import (
+    ProviderLimiter, RateLimitedLLM, RateLimiter, RateLimitError, TokenBucket, estimate_tokens
+)
+
+
+class ProviderRateLimit(Exception):
+    status_code = 429
+    retry_after = 0.01
+
+
+def test_estimate_tokens_counts_cjk_per_character():
+    assert estimate_tokens('') == 1
+    assert estimate_tokens('青云峰') == 3
+    assert estimate_tokens('abcdefgh') == 2
+
+
+def test_token_bucket_refills_and_caps_large_requests():
+    bucket = TokenBucket(capacity=10, refill_rate=5)
+    now = bucket.updated_at
+    assert bucket.time_until(10, now) == 0.0
+    bucket.consume(10)
+    assert bucket.time_until(5, now) == pytest.approx(1.0)
+    # 超过容量的请求按容量计，不会永远等待
+    assert bucket.time_until(100, now) == pytest.approx(2.0)
+
+
+def test_limiter_queues_instead_of_failing():
+    limiter = ProviderLimiter(requests_per_minute=600, tokens_per_minute=600000)
+    limiter._requests = TokenBucket(capacity=1, refill_rate=20)
+    assert limiter.acquire(1) < 0.01
+    start = time.monotonic()
+    waited = limiter.acquire(1)
+    assert waited > 0.02
+    assert time.monotonic() - start < 1.0
+    assert limiter.get_stats()['queued'] == 1
+
+
+def test_limiter_times_out_when_budget_does_not_refill():
+    limiter = ProviderLimiter(requests_per_minute=1, tokens_per_minute=1000)
+    limiter.acquire(1)
+    with pytest.raises(RateLimitError):
+        limiter.acquire(1, timeout=0.05)
+    assert limiter.get_stats()['timeouts'] == 1
+
+
+def test_limiters_are_per_provider_and_key():
+    limiter = RateLimiter({'default': {'requests_per_minute': 10, 'tokens_per_minute': 1000},
+                           'qwen': {'requests_per_minute': 300}})
+    assert limiter.get_limiter('mock') is None
+    qwen = limiter.get_limiter('qwen', 'key-a')
+    assert qwen.requests_per_minute == 300 and qwen.tokens_per_minute == 1000
+    assert limiter.get_limiter('qwen', 'key-a') is qwen
+    assert limiter.get_limiter('qwen', 'key-b') is not qwen
+    assert all('key-a' not in name for name in limiter.get_stats())
+
+
+def test_rate_limited_llm_requeues_on_429_and_settles_usage():
+    class Model:
+        def __init__(self):
+            self.calls = 0
+            self.last_usage = {'total_tokens': 7}
+
+        def generate_text(self, prompt, **kwargs):
+            self.calls += 1
+            if self.calls == 1:
+                raise ProviderRateLimit('too many requests')
+            return '好'
+
+    model = Model()
+    limiter = RateLimiter({'openai': {'requests_per_minute': 600, 'tokens_per_minute': 1000}})
+    llm = RateLimitedLLM(model, limiter, 'openai', max_tokens=100)
+    assert llm.generate_text('提示') == '好'
+    assert model.calls == 2
+    stats = limiter.get_stats()['openai']
+    assert stats['throttled'] == 1
+    assert stats['acquired'] == 2
+    # 两次预扣 102 个 token，失败的一次全退，成功的一次按实际 7 个结算
+    bucket = limiter.get_limiter('openai')._tokens
+    assert bucket.tokens == pytest.approx(1000 - 7, abs=1)
+
+
+def test_waiters_are_served_in_arrival_order():
+    limiter = ProviderLimiter(requests_per_minute=600, tokens_per_minute=600000)
+    limiter._requests = TokenBucket(capacity=1, refill_rate=50)
+    limiter.acquire(1)
+    order = []
+
+    def worker(index):
+        limiter.acquire(1)
+        order.append(index)
+
+    threads = []
+    for index in range(4):
+        thread = threading.Thread(target=worker, args=(index,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.005)
+    for thread in threads:
+        thread.join(5)
+    assert order == [0, 1, 2, 3]
@@ -0,0 +1,161 @@
+"""
+熔断器与故障转移测试
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.resilience import CircuitBreaker, FailoverError, FailoverExecutor, RetryPolicy, is_transient_error
+
+
+class TransientError(Exception):
+    status_code = 503
+
+
+class FlakyModel:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+
+    def generate_text(self, prompt, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise TransientError('service unavailable')
+        return f'ok:{prompt}'
+
+    def is_available(self):
+        return True
+
+
+def test_breaker_opens_after_threshold_and_recovers():
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    # 半开状态只放行一个试探请求
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_failure_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_release_returns_half_open_slot():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.allow_request()
+
+
+def test_failover_retries_then_switches_model():
+    models = {'primary': FlakyModel(failures=10), 'backup': FlakyModel()}
+    executor = FailoverExecutor(models.get, order=['primary', 'backup'],
+                                retry_policy=RetryPolicy(max_retries=1, base_delay=0),
+                                sleep=lambda seconds: None)
+
+    assert executor.call('generate_text', 'hi', model_name='primary') == 'ok:hi'
+    assert models['primary'].calls == 2
+    assert models['backup'].calls == 1
+
+
+def test_failover_error_when_all_models_fail():
+    models = {'a': FlakyModel(failures=10)}
+    executor = FailoverExecutor(models.get, order=['a'], retry_policy=RetryPolicy(max_retries=0),
+                                sleep=lambda seconds: None)
+    with pytest.raises(FailoverError):
+        executor.call('generate_text', 'hi')
+
+
+def test_skipping_unavailable_model_keeps_half_open_probe():
+    model = FlakyModel()
+    model.is_available = lambda: available
+    executor = FailoverExecutor(lambda name: model, order=['a'], failure_threshold=1,
+                                recovery_timeout=0.05, retry_policy=RetryPolicy(max_retries=0),
+                                sleep=lambda seconds: None)
+    executor.get_breaker('a').record_failure()
+    time.sleep(0.06)
+
+    available = False
+    with pytest.raises(FailoverError):
+        executor.call('generate_text', 'hi')
+    available = True
+    assert executor.call('generate_text', 'hi') == 'ok:hi'
+    assert executor.get_breaker('a').state == CircuitBreaker.CLOSED
+
+
+class BadRequestError(Exception):
+    status_code = 400
+
+
+class APITimeoutError(Exception):
+    """与 openai SDK 同名的超时异常"""
+
+
+def test_transient_errors_are_classified_by_type_and_status():
+    assert is_transient_error(TimeoutError())
+    assert is_transient_error(TransientError('x'))
+    assert is_transient_error(APITimeoutError('x'))
+    response_error = Exception('x')
+    response_error.response = SimpleNamespace(status_code=502)
+    assert is_transient_error(response_error)
+    # 只看类型与状态码，不看错误信息中的数字或字样
+    assert not is_transient_error(BadRequestError('upstream returned 502 timeout'))
+    assert not is_transient_error(ValueError('503 service unavailable'))
+
+
+def test_non_transient_errors_do_not_open_the_breaker():
+    class BadModel(FlakyModel):
+        def generate_text(self, prompt, **kwargs):
+            self.calls += 1
+            raise BadRequestError('prompt too long (502 tokens over)')
+
+    model = BadModel()
+    executor = FailoverExecutor(lambda name: model, order=['a'], failure_threshold=2,
+                                retry_policy=RetryPolicy(max_retries=3, base_delay=0),
+                                sleep=lambda seconds: None)
+    for _ in range(3):
+        with pytest.raises(FailoverError):
+            executor.call('generate_text', 'hi')
+    # 不重试，也不计入熔断
+    assert model.calls == 3
+    status = executor.get_model_status('a')
+    assert status['circuit_state'] == CircuitBreaker.CLOSED
+    assert status['failures'] == 0
+
+
+def test_non_transient_error_returns_half_open_slot():
+    outcomes = [BadRequestError('bad'), 'ok']
+
+    class Model(FlakyModel):
+        def generate_text(self, prompt, **kwargs):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+    executor = FailoverExecutor(lambda name: Model(), order=['a'], failure_threshold=1,
+                                recovery_timeout=0.05, retry_policy=RetryPolicy(max_retries=0),
+                                sleep=lambda seconds: None)
+    executor.get_breaker('a').record_failure()
+    time.sleep(0.06)
+    with pytest.raises(FailoverError):
+        executor.call('generate_text', 'hi')
+    assert executor.call('generate_text', 'hi') == 'ok'
+    assert executor.get_breaker('a').state == CircuitBreaker.CLOSED
@@ -0,0 +1,112 @@
+"""
+语义提示词缓存测试
+"""
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from src.semantic_cache import SemanticCacheLLM, SemanticPromptCache  # noqa: E402
+
+# 与 PromptTemplate 相同的提取模板：模板文本远长于可变的文本块
+EXTRACTION_TEMPLATE = """请仔细分析以下文本并提取关键信息：
+
+文本：{text_chunk}
+
+请返回JSON格式，包含：
+- 主要主题（简洁明了）
+- 主要角色（列表格式）
+- 背景设定
+- 核心句子
+
+格式：
+```json
+{{"theme": "主题", "characters": ["角色"], "world_elements": "背景", "raw_excerpt": "核心句子"}}
+```"""
+
+XIANXIA_CHUNK = "云逸站在青云峰顶，望着脚下翻涌的云海，体内灵力运转三十六周天后终于冲破了筑基期的瓶颈。"
+URBAN_CHUNK = "林婉儿推开咖啡馆的玻璃门，午后的阳光洒在木质地板上，她点了一杯拿铁，坐在靠窗的位置。"
+
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_text(self, prompt, **kwargs):
+        self.calls += 1
+        return f"extraction-{self.calls}"
+
+
+def _prompt(chunk):
+    return EXTRACTION_TEMPLATE.format(text_chunk=chunk)
+
+
+def test_different_chunks_under_same_template_do_not_share_results():
+    cache = SemanticPromptCache()
+    cache.put(_prompt(XIANXIA_CHUNK), 'qwen', 'xianxia', 'extract', content=XIANXIA_CHUNK)
+
+    assert cache.get(_prompt(URBAN_CHUNK), 'qwen', 'extract', content=URBAN_CHUNK) is None
+    assert cache.get(_prompt(URBAN_CHUNK), 'qwen', 'extract') is None
+    assert cache.get_stats()['semantic_hits'] == 0
+
+
+def test_exact_hit_ignores_whitespace():
+    cache = SemanticPromptCache()
+    cache.put(_prompt(XIANXIA_CHUNK), 'qwen', 'xianxia', 'extract', content=XIANXIA_CHUNK)
+
+    assert cache.get('  ' + _prompt(XIANXIA_CHUNK).replace('\n', '\n\n'), 'qwen', 'extract') == 'xianxia'
+
+
+def test_near_duplicate_chunk_hits():
+    cache = SemanticPromptCache()
+    chunk = XIANXIA_CHUNK * 20
+    cache.put(_prompt(chunk), 'qwen', 'xianxia', 'extract', content=chunk)
+
+    edited = chunk[:-1] + '！'
+    assert cache.get(_prompt(edited), 'qwen', 'extract', content=edited) == 'xianxia'
+    assert cache.get_stats()['semantic_hits'] == 1
+
+
+def test_near_match_requires_similar_length():
+    cache = SemanticPromptCache(threshold=0.5)
+    chunk = XIANXIA_CHUNK * 4
+    cache.put(_prompt(chunk), 'qwen', 'xianxia', 'extract', content=chunk)
+
+    assert cache.get(_prompt(XIANXIA_CHUNK), 'qwen', 'extract', content=XIANXIA_CHUNK) is None
+
+
+def test_scopes_are_isolated():
+    cache = SemanticPromptCache()
+    cache.put(_prompt(XIANXIA_CHUNK), 'qwen', 'xianxia', 'extract', content=XIANXIA_CHUNK)
+
+    assert cache.get(_prompt(XIANXIA_CHUNK), 'deepseek', 'extract', content=XIANXIA_CHUNK) is None
+
+
+def test_eviction_keeps_index_consistent():
+    cache = SemanticPromptCache(max_entries=50)
+    chunks = [f"第{i}段：" + XIANXIA_CHUNK[i % 10:] + URBAN_CHUNK[:i % 7] for i in range(200)]
+    for i, chunk in enumerate(chunks):
+        cache.put(_prompt(chunk), 'qwen', f"r{i}", 'extract', content=chunk)
+
+    stats = cache.get_stats()
+    assert stats['entries'] == 50
+    assert stats['evictions'] == 150
+    index = cache._scopes[('qwen', 'extract')]
+    assert len(index) == 50
+    assert sorted(index.rows.values()) == list(range(50))
+    # 仍在缓存中的条目可以精确命中，已淘汰的不会再返回
+    assert cache.get(_prompt(chunks[-1]), 'qwen', 'extract', content=chunks[-1]) == 'r199'
+    assert cache.get(_prompt(chunks[0]), 'qwen', 'extract') is None
+
+
+def test_wrapper_only_calls_model_on_miss():
+    llm = CountingLLM()
+    cached = SemanticCacheLLM(llm, 'qwen', SemanticPromptCache())
+
+    first = cached.generate_text(_prompt(XIANXIA_CHUNK), template='extract', content=XIANXIA_CHUNK)
+    again = cached.generate_text(_prompt(XIANXIA_CHUNK), template='extract', content=XIANXIA_CHUNK)
+    other = cached.generate_text(_prompt(URBAN_CHUNK), template='extract', content=URBAN_CHUNK)
+
+    assert first == again
+    assert other != first
+    assert llm.calls == 2
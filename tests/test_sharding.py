@@ -0,0 +1,76 @@
+"""
+分片存储测试
+"""
+
+import os
+
+import pytest
+
+from src.db_pool import close_all_pools
+from src.errors import DatabaseError, ValidationError
+from src.sharding import ShardedDatabase, shard_key
+
+
+@pytest.fixture
+def shard_dir(tmp_path):
+    yield str(tmp_path / 'shards')
+    close_all_pools()
+
+
+def test_hash_routing_is_stable_and_source_search_hits_one_shard(shard_dir, make_records):
+    db = ShardedDatabase(shard_dir, num_shards=4)
+    records = make_records(6, source_file='a.txt', keyword='青云峰') + make_records(6, source_file='b.txt')
+    results = db.save_batch(records)
+    assert set(results) == {f"{shard_key('a.txt', 4):02d}", f"{shard_key('b.txt', 4):02d}"}
+
+    found = db.search_by_source('a.txt')
+    assert len(found) == 6
+    assert {item['shard'] for item in found} == {db.shard_for({'source_file': 'a.txt'})}
+    # 按创建时间倒序
+    assert [item['created_at'] for item in found] == sorted((item['created_at'] for item in found), reverse=True)
+    db.close()
+
+
+def test_keyword_search_merges_newest_first_across_shards(shard_dir):
+    db = ShardedDatabase(shard_dir, num_shards=4)
+    records = [
+        {'source_file': f'book{index}.txt', 'raw_text': f'青云峰 {index}', 'idea': 'x',
+         'created_at': f'2026-01-{index + 1:02d} 00:00:00'}
+        for index in range(8)
+    ]
+    db.save_batch(records)
+    assert len(db.list_shards()) == 4
+    found = db.search_inspirations('青云峰', limit=3)
+    assert [item['created_at'][:10] for item in found] == ['2026-01-08', '2026-01-07', '2026-01-06']
+    db.close()
+
+
+def test_time_strategy_routes_by_month_and_prunes_date_range(shard_dir):
+    db = ShardedDatabase(shard_dir, strategy='time')
+    db.save_batch([
+        {'source_file': 'a.txt', 'raw_text': '一', 'idea': 'x', 'created_at': '2026-01-15 08:00:00'},
+        {'source_file': 'a.txt', 'raw_text': '二', 'idea': 'x', 'created_at': '2026-02-03 08:00:00'},
+    ])
+    assert db.list_shards() == ['2026-01', '2026-02']
+    found = db.search_by_date_range('2026-02-01', '2026-02-28')
+    assert [(item['shard'], item['raw_text']) for item in found] == [('2026-02', '二')]
+    db.close()
+
+
+@pytest.mark.parametrize('created_at', ['2026/01/15 08:00:00', '2026-13-01 00:00:00', '20260115', '2026-011'])
+def test_time_strategy_rejects_malformed_created_at(shard_dir, created_at):
+    db = ShardedDatabase(shard_dir, strategy='time')
+    with pytest.raises(ValidationError):
+        db.save_batch([{'source_file': 'a.txt', 'raw_text': '一', 'idea': 'x', 'created_at': created_at}])
+    assert db.list_shards() == []
+    db.close()
+
+
+def test_reopening_with_different_layout_is_rejected(shard_dir):
+    ShardedDatabase(shard_dir, num_shards=4).close()
+    assert os.path.exists(os.path.join(shard_dir, 'sharding.json'))
+    ShardedDatabase(shard_dir, num_shards=4).close()
+    with pytest.raises(DatabaseError):
+        ShardedDatabase(shard_dir, num_shards=8)
+    with pytest.raises(DatabaseError):
+        ShardedDatabase(shard_dir, strategy='time')
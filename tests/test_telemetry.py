@@ -0,0 +1,82 @@
+"""
+LLM 调用遥测测试
+"""
+
+import json
+
+import pytest
+
+from src.telemetry import InstrumentedLLM, LatencyHistogram, LLMTelemetry
+
+
+class UsageModel:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.last_usage = {'prompt_tokens': 100, 'completion_tokens': 50}
+
+    def generate_text(self, prompt, **kwargs):
+        if self.fail:
+            raise TimeoutError('timed out')
+        return '输出'
+
+    def stream_text(self, prompt, **kwargs):
+        yield '输'
+        yield '出'
+
+
+def test_histogram_percentiles_and_buckets():
+    histogram = LatencyHistogram(bounds=(0.1, 1.0))
+    for value in (0.05, 0.2, 0.3, 0.4, 2.0):
+        histogram.observe(value)
+    stats = histogram.to_dict()
+    assert stats['count'] == 5
+    assert stats['p50'] == 0.3
+    assert stats['max'] == 2.0
+    assert stats['buckets'] == {'<=0.1': 1, '<=1.0': 3, '>1.0': 1}
+    assert LatencyHistogram().percentile(50) is None
+
+
+def test_usage_and_cost_come_from_last_usage_and_pricing():
+    telemetry = LLMTelemetry.from_config({
+        'pricing': {'qwen': {'prompt_per_1k': 0.002, 'completion_per_1k': 0.006, 'currency': 'CNY'}},
+    })
+    llm = InstrumentedLLM(UsageModel(), 'qwen', telemetry)
+    assert llm.generate_text('提示') == '输出'
+    metrics = telemetry.get_metrics()['qwen']
+    assert metrics['prompt_tokens'] == 100
+    assert metrics['completion_tokens'] == 50
+    assert metrics['estimated_cost'] == pytest.approx(0.0005)
+    assert metrics['currency'] == 'CNY'
+
+
+def test_errors_are_counted_by_type_without_tokens():
+    telemetry = LLMTelemetry()
+    llm = InstrumentedLLM(UsageModel(fail=True), 'm', telemetry)
+    with pytest.raises(TimeoutError):
+        llm.generate_text('提示')
+    metrics = telemetry.get_metrics('m')
+    assert metrics['errors'] == 1
+    assert metrics['error_rate'] == 1.0
+    assert metrics['error_types'] == {'TimeoutError': 1}
+    assert metrics['prompt_tokens'] == 0
+
+
+def test_streaming_records_time_to_first_token():
+    telemetry = LLMTelemetry()
+    llm = InstrumentedLLM(UsageModel(), 'm', telemetry)
+    assert ''.join(llm.stream_text('提示')) == '输出'
+    metrics = telemetry.get_metrics('m')
+    assert metrics['time_to_first_token']['count'] == 1
+    assert metrics['latency']['count'] == 1
+
+
+def test_export_json_and_reset(tmp_path):
+    telemetry = LLMTelemetry()
+    telemetry.record('m', 0.5, prompt_tokens=3, completion_tokens=4)
+    telemetry.record_retry('m', 2)
+    path = tmp_path / 'metrics.json'
+    payload = json.loads(telemetry.export_json(str(path)))
+    assert payload['models']['m']['retries'] == 2
+    assert json.loads(path.read_text(encoding='utf-8')) == payload
+    telemetry.reset()
+    assert telemetry.get_metrics() == {}